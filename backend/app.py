@@ -7,11 +7,14 @@ import sys
 sys.path.append('.')
 import json
 import uuid
+import time
+import base64
 import secrets
+import threading
 from datetime import datetime
-from flask import Flask, request, jsonify, send_from_directory, session, g
+from flask import Flask, Blueprint, Request, Response, current_app, request, jsonify, send_from_directory, session, g, redirect, url_for
 from flask_cors import CORS
-from werkzeug.security import generate_password_hash, check_password_hash
+from werkzeug.security import generate_password_hash
 from functools import wraps
 import sqlite3
 import bleach
@@ -32,74 +35,147 @@ ALLOWED_ATTRIBUTES = {
 }
 
 # Import admin credentials from config.py
-from backend.config import ADMIN_USERNAME, ADMIN_PASSWORD_HASH
+from backend.config import ADMIN_USERNAME, ADMIN_PASSWORD_HASH, MAX_REQUEST_SIZE
 # Import database helper functions
 from backend.database import create_connection, add_page_db, get_all_pages_db, get_page_by_id_db, get_page_by_slug_db, update_page_db, delete_page_db
+from backend.database import PAGE_SORT_KEYS, list_pages_db, get_subtree_db
+from backend.migrations import migrate
+from backend.content_cache import menu_cache, widget_cache
+from backend.snapshot import SanitizedContentCache, StaticPageIndex, tree_cache
+from backend.replica import ReadReplica, replica_key
+from backend.compression import response_bodies, negotiate_encoding
+from backend.json_provider import FastJSONProvider, encode_json
+from backend.revisions import get_revisions
+from backend.settings import EDITABLE_SETTINGS, settings_cache
+from backend.log import configure_logging, get_logger
+from backend.metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from backend import sqltrace
+# backend.uploads, backend.images, backend.bundle, backend.login_guard and backend.export are
+# imported where they are used, so public workers that never upload, publish or log in skip them
+
+logger = get_logger(__name__)
 
 basedir = os.path.abspath(os.path.dirname(__file__))
 
-app = Flask(__name__, static_folder='/public', static_url_path='/public')
-
-def generate_breadcrumbs(slug, flat_pages):
-    """Generates breadcrumbs for a given page slug."""
-    breadcrumbs = []
-    print(f"generate_breadcrumbs called with slug: {slug} and flat_pages: {flat_pages}")
-    current_page = next((p for p in flat_pages if p['slug'] == slug), None)
-
-    if not current_page:
-        print(f"Current page not found for slug: {slug}")
-        return breadcrumbs
-
-    print(f"Current page: {current_page}")
-    breadcrumbs.append({'title': 'Home', 'url': '/index.html', 'active': False})
-
-    parent_id = current_page['parent_id']
-    while parent_id:
-        parent_page = next((p for p in flat_pages if p['id'] == parent_id), None)
-        if not parent_page:
-            break
-        breadcrumbs.insert(1, {'title': parent_page['title'], 'url': f"/pages/{parent_page['slug']}", 'active': False})
-        parent_id = parent_page['parent_id']
-
-    breadcrumbs.append({'title': current_page['title'], 'url': None, 'active': True})
-    return breadcrumbs
-
-    breadcrumbs.append({'title': 'Home', 'url': '/index.html', 'active': False})
-
-    parent_id = current_page['parent_id']
-    while parent_id:
-        parent_page = next((p for p in flat_pages if p['id'] == parent_id), None)
-        if not parent_page:
-            break
-        breadcrumbs.insert(1, {'title': parent_page['title'], 'url': f"/pages/{parent_page['slug']}", 'active': False})
-        parent_id = parent_page['parent_id']
-
-    breadcrumbs.append({'title': current_page['title'], 'url': None, 'active': True})
-    return breadcrumbs
-# Enable CORS for all origins. In a production environment, you should restrict this
-# to specific origins (e.g., your frontend URL).
-CORS(app)
-app.config['SECRET_KEY'] = 'somabay_handbook' # Used for session management
+# Every route and request hook lives on this blueprint; create_app() builds the Flask app.
+bp = Blueprint('handbook', __name__)
 
 DATABASE = 'site.db'
 
+_migrated_databases = set()
+
 def get_db():
     db = getattr(g, '_database', None)
     if db is None:
-        db = g._database = sqlite3.connect(DATABASE)
+        db_path = current_app.config['DATABASE']
+        db = g._database = sqltrace.connect(db_path)
         db.row_factory = sqlite3.Row # This makes rows behave like dictionaries
+        if db_path not in _migrated_databases:
+            # First connection of this process: one PRAGMA user_version read when up to date
+            migrate(db)
+            _migrated_databases.add(db_path)
     return db
 
-@app.teardown_appcontext
 def close_connection(exception):
-    db = getattr(g, '_database', None)
-    if db is not None:
-        db.close()
+    for name in ('_database', '_read_database'):
+        db = getattr(g, name, None)
+        if db is not None:
+            db.close()
+
+# --- Public read connection ---
+# Public pages read from an in-memory copy of the database (backend/replica.py) so editors'
+# write locks never stall them. Set READ_REPLICA=0 to read site.db directly.
+
+_read_replicas = {}
+_read_replicas_lock = threading.Lock()
+
+def read_replica_enabled():
+    return os.environ.get('READ_REPLICA', '1').lower() not in ('0', 'false', 'no', 'off')
+
+def get_read_replica(db_path):
+    with _read_replicas_lock:
+        replica = _read_replicas.get(db_path)
+        if replica is None:
+            replica = _read_replicas[db_path] = ReadReplica(db_path)
+        return replica
+
+def get_read_generation():
+    """The replica generation this request reads from; chosen once per request."""
+    generation = getattr(g, '_read_generation', None)
+    if generation is None:
+        replica = get_read_replica(current_app.config['DATABASE'])
+        generation = g._read_generation = replica.current(get_revisions_map())
+    return generation
+
+def get_read_db():
+    """Connection for public reads: the in-memory replica, or site.db when it is turned off."""
+    if not current_app.config['READ_REPLICA']:
+        return get_db()
+    conn = getattr(g, '_read_database', None)
+    if conn is None:
+        conn = g._read_database = get_read_generation().connect()
+    return conn
+
+def get_site_bundle():
+    """The compiled site bundle (backend/bundle.py) if one is configured and current, else None."""
+    path = current_app.config['SITE_BUNDLE']
+    if not path:
+        return None
+    from backend.bundle import get_bundle_holder
+    return get_bundle_holder(path).current(get_revisions_map())
+
+# --- Request metrics ---
+# Timings are labelled with the route pattern (e.g. /api/pages/<slug>), not the URL,
+# so the number of series stays bounded. Exposed at /api/admin/metrics.
+
+metrics.register_cache('menus', menu_cache)
+metrics.register_cache('widgets', widget_cache)
+metrics.register_cache('settings', settings_cache)
+metrics.register_cache('page_tree', tree_cache)
+metrics.register_cache('response_bodies', response_bodies)
+
+@bp.before_app_request
+def start_request_timer():
+    g._request_started = time.perf_counter()
+    metrics.request_started()
+
+@bp.after_app_request
+def record_request_metrics(response):
+    started = g.pop('_request_started', None)
+    if started is not None:
+        route = request.url_rule.rule if request.url_rule is not None else '<unmatched>'
+        metrics.observe(request.method, route, response.status_code, time.perf_counter() - started)
+        metrics.request_finished()
+    # site.db and read replica connections; traced when SQL_TRACE=1, see backend/sqltrace.py
+    traces = [conn.trace for conn in (g.get('_database'), g.get('_read_database'))
+              if getattr(conn, 'trace', None) is not None]
+    if traces:
+        trace = sqltrace.QueryTrace()
+        for connection_trace in traces:
+            trace.merge(connection_trace)
+        response.headers.add('Server-Timing', trace.server_timing())
+        response.headers['X-SQL-Statements'] = str(trace.statements)
+        response.headers['X-SQL-Duplicates'] = str(trace.duplicate_count())
+        trace.log_summary(f"{request.method} {request.path}")
+    return response
+
+@bp.teardown_app_request
+def finish_request_metrics(exception):
+    # after_request is skipped when a response could not be produced at all
+    if g.pop('_request_started', None) is not None:
+        metrics.request_finished()
+
+_page_columns = None
+
+def get_page_columns(conn):
+    """Returns the set of columns of the pages table, read once per process."""
+    global _page_columns
+    if _page_columns is None:
+        _page_columns = {row[1] for row in conn.execute("PRAGMA table_info(pages)")}
+    return _page_columns
 
 # --- Configuration ---
 UPLOADS_DIR = os.path.join(os.path.dirname(__file__), '..', 'public', 'uploads')
-# Ensure directories exist
-os.makedirs(UPLOADS_DIR, exist_ok=True)
 
 # --- Helper Functions ---
 
@@ -168,6 +244,29 @@ def update_item_in_sidebar(items, updated_item_data):
                 return True
     return False
 
+def parse_bool_arg(value):
+    """Parses a boolean query string value. Returns None when the value is absent."""
+    if value is None:
+        return None
+    value = value.lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean value: {value}")
+
+def encode_cursor(key):
+    """Encodes a (sort_value, id) keyset position as an opaque URL-safe cursor."""
+    return base64.urlsafe_b64encode(json.dumps(key).encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    """Decodes a cursor produced by encode_cursor. Raises ValueError if it is malformed."""
+    try:
+        sort_value, page_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return sort_value, page_id
+
 def build_nested_pages(flat_pages, parent_id=None):
     """
     Builds a nested page structure from a flat list of pages.
@@ -182,22 +281,44 @@ def build_nested_pages(flat_pages, parent_id=None):
             nested_items.append(new_item)
     return nested_items
 
+# --- Cache revisions ---
+# Every in-process cache (settings, page tree, menus, widgets) is tagged with the revision
+# of its data set in the shared revisions table. The counters are read with one query, at
+# most once per request and only by requests that use a cache; a cache whose revision moved
+# (another worker wrote) is reloaded, the others are kept.
+
+def get_revisions_map():
+    """Returns {name: revision} for every cached data set, reading the counters once per request."""
+    revisions = getattr(g, '_revisions', None)
+    if revisions is None:
+        revisions = g._revisions = get_revisions(get_db())
+    return revisions
+
+def get_revision(name):
+    """Returns the current revision of a cached data set."""
+    return get_revisions_map().get(name, 0)
+
 # --- Database Helper Functions for Settings ---
 
+# Settings are served from the in-process cache in backend/settings.py, which reloads the
+# whole table in one query when another worker has changed it.
+
+def get_settings():
+    """Returns every setting as a dict. Do not modify the result."""
+    return settings_cache.all(get_db(), get_revision('settings'))
+
 def get_setting(key):
-    """Retrieves a setting value from the database."""
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("SELECT setting_value FROM settings WHERE setting_key = ?", (key,))
-    result = cursor.fetchone()
-    return result[0] if result else None
+    """Retrieves a setting value."""
+    return get_settings().get(key)
+
+def update_settings(values):
+    """Inserts or updates several settings in one transaction."""
+    settings_cache.update(get_db(), values)
+    g.pop('_revisions', None)
 
 def update_setting(key, value):
     """Inserts or updates a setting value in the database."""
-    db = get_db()
-    cursor = db.cursor()
-    cursor.execute("INSERT OR REPLACE INTO settings (setting_key, setting_value) VALUES (?, ?)", (key, value))
-    db.commit()
+    update_settings({key: value})
 
 # --- Database Helper Functions for Menus ---
 
@@ -222,6 +343,7 @@ def create_menu(name, menu_data):
     cursor = db.cursor()
     cursor.execute("INSERT INTO menus (name, menu_data) VALUES (?, ?)", (name, json.dumps(menu_data)))
     db.commit()
+    menu_cache.invalidate(name)
     return cursor.lastrowid
 
 def update_menu(name, menu_data):
@@ -230,6 +352,7 @@ def update_menu(name, menu_data):
     cursor = db.cursor()
     cursor.execute("UPDATE menus SET menu_data = ? WHERE name = ?", (json.dumps(menu_data), name))
     db.commit()
+    menu_cache.invalidate(name)
     return cursor.rowcount
 
 def delete_menu(name):
@@ -238,6 +361,7 @@ def delete_menu(name):
     cursor = db.cursor()
     cursor.execute("DELETE FROM menus WHERE name = ?", (name,))
     db.commit()
+    menu_cache.invalidate(name)
     return cursor.rowcount
 
 # --- Database Helper Functions for Widgets ---
@@ -263,6 +387,7 @@ def create_widget(name, widget_type, widget_data):
     cursor = db.cursor()
     cursor.execute("INSERT INTO widgets (name, widget_type, widget_data) VALUES (?, ?, ?)", (name, widget_type, json.dumps(widget_data)))
     db.commit()
+    widget_cache.invalidate(name)
     return cursor.lastrowid
 
 def update_widget(name, widget_type, widget_data):
@@ -271,7 +396,8 @@ def update_widget(name, widget_type, widget_data):
     cursor = db.cursor()
     cursor.execute("UPDATE widgets SET widget_type = ?, widget_data = ? WHERE name = ?", (widget_type, json.dumps(widget_data), name))
     db.commit()
-    return cur.rowcount
+    widget_cache.invalidate(name)
+    return cursor.rowcount
 
 def delete_widget(name):
     """Deletes a widget by its name."""
@@ -279,7 +405,108 @@ def delete_widget(name):
     cursor = db.cursor()
     cursor.execute("DELETE FROM widgets WHERE name = ?", (name,))
     db.commit()
-    return cur.rowcount
+    widget_cache.invalidate(name)
+    return cursor.rowcount
+
+# --- Cached menu and widget documents ---
+# Reads go through backend/content_cache.py. The write helpers above invalidate it in this
+# process; writes from other workers show up as a moved 'menus' or 'widgets' revision.
+
+def cached_menu(name):
+    """Returns the CachedDocument for a menu (document is None if it does not exist)."""
+    menu_cache.sync(get_revision('menus'))
+    return menu_cache.get(name, get_menu_by_name)
+
+def cached_menus():
+    menu_cache.sync(get_revision('menus'))
+    return menu_cache.get_all(get_all_menus)
+
+def cached_widget(name):
+    """Returns the CachedDocument for a widget (document is None if it does not exist)."""
+    widget_cache.sync(get_revision('widgets'))
+    return widget_cache.get(name, get_widget_by_name)
+
+def cached_widgets():
+    widget_cache.sync(get_revision('widgets'))
+    return widget_cache.get_all(get_all_widgets)
+
+def cached_json_response(entry, max_age=None):
+    """Sends a cached document's pre-serialized body, answering If-None-Match with 304."""
+    response = Response(entry.body, mimetype='application/json')
+    response.set_etag(entry.etag)
+    if max_age is not None:
+        response.cache_control.public = True
+        response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+# --- Page tree snapshot ---
+# Public page reads are answered from backend/snapshot.py, rebuilt when the 'pages' revision moves.
+
+def sanitize_content(html):
+    """Sanitizes page HTML using the defined ALLOWED_TAGS and ALLOWED_ATTRIBUTES."""
+    return bleach.clean(html, tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
+
+sanitized_content = SanitizedContentCache(sanitize_content)
+metrics.register_cache('sanitized_content', sanitized_content)
+
+def get_read_revisions():
+    """Revisions of the data public reads see: the replica's when it is on, else site.db's."""
+    if current_app.config['READ_REPLICA']:
+        # The revisions the replica was copied at, which is what it contains
+        return get_read_generation().revisions
+    return get_revisions_map()
+
+def get_tree_snapshot():
+    """Returns the TreeSnapshot for the current 'pages' revision. Do not modify it."""
+    return tree_cache.get(get_read_revisions().get('pages', 0), lambda: get_all_pages_db(get_read_db()))
+
+_static_page_indexes = {}
+_static_page_indexes_lock = threading.Lock()
+
+def get_static_pages():
+    """(paths, 404.html bytes or None) of the generated static pages directory (see StaticPageIndex)."""
+    directory = os.path.join(current_app.static_folder, 'pages')
+    with _static_page_indexes_lock:
+        index = _static_page_indexes.get(directory)
+        if index is None:
+            index = _static_page_indexes[directory] = StaticPageIndex(directory)
+    return index.get()
+
+# --- Cached response bodies ---
+# Public sidebar and page bodies are serialized to JSON bytes once per revision, and
+# gzip/brotli compressed once per encoding (backend/compression.py). Later requests for the
+# same revision are answered from those bytes without touching the snapshot.
+
+def serialized(result):
+    """(body, status) with the body encoded to JSON bytes, unless it already is bytes."""
+    body, status = result
+    return (body if isinstance(body, bytes) else encode_json(body)), status
+
+def public_json_response(key, render):
+    """
+    Sends render()'s (body, status) as JSON, compressed when the client accepts it.
+    key identifies the body and must change whenever the body does; render() is not called
+    while a body for it is cached. A key of None turns caching and compression off.
+    """
+    encoding = negotiate_encoding(request.headers.get('Accept-Encoding'))
+    body, status, content_encoding = response_bodies.respond(key, encoding, lambda: serialized(render()))
+    return json_bytes_response(body, status, content_encoding)
+
+def bundle_response(read):
+    """
+    Sends a body straight from the site bundle, which stores it already compressed.
+    read(encoding) returns (body, content encoding or None) from bundle.sidebar or bundle.page.
+    """
+    body, content_encoding = read(negotiate_encoding(request.headers.get('Accept-Encoding')))
+    # WSGI servers only write bytes; the copy lives as long as the response
+    return json_bytes_response(bytes(body), 200, content_encoding)
+
+def json_bytes_response(body, status, content_encoding):
+    response = Response(body, status=status, mimetype='application/json')
+    if content_encoding is not None:
+        response.headers['Content-Encoding'] = content_encoding
+    response.vary.add('Accept-Encoding')
+    return response
 
 # --- Authentication Decorator ---
 
@@ -312,75 +539,187 @@ def token_required(f):
         return f(*args, **kwargs)
     return decorated
 
+# --- Public read API ---
+# Shared by the Flask views below and the ASGI app in backend/asgi.py. Each function returns
+# (body, status) for a JSON response.
+
+MAX_SIDEBAR_DEPTH = 10
+# Sent for every unknown slug, so misses skip the body cache and serialization
+PAGE_NOT_FOUND_BODY = encode_json({'message': 'Page not found'})
+DEFAULT_SEARCH_LIMIT = 20
+MAX_SEARCH_LIMIT = 100
+
+def read_sidebar(conn, load_snapshot, parent_id=None, depth_arg=None):
+    """load_snapshot() returns the current TreeSnapshot; for a subtree it is only used to check the parent."""
+    if parent_id is not None or depth_arg is not None:
+        try:
+            depth = int(depth_arg) if depth_arg else 1
+        except ValueError:
+            return {'message': 'Invalid depth'}, 400
+        depth = min(max(depth, 1), MAX_SIDEBAR_DEPTH)
+        if parent_id:
+            # The parent must be shown in the public sidebar: published, and so is every chapter above it
+            if load_snapshot().public_position(parent_id) is None:
+                return {'message': 'Page not found'}, 404
+        return get_subtree_db(conn, parent_id or None, depth), 200
+
+    # The nested, published-only tree is built once per revision of the pages table
+    public_sidebar = load_snapshot().public_sidebar
+    logger.debug("Public sidebar data: %s", public_sidebar)  # Formatted only when debug is enabled
+    return public_sidebar, 200
+
+def read_page(conn, snapshot, slug):
+    if slug not in snapshot.published_slugs:
+        return {'message': 'Page not found'}, 404
+    from backend.images import responsive_image
+    page = snapshot.by_slug[slug]
+    breadcrumbs = snapshot.breadcrumbs(slug)
+    content = sanitized_content.get(page['id'], page['content'])
+    # srcset/sizes for images that have responsive derivatives, None otherwise
+    header_image = responsive_image(conn, page['design'].get('headerImage'))
+    placeholder_image = responsive_image(conn, page.get('placeholder_image'))
+    return {'title': page['title'], 'content': content, 'breadcrumbs': breadcrumbs,
+            'header_image': header_image, 'placeholder_image': placeholder_image}, 200
+
+SINCE_REQUIRED = {'message': 'A revision to read changes since (since) is required'}
+
+def parse_since(since_arg):
+    """The since argument of /api/sidebar/changes as an int, or None when it is missing or invalid."""
+    try:
+        return int(since_arg)
+    except (TypeError, ValueError):
+        return None
+
+def needs_resync(since, revisions):
+    # The log no longer reaches back that far (or the revision is not from this database)
+    return since < revisions.get('page_changes_horizon', 0) or since > revisions.get('pages', 0)
+
+def sidebar_changes_key(since, revisions):
+    """Body cache key: one per since value the log can answer, one shared by every resync."""
+    return ('sidebar_changes', None if needs_resync(since, revisions) else since, replica_key(revisions))
+
+def read_sidebar_changes(conn, load_snapshot, revisions, since):
+    """
+    Public sidebar nodes changed after pages revision since (see parse_since), from the
+    page_changes log (migration 10). revisions must be the ones conn and load_snapshot() are at.
+    """
+    revision = revisions.get('pages', 0)
+    if needs_resync(since, revisions):
+        # The log no longer reaches back that far (or the revision is not from this database)
+        return {'revision': revision, 'resync': True, 'changes': []}, 200
+    rows = conn.execute("SELECT page_id, change FROM page_changes WHERE revision > ? AND revision <= ? ORDER BY id",
+                        (since, revision)).fetchall()
+    kinds = {}
+    for page_id, change in rows:
+        kinds.setdefault(page_id, set()).add(change)
+    snapshot = load_snapshot() if kinds else None
+    changes = []
+    for page_id, changed in kinds.items():
+        placed = snapshot.public_position(page_id)
+        if placed is None:
+            # Deleted, unpublished or moved under a hidden chapter; clients drop it and its subtree
+            changes.append({'id': page_id, 'change': 'deleted'})
+            continue
+        parent_id, position, node = placed
+        if changed & {'insert', 'visibility'}:
+            change = 'inserted'  # With its subtree, which may have been hidden until now
+        elif 'move' in changed:
+            change = 'moved'
+        else:
+            change = 'updated'
+            node = {key: value for key, value in node.items() if key != 'children'}
+        changes.append({'id': page_id, 'change': change, 'parent_id': parent_id, 'position': position, 'node': node})
+    return {'revision': revision, 'resync': False, 'changes': changes}, 200
+
+def read_search(snapshot, query, limit_arg=None):
+    query = (query or '').strip()
+    if not query:
+        return {'message': 'A search query (q) is required'}, 400
+    try:
+        limit = min(max(int(limit_arg), 1), MAX_SEARCH_LIMIT) if limit_arg else DEFAULT_SEARCH_LIMIT
+    except ValueError:
+        return {'message': 'Invalid limit'}, 400
+    return {'query': query, 'results': snapshot.search(query, limit)}, 200
+
 # --- API Endpoints ---
 
-@app.route('/api/sidebar', methods=['GET'])
+@bp.route('/api/sidebar', methods=['GET'])
 def get_sidebar():
     """
     GET /api/sidebar
-    Returns the complete sidebar navigation structure from the database.
+    GET /api/sidebar?parent=<id>&depth=N
+    Returns the complete sidebar navigation structure from the database. With `parent`
+    and/or `depth`, returns only the published children of that page (top level when
+    `parent` is empty or absent) nested N levels deep (default 1). Each node then carries
+    a child_count so the client can load deeper levels on demand.
     This endpoint is public and does not require authentication.
     """
-    conn = get_db()
-    flat_pages = get_all_pages_db(conn)
-
-    # Build the nested structure from the flat list
-    nested_pages = build_nested_pages(flat_pages)
-
-    # Filter out draft pages for public view
-    def filter_published(items):
-        filtered = []
-        for item in items:
-            try:
-                if item.get('published', False):  # Only include published items
-                    new_item = item.copy()
-                    if 'children' in new_item:
-                        new_item['children'] = filter_published(new_item['children'])
-                    filtered.append(new_item)
-            except Exception as e:
-                print(f"Error filtering item {item.get('id', 'unknown')}: {e}")
-        return filtered
-
-    public_sidebar = filter_published(nested_pages)
-    print(f"Public Sidebar Data: {public_sidebar}")  # Debugging line
-    return jsonify(public_sidebar)
-
-
-@app.route('/api/pages/<slug>', methods=['GET'])
+    if request.args:
+        body, status = read_sidebar(get_read_db(), get_tree_snapshot, request.args.get('parent'), request.args.get('depth'))
+        return jsonify(body), status
+    bundle = get_site_bundle()
+    if bundle is not None:
+        return bundle_response(bundle.sidebar)
+    return public_json_response(('sidebar', replica_key(get_read_revisions())),
+                                lambda: read_sidebar(get_read_db(), get_tree_snapshot))
+
+
+@bp.route('/api/sidebar/changes', methods=['GET'])
+def get_sidebar_changes():
+    """
+    GET /api/sidebar/changes?since=<revision>
+    Returns the public sidebar nodes inserted, updated, moved or deleted after the given
+    pages revision, and the revision to poll from next. Inserted and moved nodes come with
+    their subtree, updated ones without children. When the change log no longer reaches
+    back to `since`, returns resync: true and the client reloads /api/sidebar; polling
+    with since=0 is a way to learn the current revision.
+    This endpoint is public and does not require authentication.
+    """
+    since = parse_since(request.args.get('since'))
+    if since is None:
+        return jsonify(SINCE_REQUIRED), 400
+    revisions = get_read_revisions()
+    return public_json_response(sidebar_changes_key(since, revisions),
+                                lambda: read_sidebar_changes(get_read_db(), get_tree_snapshot, revisions, since))
+
+@bp.route('/api/pages/<slug>', methods=['GET'])
 def get_page(slug):
     """
     GET /api/pages/<slug>
     Returns a single page by its slug.
     """
-    conn = get_db()
-    page = get_page_by_slug_db(conn, slug)
-    if page:
-        # Fetch all pages for breadcrumb generation
-        flat_pages = get_all_pages_db(conn)
-        breadcrumbs = generate_breadcrumbs(slug, flat_pages)
-        # Sanitize HTML content using the defined ALLOWED_TAGS and ALLOWED_ATTRIBUTES
-        sanitized_content = bleach.clean(page['content'], tags=ALLOWED_TAGS, attributes=ALLOWED_ATTRIBUTES)
-        return jsonify({'title': page['title'], 'content': sanitized_content, 'breadcrumbs': breadcrumbs}), 200
-    return jsonify({'message': 'Page not found'}), 404
-
-
-@app.route('/api/admin/settings', methods=['GET'])
+    bundle = get_site_bundle()
+    if bundle is not None and slug in bundle:
+        return bundle_response(lambda encoding: bundle.page(slug, encoding))
+    snapshot = get_tree_snapshot()
+    if slug not in snapshot.published_slugs:
+        return Response(PAGE_NOT_FOUND_BODY, status=404, mimetype='application/json')
+    return public_json_response(('page', slug, replica_key(get_read_revisions())),
+                                lambda: read_page(get_read_db(), snapshot, slug))
+
+@bp.route('/api/search', methods=['GET'])
+def search_pages():
+    """
+    GET /api/search?q=<terms>&limit=20
+    Returns published pages whose title or text contains every term, title matches first,
+    each with a short snippet. This endpoint is public and does not require authentication.
+    """
+    body, status = read_search(get_tree_snapshot(), request.args.get('q'), request.args.get('limit'))
+    return jsonify(body), status
+
+
+@bp.route('/api/admin/settings', methods=['GET'])
 @token_required
 def get_cms_settings():
     """
     GET /api/admin/settings
     Retrieves all CMS settings. Requires authentication.
     """
-    settings = {
-        "site_title": get_setting("site_title"),
-        "footer_text": get_setting("footer_text"),
-        "social_facebook": get_setting("social_facebook"),
-        "social_twitter": get_setting("social_twitter"),
-        # Add other settings here as needed
-    }
+    stored = get_settings()
+    settings = {key: stored.get(key) for key in EDITABLE_SETTINGS}
     return jsonify(settings), 200
 
-@app.route('/api/admin/settings', methods=['PUT'])
+@bp.route('/api/admin/settings', methods=['PUT'])
 @token_required
 def update_cms_settings():
     """
@@ -391,16 +730,19 @@ def update_cms_settings():
     if not data:
         return jsonify({'message': 'No data provided'}), 400
 
+    updates = {}
     for key, value in data.items():
         # Only allow specific keys to be updated
-        if key in ["site_title", "footer_text", "social_facebook", "social_twitter"]:
-            update_setting(key, value)
+        if key in EDITABLE_SETTINGS:
+            updates[key] = value
         else:
-            print(f"Attempted to update unauthorized setting key: {key}")
+            logger.warning("Attempted to update unauthorized setting key: %s", key)
+    if updates:
+        update_settings(updates)
 
     return jsonify({'message': 'CMS settings updated successfully'}), 200
 
-@app.route('/api/admin/register', methods=['POST'])
+@bp.route('/api/admin/register', methods=['POST'])
 def admin_register():
     """
     POST /api/admin/register
@@ -428,21 +770,16 @@ def admin_register():
 
     return jsonify({'message': 'Registration successful'}), 201
 
-@app.route('/api/admin/menus', methods=['GET'])
+@bp.route('/api/admin/menus', methods=['GET'])
 @token_required
 def get_menus():
     """
     GET /api/admin/menus
     Retrieves all menus. Requires authentication.
     """
-    menus = get_all_menus()
-    # Parse menu_data from JSON string back to Python object
-    for menu in menus:
-        if menu['menu_data']:
-            menu['menu_data'] = json.loads(menu['menu_data'])
-    return jsonify(menus), 200
+    return cached_json_response(cached_menus())
 
-@app.route('/api/admin/menus', methods=['POST'])
+@bp.route('/api/admin/menus', methods=['POST'])
 @token_required
 def add_menu():
     """
@@ -456,27 +793,25 @@ def add_menu():
     if not name:
         return jsonify({'message': 'Menu name is required'}), 400
 
-    if get_menu_by_name(name):
+    if cached_menu(name).document is not None:
         return jsonify({'message': 'Menu with this name already exists'}), 409
 
     create_menu(name, menu_data)
     return jsonify({'message': 'Menu created successfully', 'name': name}), 201
 
-@app.route('/api/admin/menus/<name>', methods=['GET'])
+@bp.route('/api/admin/menus/<name>', methods=['GET'])
 @token_required
 def get_single_menu(name):
     """
     GET /api/admin/menus/<name>
     Retrieves a single menu by name. Requires authentication.
     """
-    menu = get_menu_by_name(name)
-    if not menu:
+    entry = cached_menu(name)
+    if entry.document is None:
         return jsonify({'message': 'Menu not found'}), 404
-    if menu['menu_data']:
-        menu['menu_data'] = json.loads(menu['menu_data'])
-    return jsonify(menu), 200
+    return cached_json_response(entry)
 
-@app.route('/api/admin/menus/<name>', methods=['PUT'])
+@bp.route('/api/admin/menus/<name>', methods=['PUT'])
 @token_required
 def update_single_menu(name):
     """
@@ -493,7 +828,7 @@ def update_single_menu(name):
         return jsonify({'message': 'Menu updated successfully', 'name': name}), 200
     return jsonify({'message': 'Menu not found or no changes made'}), 404
 
-@app.route('/api/admin/menus/<name>', methods=['DELETE'])
+@bp.route('/api/admin/menus/<name>', methods=['DELETE'])
 @token_required
 def delete_single_menu(name):
     """
@@ -504,32 +839,47 @@ def delete_single_menu(name):
         return jsonify({'message': 'Menu deleted successfully', 'name': name}), 200
     return jsonify({'message': 'Menu not found'}), 404
 
-@app.route('/api/admin/login', methods=['POST'])
+@bp.route('/api/admin/login', methods=['POST'])
 def admin_login():
     """
     POST /api/admin/login
     Handles admin login. Checks username and hashed password.
-    Returns a JSON response with an access token on success.
+    Returns a JSON response with an access token on success. Attempts are throttled per
+    client address, per username and address, and per username for failed checks (429), and password checks run on a small dedicated
+    pool (503 when it is full), see backend/login_guard.py.
     """
     try:
         data = request.get_json(silent=True)
         if not data:
-            app.logger.error("Login attempt with no JSON data")
+            logger.error("Login attempt with no JSON data")
             return jsonify({'message': 'No login data provided'}), 400
 
         username = data.get('username')
         password = data.get('password')
 
         if not username or not password:
-            app.logger.error(f"Login attempt with missing credentials. Username: {username}, Password provided: {bool(password)}")
+            logger.error("Login attempt with missing credentials. Username: %s, Password provided: %s", username, bool(password))
             return jsonify({'message': 'Username and password are required'}), 400
 
+        from backend.login_guard import LoginBusy, LoginThrottled, login_guard
+        try:
+            login_guard.throttle(request.remote_addr or '', username)
+        except LoginThrottled as e:
+            logger.warning("Throttled login attempt for username: '%s' from %s", username, request.remote_addr)
+            return jsonify({'message': 'Too many login attempts, try again later'}), 429, {'Retry-After': str(e.retry_after)}
+
         conn = get_db()
         cursor = conn.cursor()
         cursor.execute("SELECT * FROM users WHERE username = ?", (username,))
         user = cursor.fetchone()
 
-        if user and check_password_hash(user[2], password):
+        try:
+            password_ok = user is not None and login_guard.check_password(user[2], password)
+        except LoginBusy:
+            logger.warning("Login check pool is full; refused attempt for username: '%s'", username)
+            return jsonify({'message': 'Too many login attempts in progress, try again shortly'}), 503, {'Retry-After': '1'}
+
+        if password_ok:
             session['username'] = username
             token = secrets.token_hex(32)
             cursor.execute("UPDATE users SET token = ? WHERE username = ?", (token, username))
@@ -537,32 +887,29 @@ def admin_login():
             conn.close()
 
             session['adminToken'] = token
-            app.logger.info(f"User '{username}' logged in successfully.")
+            logger.info("User '%s' logged in successfully.", username)
             return jsonify({'message': 'Login successful', 'access_token': token}), 200
         else:
-            app.logger.warning(f"Failed login attempt for username: '{username}'. Invalid credentials.")
+            logger.warning("Failed login attempt for username: '%s'. Invalid credentials.", username)
+            login_guard.failed(username)
             conn.close()
             return jsonify({'message': 'Invalid credentials'}), 401
 
     except Exception as e:
-        app.logger.exception(f"An unexpected error occurred during login: {e}")
+        logger.exception("An unexpected error occurred during login: %s", e)
         # Always return JSON, never HTML
         return jsonify({'message': 'An internal server error occurred', 'error': str(e)}), 500
 
-@app.route('/api/admin/widgets', methods=['GET'])
+@bp.route('/api/admin/widgets', methods=['GET'])
 @token_required
 def get_widgets():
     """
     GET /api/admin/widgets
     Retrieves all widgets. Requires authentication.
     """
-    widgets = get_all_widgets()
-    for widget in widgets:
-        if widget['widget_data']:
-            widget['widget_data'] = json.loads(widget['widget_data'])
-    return jsonify(widgets), 200
+    return cached_json_response(cached_widgets())
 
-@app.route('/api/admin/widgets', methods=['POST'])
+@bp.route('/api/admin/widgets', methods=['POST'])
 @token_required
 def add_widget():
     """
@@ -577,27 +924,25 @@ def add_widget():
     if not name or not widget_type:
         return jsonify({'message': 'Widget name and type are required'}), 400
 
-    if get_widget_by_name(name):
+    if cached_widget(name).document is not None:
         return jsonify({'message': 'Widget with this name already exists'}), 409
 
     create_widget(name, widget_type, widget_data)
     return jsonify({'message': 'Widget created successfully', 'name': name}), 201
 
-@app.route('/api/admin/widgets/<name>', methods=['GET'])
+@bp.route('/api/admin/widgets/<name>', methods=['GET'])
 @token_required
 def get_single_widget(name):
     """
     GET /api/admin/widgets/<name>
     Retrieves a single widget by name. Requires authentication.
     """
-    widget = get_widget_by_name(name)
-    if not widget:
+    entry = cached_widget(name)
+    if entry.document is None:
         return jsonify({'message': 'Widget not found'}), 404
-    if widget['widget_data']:
-        widget['widget_data'] = json.loads(widget['widget_data'])
-    return jsonify(widget), 200
+    return cached_json_response(entry)
 
-@app.route('/api/admin/widgets/<name>', methods=['PUT'])
+@bp.route('/api/admin/widgets/<name>', methods=['PUT'])
 @token_required
 def update_single_widget(name):
     """
@@ -615,7 +960,7 @@ def update_single_widget(name):
         return jsonify({'message': 'Widget updated successfully', 'name': name}), 200
     return jsonify({'message': 'Widget not found or no changes made'}), 404
 
-@app.route('/api/admin/widgets/<name>', methods=['DELETE'])
+@bp.route('/api/admin/widgets/<name>', methods=['DELETE'])
 @token_required
 def delete_single_widget(name):
     """
@@ -626,7 +971,143 @@ def delete_single_widget(name):
         return jsonify({'message': 'Widget deleted successfully', 'name': name}), 200
     return jsonify({'message': 'Widget not found'}), 404
 
-@app.route('/api/admin/pages', methods=['POST'])
+@bp.route('/api/admin/metrics', methods=['GET'])
+@token_required
+def get_metrics():
+    """
+    GET /api/admin/metrics
+    Request latency histograms, status counts, in-flight requests and cache hit ratios of
+    this worker, in Prometheus text format. Requires authentication.
+    """
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@bp.route('/api/admin/bundle', methods=['POST'])
+@token_required
+def publish_bundle():
+    """
+    POST /api/admin/bundle
+    Compiles the published handbook into the site bundle (SITE_BUNDLE). Every worker
+    switches to it on its next request. Requires authentication.
+    """
+    path = current_app.config['SITE_BUNDLE']
+    if not path:
+        return jsonify({'message': 'No site bundle is configured (set SITE_BUNDLE)'}), 400
+    from backend.bundle import compile_bundle
+    index = compile_bundle(current_app.config['DATABASE'], path)
+    return jsonify({'message': 'Site bundle published', 'pages': len(index['pages']),
+                    'revisions': index['revisions']}), 200
+
+# Browsers may reuse public menus/widgets this long before revalidating with the ETag
+PUBLIC_DOCUMENT_MAX_AGE = 60
+
+@bp.route('/api/menus/<name>', methods=['GET'])
+def get_public_menu(name):
+    """
+    GET /api/menus/<name>
+    Public read of a menu, served from the decoded-document cache.
+    """
+    entry = cached_menu(name)
+    if entry.document is None:
+        return jsonify({'message': 'Menu not found'}), 404
+    return cached_json_response(entry, max_age=PUBLIC_DOCUMENT_MAX_AGE)
+
+@bp.route('/api/widgets/<name>', methods=['GET'])
+def get_public_widget(name):
+    """
+    GET /api/widgets/<name>
+    Public read of a widget, served from the decoded-document cache.
+    """
+    entry = cached_widget(name)
+    if entry.document is None:
+        return jsonify({'message': 'Widget not found'}), 404
+    return cached_json_response(entry, max_age=PUBLIC_DOCUMENT_MAX_AGE)
+
+DEFAULT_PAGE_LIST_FIELDS = ['id', 'title', 'slug', 'published', 'is_chapter', 'parent_id']
+MAX_PAGE_LIST_LIMIT = 200
+
+@bp.route('/api/admin/pages', methods=['GET'])
+@token_required
+def list_pages():
+    """
+    GET /api/admin/pages?sort=title|created_at&after=<cursor>&limit=50&published=1&parent=<id>&is_chapter=1&fields=id,title
+    Lists pages, drafts included, one page of results at a time using keyset pagination.
+    Pass the returned next_cursor as `after` to fetch the following page. An empty `parent`
+    lists top-level pages. Requires authentication.
+    """
+    conn = get_db()
+    columns = get_page_columns(conn)
+
+    sort = request.args.get('sort', 'title')
+    if sort not in PAGE_SORT_KEYS or sort not in columns:
+        return jsonify({'message': f"Invalid sort key: {sort}"}), 400
+
+    fields_arg = request.args.get('fields')
+    if fields_arg:
+        fields = [field.strip() for field in fields_arg.split(',') if field.strip()]
+    else:
+        fields = [field for field in DEFAULT_PAGE_LIST_FIELDS if field in columns]
+    unknown_fields = [field for field in fields if field not in columns]
+    if unknown_fields:
+        return jsonify({'message': f"Unknown fields: {', '.join(unknown_fields)}"}), 400
+
+    try:
+        limit = min(max(int(request.args.get('limit', 50)), 1), MAX_PAGE_LIST_LIMIT)
+    except ValueError:
+        return jsonify({'message': 'Invalid limit'}), 400
+    try:
+        published = parse_bool_arg(request.args.get('published'))
+        is_chapter = parse_bool_arg(request.args.get('is_chapter'))
+        after = request.args.get('after')
+        after = decode_cursor(after) if after else None
+    except ValueError as e:
+        # parse_bool_arg and decode_cursor raise with messages meant for the client
+        return jsonify({'message': str(e)}), 400
+
+    parent_arg = request.args.get('parent')
+    pages, next_key = list_pages_db(conn, fields, sort=sort, after=after, limit=limit,
+                                    published=published, is_chapter=is_chapter,
+                                    parent_id=parent_arg or None, filter_parent=parent_arg is not None)
+
+    return jsonify({
+        'pages': pages,
+        'next_cursor': encode_cursor(next_key) if next_key else None,
+        'has_more': next_key is not None
+    }), 200
+
+@bp.route('/api/admin/pages/<page_id>', methods=['GET'])
+@token_required
+def get_admin_page(page_id):
+    """
+    GET /api/admin/pages/<page_id>
+    Returns every field of one page by its ID, drafts included, for the edit form.
+    Requires authentication.
+    """
+    page = get_page_by_id_db(get_db(), page_id)
+    if not page:
+        return jsonify({'message': 'Page not found'}), 404
+    return jsonify(page), 200
+
+@bp.route('/api/admin/sidebar', methods=['GET'])
+@token_required
+def get_admin_sidebar():
+    """
+    GET /api/admin/sidebar?parent=<id>&depth=N
+    Like /api/sidebar?parent=<id>&depth=N, but drafts are included: the children of a page
+    (top level when `parent` is empty or absent) in sidebar order, nested N levels deep
+    (default 1), each with a child_count. Requires authentication.
+    """
+    try:
+        depth = int(request.args.get('depth') or 1)
+    except ValueError:
+        return jsonify({'message': 'Invalid depth'}), 400
+    depth = min(max(depth, 1), MAX_SIDEBAR_DEPTH)
+    conn = get_db()
+    parent_id = request.args.get('parent') or None
+    if parent_id and not get_page_by_id_db(conn, parent_id):
+        return jsonify({'message': 'Page not found'}), 404
+    return jsonify(get_subtree_db(conn, parent_id, depth, published_only=False)), 200
+
+@bp.route('/api/admin/pages', methods=['POST'])
 @token_required
 def add_page():
     """
@@ -669,7 +1150,7 @@ def add_page():
 
     return jsonify({'message': 'Page created successfully', 'page_id': page_id}), 201
 
-@app.route('/api/admin/pages/<slug>', methods=['PUT'])
+@bp.route('/api/admin/pages/<slug>', methods=['PUT'])
 @token_required
 def edit_page(slug):
     """
@@ -706,7 +1187,7 @@ def edit_page(slug):
     
     return jsonify({'message': 'Page updated successfully'}), 200
 
-@app.route('/api/admin/pages/<slug>', methods=['DELETE'])
+@bp.route('/api/admin/pages/<slug>', methods=['DELETE'])
 @token_required
 def delete_page(slug):
     """
@@ -722,7 +1203,7 @@ def delete_page(slug):
     delete_page_db(conn, page_to_delete['id'])
     return jsonify({'message': 'Page deleted successfully'}), 200
 
-@app.route('/api/admin/pages/<page_id>/visibility', methods=['PUT'])
+@bp.route('/api/admin/pages/<page_id>/visibility', methods=['PUT'])
 @token_required
 def toggle_page_visibility(page_id):
     """
@@ -750,7 +1231,7 @@ def toggle_page_visibility(page_id):
     
     return jsonify({'message': 'Page visibility updated successfully', 'published': published_status}), 200
 
-@app.route('/api/admin/sidebar/reorder', methods=['PUT'])
+@bp.route('/api/admin/sidebar/reorder', methods=['PUT'])
 @token_required
 def reorder_sidebar():
     """
@@ -772,19 +1253,206 @@ def reorder_sidebar():
             # Fetch existing page data to preserve all fields
             existing_page = get_page_by_id_db(conn, page_id)
             if existing_page:
-                update_page_db(conn, page_id, existing_page['title'], existing_page['slug'],
-                               existing_page['content'], existing_page['published'], existing_page['is_chapter'],
-                               parent_id, existing_page['design'], existing_page['meta_description'],
-                               existing_page['meta_keywords'], existing_page['custom_css'],
-                               existing_page['image'], existing_page['video'])
+                existing_page['parent_id'] = parent_id
+                batch_save_page(conn, existing_page)
             if 'children' in item and item['children']:
                 update_parent_ids_recursive(item['children'], page_id)
 
-    update_parent_ids_recursive(new_order_list)
+    # Apply the whole new structure in one transaction and one commit
+    try:
+        update_parent_ids_recursive(new_order_list)
+        conn.commit()
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.exception("Sidebar reorder failed: %s", e)
+        return jsonify({'message': 'A database error occurred. The sidebar order was not changed.'}), 500
 
     return jsonify({'message': 'Sidebar order updated successfully'}), 200
 
-@app.route('/api/admin/pages/<page_id>/design', methods=['PUT'])
+# --- Batch Operations ---
+
+MAX_BATCH_OPERATIONS = 1000
+# Page fields an 'update' operation may change
+PAGE_EDITABLE_FIELDS = ['title', 'slug', 'content', 'published', 'is_chapter', 'parent_id', 'design',
+                        'meta_description', 'meta_keywords', 'custom_css', 'placeholder_image', 'embedded_video']
+
+class BatchOperationError(Exception):
+    """Raised by a batch operation to abort the whole batch with an HTTP status and message."""
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+def batch_find_page(conn, op):
+    """Finds the page a batch operation targets, by 'id' or by 'slug'."""
+    if op.get('id'):
+        page = get_page_by_id_db(conn, op['id'])
+    elif op.get('slug'):
+        page = get_page_by_slug_db(conn, op['slug'])
+    else:
+        raise BatchOperationError(400, "Operation requires an 'id' or a 'slug'")
+    if not page:
+        raise BatchOperationError(404, 'Page not found')
+    return page
+
+def batch_resolve_parent(conn, op):
+    """Resolves the 'parent_id' or 'parent_slug' of an operation. Returns None for the top level."""
+    if op.get('parent_slug'):
+        parent = get_page_by_slug_db(conn, op['parent_slug'])
+    elif op.get('parent_id'):
+        parent = get_page_by_id_db(conn, op['parent_id'])
+    else:
+        return None
+    if not parent:
+        raise BatchOperationError(404, 'Parent page not found')
+    if not parent['is_chapter']:
+        raise BatchOperationError(400, 'Parent must be a chapter')
+    return parent['id']
+
+def batch_check_not_descendant(conn, page, parent_id):
+    """Refuses to put a page underneath itself (directly or through its own subtree)."""
+    ancestor_id = parent_id
+    seen = set()
+    while ancestor_id and ancestor_id not in seen:
+        if ancestor_id == page['id']:
+            raise BatchOperationError(400, 'Cannot move a page underneath itself')
+        seen.add(ancestor_id)
+        ancestor = get_page_by_id_db(conn, ancestor_id)
+        ancestor_id = ancestor['parent_id'] if ancestor else None
+
+def batch_check_flags(values):
+    """Refuses non-boolean 'published' / 'is_chapter' values, which would be stored as they are."""
+    if 'published' in values and not isinstance(values['published'], bool):
+        raise BatchOperationError(400, 'Invalid published status provided')
+    if 'is_chapter' in values and not isinstance(values['is_chapter'], bool):
+        raise BatchOperationError(400, 'Invalid is_chapter value provided')
+
+def batch_save_page(conn, page):
+    """Writes back every field of a page without committing."""
+    update_page_db(conn, page['id'], page['title'], page['slug'], page['content'], page['published'],
+                   page['is_chapter'], page['parent_id'], page['design'], page.get('meta_description'),
+                   page.get('meta_keywords'), page.get('custom_css'), page.get('placeholder_image'),
+                   page.get('embedded_video'), commit=False)
+
+def batch_create(conn, op):
+    title = op.get('title')
+    slug = op.get('slug')
+    if not title or not slug:
+        raise BatchOperationError(400, 'Title and slug are required')
+    batch_check_flags(op)
+    if get_page_by_slug_db(conn, slug):
+        raise BatchOperationError(409, 'Slug already exists. Please choose a unique slug.')
+
+    page_id = str(uuid.uuid4())
+    add_page_db(conn,
+                page_id=page_id,
+                title=title,
+                slug=slug,
+                content=op.get('content'),
+                published=op.get('published', True),
+                is_chapter=op.get('is_chapter', False),
+                parent_id=batch_resolve_parent(conn, op),
+                design=op.get('design', {}),
+                meta_description=op.get('meta_description', ''),
+                meta_keywords=op.get('meta_keywords', ''),
+                custom_css=op.get('custom_css', ''),
+                placeholder_image=op.get('placeholder_image'),
+                embedded_video=op.get('embedded_video'),
+                commit=False)
+    return 201, {'page_id': page_id}
+
+def batch_update(conn, op):
+    page = batch_find_page(conn, op)
+    data = op.get('data')
+    if not isinstance(data, dict):
+        raise BatchOperationError(400, "Update requires a 'data' object")
+    new_slug = data.get('slug', page['slug'])
+    if new_slug != page['slug'] and get_page_by_slug_db(conn, new_slug):
+        raise BatchOperationError(409, 'New slug already exists. Please choose a unique slug.')
+    batch_check_flags(data)
+    for key in PAGE_EDITABLE_FIELDS:
+        if key in data:
+            page[key] = data[key]
+    if 'parent_id' in data:
+        # Same rules as a 'move': the parent must be an existing chapter outside the page's subtree
+        page['parent_id'] = batch_resolve_parent(conn, {'parent_id': data['parent_id']})
+        batch_check_not_descendant(conn, page, page['parent_id'])
+    batch_save_page(conn, page)
+    return 200, {'page_id': page['id']}
+
+def batch_delete(conn, op):
+    page = batch_find_page(conn, op)
+    delete_page_db(conn, page['id'], commit=False)
+    return 200, {'page_id': page['id']}
+
+def batch_visibility(conn, op):
+    page = batch_find_page(conn, op)
+    published_status = op.get('published')
+    if not isinstance(published_status, bool):
+        raise BatchOperationError(400, 'Invalid published status provided')
+    page['published'] = published_status
+    batch_save_page(conn, page)
+    return 200, {'page_id': page['id'], 'published': published_status}
+
+def batch_move(conn, op):
+    page = batch_find_page(conn, op)
+    parent_id = batch_resolve_parent(conn, op)
+    batch_check_not_descendant(conn, page, parent_id)
+    page['parent_id'] = parent_id
+    batch_save_page(conn, page)
+    return 200, {'page_id': page['id'], 'parent_id': parent_id}
+
+BATCH_HANDLERS = {
+    'create': batch_create,
+    'update': batch_update,
+    'delete': batch_delete,
+    'visibility': batch_visibility,
+    'move': batch_move,
+}
+
+@bp.route('/api/admin/batch', methods=['POST'])
+@token_required
+def run_batch():
+    """
+    POST /api/admin/batch
+    Runs an ordered list of page operations in a single transaction with one commit.
+    Body: {"operations": [{"op": "create|update|delete|visibility|move", ...}, ...]}
+    Pages are targeted by 'id' or 'slug'; parents by 'parent_id' or 'parent_slug'.
+    Either every operation is applied or, if one fails, none is. Requires authentication.
+    """
+    data = request.get_json(silent=True)
+    operations = data.get('operations') if isinstance(data, dict) else None
+    if not isinstance(operations, list) or not operations:
+        return jsonify({'message': 'A non-empty list of operations is required'}), 400
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return jsonify({'message': f'A batch may contain at most {MAX_BATCH_OPERATIONS} operations'}), 400
+
+    conn = get_db()
+    results = []
+    index = None
+    try:
+        # Take the write lock up front so reads inside the batch see a stable database
+        conn.execute('BEGIN IMMEDIATE')
+        for index, op in enumerate(operations):
+            handler = BATCH_HANDLERS.get(op.get('op')) if isinstance(op, dict) else None
+            if handler is None:
+                raise BatchOperationError(400, f"Unknown operation. Use one of: {', '.join(BATCH_HANDLERS)}")
+            status, body = handler(conn, op)
+            results.append({'index': index, 'op': op['op'], 'status': status, **body})
+        conn.commit()
+    except BatchOperationError as e:
+        conn.rollback()
+        return jsonify({'message': f'Operation {index} failed: {e.message}. No changes were applied.',
+                        'failed_index': index, 'results': results}), e.status
+    except sqlite3.Error as e:
+        conn.rollback()
+        logger.exception("Batch failed at operation %d: %s", index, e)
+        return jsonify({'message': 'A database error occurred. No changes were applied.',
+                        'failed_index': index, 'error': str(e)}), 500
+
+    return jsonify({'message': 'Batch applied successfully', 'results': results}), 200
+
+@bp.route('/api/admin/pages/<page_id>/design', methods=['PUT'])
 @token_required
 def update_page_design(page_id):
     """
@@ -816,12 +1484,41 @@ def update_page_design(page_id):
     
     return jsonify({'message': 'Page design updated successfully', 'design': design}), 200
 
-@app.route('/api/admin/upload', methods=['POST'])
+@bp.route('/api/admin/export', methods=['GET'])
+@token_required
+def export_pages():
+    """
+    GET /api/admin/export?format=ndjson|json&gzip=1&published_only=1
+    Streams every page in tree order, either as NDJSON or as nested JSON in the
+    data/pages.json shape. Requires authentication.
+    """
+    from backend.export import EXPORT_FORMATS, iter_export  # Admin only; not loaded by public workers
+    fmt = request.args.get('format', 'ndjson')
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'message': f"Invalid format. Use one of: {', '.join(EXPORT_FORMATS)}"}), 400
+    use_gzip = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+    published_only = request.args.get('published_only', '').lower() in ('1', 'true', 'yes')
+
+    filename = f"handbook-export-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    if use_gzip:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+    else:
+        mimetype = 'application/x-ndjson' if fmt == 'ndjson' else 'application/json'
+
+    stream = iter_export(current_app.config['DATABASE'], fmt, gzip=use_gzip, published_only=published_only)
+    response = Response(stream, mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@bp.route('/api/admin/upload', methods=['POST'])
 @token_required
 def upload_image():
     """
     POST /api/admin/upload
-    Handles image uploads to the public/uploads directory. Requires authentication.
+    Handles image and video uploads to the public/uploads directory. Files are stored under
+    their content hash, so uploading the same file again returns the existing path.
+    Requires authentication.
     """
     if 'file' not in request.files:
         return jsonify({'message': 'No file part in the request'}), 400
@@ -831,89 +1528,271 @@ def upload_image():
         return jsonify({'message': 'No selected file'}), 400
 
     if file:
-        # Secure filename and save
-        filename = str(uuid.uuid4()) + os.path.splitext(file.filename)[1]
-        filepath = os.path.join(UPLOADS_DIR, filename)
-        file.save(filepath)
+        from backend.images import enqueue_derivatives
+        from backend.uploads import store_upload
+        relative_path = store_upload(file, current_app.config['UPLOADS_DIR'])
+        # Resized and WebP variants are produced in the background
+        enqueue_derivatives(current_app.config['DATABASE'], current_app.config['UPLOADS_DIR'], relative_path, logger)
         # Return the public URL for the uploaded file
-        return jsonify({'message': 'File uploaded successfully', 'file_path': f'/uploads/{filename}'}), 200
+        return jsonify({'message': 'File uploaded successfully', 'file_path': f'/uploads/{relative_path}'}), 200
     return jsonify({'message': 'File upload failed'}), 500
 
-@app.route('/admin')
-def serve_admin():
+# --- Chunked, resumable uploads ---
+# For large files (onboarding videos): POST to start a session, PUT each chunk with a
+# Content-Range header, then POST .../complete. After a dropped connection, GET the session
+# and resume from the returned offset.
+
+def upload_session_error(e):
+    body = {'message': e.message}
+    if e.offset is not None:
+        body['offset'] = e.offset
+    return jsonify(body), e.status
+
+@bp.route('/api/admin/uploads', methods=['POST'])
+@token_required
+def start_upload():
     """
-    Serves the admin.html file from the public directory.
+    POST /api/admin/uploads
+    Starts a chunked upload. Expects {"filename": ..., "size": <bytes>}.
+    Requires authentication.
     """
-    return send_from_directory('../public', 'admin.html')
+    data = request.get_json(silent=True) or {}
+    from backend.uploads import UploadSessionError, start_chunked_upload
+    try:
+        upload = start_chunked_upload(current_app.config['UPLOADS_DIR'], data.get('filename'), data.get('size'))
+    except UploadSessionError as e:
+        return upload_session_error(e)
+    return jsonify(upload), 201
+
+@bp.route('/api/admin/uploads/<upload_id>', methods=['GET'])
+@token_required
+def get_upload(upload_id):
+    """
+    GET /api/admin/uploads/<upload_id>
+    Returns how many bytes of a chunked upload have been received. Requires authentication.
+    """
+    from backend.uploads import UploadSessionError, get_chunked_upload
+    try:
+        return jsonify(get_chunked_upload(current_app.config['UPLOADS_DIR'], upload_id)), 200
+    except UploadSessionError as e:
+        return upload_session_error(e)
 
+@bp.route('/api/admin/uploads/<upload_id>', methods=['PUT'])
+@token_required
+def append_upload(upload_id):
+    """
+    PUT /api/admin/uploads/<upload_id>
+    Appends the raw request body at the position given by 'Content-Range: bytes start-end/total'.
+    The body is streamed to disk. Requires authentication.
+    """
+    from backend.uploads import UploadSessionError, parse_content_range, append_chunk
+    try:
+        start, end = parse_content_range(request.headers.get('Content-Range'))
+        offset = append_chunk(current_app.config['UPLOADS_DIR'], upload_id, start, end, request.stream)
+    except UploadSessionError as e:
+        return upload_session_error(e)
+    return jsonify({'upload_id': upload_id, 'offset': offset}), 200
 
-# Upload folder
-UPLOAD_FOLDER = os.path.join("public", "static", "uploads")
-os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+@bp.route('/api/admin/uploads/<upload_id>/complete', methods=['POST'])
+@token_required
+def complete_upload(upload_id):
+    """
+    POST /api/admin/uploads/<upload_id>/complete
+    Verifies and stores a fully received chunked upload. Requires authentication.
+    """
+    from backend.images import enqueue_derivatives
+    from backend.uploads import UploadSessionError, complete_chunked_upload
+    try:
+        relative_path = complete_chunked_upload(current_app.config['UPLOADS_DIR'], upload_id)
+    except UploadSessionError as e:
+        return upload_session_error(e)
+    enqueue_derivatives(current_app.config['DATABASE'], current_app.config['UPLOADS_DIR'], relative_path, logger)
+    return jsonify({'message': 'File uploaded successfully', 'file_path': f'/uploads/{relative_path}'}), 200
 
-# Allowed file types
-ALLOWED_EXTENSIONS = {"png", "jpg", "jpeg", "gif", "mp4", "mov", "avi"}
+@bp.route('/api/admin/uploads/<upload_id>', methods=['DELETE'])
+@token_required
+def abort_upload(upload_id):
+    """
+    DELETE /api/admin/uploads/<upload_id>
+    Cancels a chunked upload and discards the received bytes. Requires authentication.
+    """
+    from backend.uploads import UploadSessionError, abort_chunked_upload
+    try:
+        abort_chunked_upload(current_app.config['UPLOADS_DIR'], upload_id)
+    except UploadSessionError as e:
+        return upload_session_error(e)
+    return jsonify({'message': 'Upload cancelled'}), 200
 
-def allowed_file(filename):
-    return "." in filename and filename.rsplit(".", 1)[1].lower() in ALLOWED_EXTENSIONS
+@bp.route('/uploads/<path:filename>')
+def serve_upload(filename):
+    """
+    Serves uploaded media. Range requests are answered with 206 Partial Content, so videos
+    can start playing and seek without downloading the whole file. Stored files are named
+    by their content hash and never change, so they can be cached indefinitely.
+    """
+    from backend.uploads import STAGING_DIR_NAME
+    # Normalized first, so './.staging/...' or 'ab/../.staging/...' cannot reach unfinished uploads
+    if os.path.normpath(filename).split(os.sep)[0] == STAGING_DIR_NAME:
+        return jsonify({'message': 'Not found'}), 404
+    # Files from before content-addressed storage sit directly in uploads/ and may be replaced
+    max_age = 31536000 if '/' in filename else None
+    return send_from_directory(current_app.config['UPLOADS_DIR'], filename, conditional=True, max_age=max_age)
+
+@bp.route('/admin')
+def serve_admin():
+    """
+    Serves the admin.html file from the public directory.
+    """
+    return send_from_directory('../public', 'admin.html')
 
-@app.route("/admin_panel", methods=["GET", "POST"])
+
+@bp.route("/admin_panel", methods=["GET", "POST"])
 def admin_panel():
     if request.method == "POST":
+        from backend.images import enqueue_derivatives
+        from backend.uploads import allowed_file, store_upload
         # Handle uploaded image
         image_file = request.files.get("placeholder_image")
         saved_image_url = None
         if image_file and allowed_file(image_file.filename):
-            filename = secure_filename(image_file.filename)
-            image_path = os.path.join(UPLOAD_FOLDER, filename)
-            image_file.save(image_path)
-            saved_image_url = f"/static/uploads/{filename}"
+            relative_path = store_upload(image_file, current_app.config['UPLOADS_DIR'])
+            enqueue_derivatives(current_app.config['DATABASE'], current_app.config['UPLOADS_DIR'], relative_path, logger)
+            saved_image_url = f"/uploads/{relative_path}"
 
         # Handle uploaded video
         video_file = request.files.get("embedded_video")
         saved_video_url = None
         if video_file and allowed_file(video_file.filename):
-            filename = secure_filename(video_file.filename)
-            video_path = os.path.join(UPLOAD_FOLDER, filename)
-            video_file.save(video_path)
-            saved_video_url = f"/static/uploads/{filename}"
+            saved_video_url = f"/uploads/{store_upload(video_file, current_app.config['UPLOADS_DIR'])}"
 
         # TODO: Save saved_image_url and saved_video_url to DB instead of just printing
-        print("Image uploaded at:", saved_image_url)
-        print("Video uploaded at:", saved_video_url)
+        logger.info("Image uploaded at: %s", saved_image_url)
+        logger.info("Video uploaded at: %s", saved_video_url)
 
-        return redirect(url_for("admin_panel"))
+        return redirect(url_for(".admin_panel"))
 
     # For GET request → render your HTML
     return send_from_directory("/public", "admin_panel.html")
 
-@app.route('/')
+@bp.route('/')
 def serve_index():
     """
     Serves the main index.html file from the public/pages directory.
     """
-    return send_from_directory(os.path.join(app.static_folder, 'pages'), 'index.html')
+    return send_from_directory(os.path.join(current_app.static_folder, 'pages'), 'index.html')
 
-@app.route('/pages/<path:filename>')
+@bp.route('/pages/<path:filename>')
 def serve_static_page(filename):
     """
-    Serves static HTML pages from the public/pages directory.
+    Serves static HTML pages from the public/pages directory. Paths that are not in the
+    directory's listing get the cached 404 page without a filesystem lookup.
     """
-    return send_from_directory(os.path.join(app.static_folder, 'pages'), filename)
+    paths, _ = get_static_pages()
+    if filename not in paths:
+        return page_not_found(None)
+    return send_from_directory(os.path.join(current_app.static_folder, 'pages'), filename)
 
 # Example 301 Redirect (uncomment and modify as needed)
-# @app.route('/old-placeholder-url')
+# @bp.route('/old-placeholder-url')
 # def old_url_redirect():
 #     return redirect('/pages/new-page-slug.html', code=301)
 
-@app.errorhandler(404)
+@bp.app_errorhandler(413)
+def request_too_large(e):
+    """
+    Rejected uploads (body or file over the size limit) get a JSON error.
+    """
+    return jsonify({'message': e.description}), 413
+
+@bp.app_errorhandler(415)
+def unsupported_media_type(e):
+    """
+    Rejected uploads (disallowed or mislabelled file type) get a JSON error.
+    """
+    return jsonify({'message': e.description}), 415
+
+@bp.app_errorhandler(404)
 def page_not_found(e):
     """
-    Custom 404 error handler.
+    Custom 404 error handler. Sends public/pages/404.html, cached until the directory changes.
+    """
+    _, body = get_static_pages()
+    if body is not None:
+        return Response(body, status=404, mimetype='text/html')
+    return send_from_directory(os.path.join(current_app.static_folder, 'pages'), '404.html'), 404
+
+# --- Application factory ---
+
+class LazyUploadRequest(Request):
+    """
+    Streams uploaded files into the uploads staging area like backend.uploads.UploadRequest,
+    importing backend/uploads.py only once a request actually carries a file.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        from backend.uploads import UploadRequest
+        return UploadRequest._get_file_stream(self, total_content_length, content_type, filename, content_length)
+
+def warm_caches(app):
+    """
+    Fills the settings, menu, widget, page tree and sanitized content caches and copies the
+    read replica. Called before the workers fork (see backend/wsgi.py) so they start with the
+    caches shared copy-on-write.
+    """
+    with app.app_context():
+        get_settings()
+        cached_menus()
+        cached_widgets()
+        snapshot = get_tree_snapshot()
+        published = [page for page in snapshot.pages if page['published'] and page['content']]
+        for page in published[:sanitized_content.maxsize]:
+            sanitized_content.get(page['id'], page['content'])
+        logger.info("Caches warmed: %d pages, %d sanitized", len(snapshot.pages),
+                    min(len(published), sanitized_content.maxsize))
+
+def create_app(config=None, warm=False):
+    """
+    Builds the Flask app. config overrides app.config (e.g. {'DATABASE': path});
+    warm=True fills the in-process caches before returning.
     """
-    return send_from_directory(os.path.join(app.static_folder, 'pages'), '404.html'), 404
+    configure_logging()
+    app = Flask(__name__, static_folder='/public', static_url_path='/public')
+    # Enable CORS for all origins. In a production environment, you should restrict this
+    # to specific origins (e.g., your frontend URL).
+    CORS(app)
+    app.config['SECRET_KEY'] = 'somabay_handbook' # Used for session management
+    # Overridable (e.g. by benchmarks) to point the app at another database file
+    app.config['DATABASE'] = DATABASE
+    app.config['UPLOADS_DIR'] = UPLOADS_DIR
+    app.config['READ_REPLICA'] = read_replica_enabled()
+    # Compiled site bundle to serve published pages from (see backend/bundle.py); off when empty
+    app.config['SITE_BUNDLE'] = os.environ.get('SITE_BUNDLE', '')
+    # Uploaded files are streamed straight into the uploads staging area (see backend/uploads.py),
+    # and bodies larger than the biggest allowed file are refused before they are read.
+    app.request_class = LazyUploadRequest
+    app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_SIZE
+    app.config.update(config or {})
+    # orjson when it is installed (see backend/json_provider.py)
+    app.json = FastJSONProvider(app)
+
+    os.makedirs(app.config['UPLOADS_DIR'], exist_ok=True)
+    app.register_blueprint(bp)
+    app.teardown_appcontext(close_connection)
+    if warm:
+        warm_caches(app)
+    return app
+
+_default_app = None
+
+def __getattr__(name):
+    # 'from backend.app import app' builds a default app on first use instead of at import time
+    global _default_app
+    if name == 'app':
+        if _default_app is None:
+            _default_app = create_app()
+        return _default_app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # --- Run the Flask app ---
 if __name__ == '__main__':
     # This is for development only. In production, use a WSGI server like Gunicorn.
-    app.run(debug=True, port=5000)
+    create_app().run(debug=True, port=5000)
@@ -0,0 +1,227 @@
+# backend/asgi.py
+# ASGI application for the public read API: /api/sidebar, /api/sidebar/changes,
+# /api/pages/<slug> and /api/search.
+# The event loop only parses requests and writes responses. SQLite reads and bleach
+# sanitizing run in a bounded thread pool, so one process can hold thousands of idle
+# keep-alive connections while a few threads do the work. Once MAX_PENDING requests are
+# waiting for a thread, new ones get 503 instead of queueing without limit.
+# Responses are the same as the Flask views (both call read_sidebar/read_page/read_search in
+# backend/app.py). Admin routes stay on the WSGI app (backend/wsgi.py); route /api/admin/*
+# there at the proxy.
+#   uvicorn backend.asgi:app --port 5001
+#
+# Environment variables:
+#   DATABASE            SQLite file to read (default: site.db)
+#   ASGI_READ_THREADS   threads running reads (default: 8)
+#   ASGI_MAX_PENDING    requests allowed to wait for a thread (default: 1000)
+#   READ_REPLICA        set to 0 to read site.db instead of the in-memory replica (backend/replica.py)
+#   SITE_BUNDLE         compiled site bundle to serve published pages from (backend/bundle.py)
+#   COMPRESSION_MIN_SIZE  smallest body sent gzip/brotli compressed (backend/compression.py, default 1024)
+
+import os
+import time
+import asyncio
+import sqlite3
+import threading
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+
+from backend import sqltrace
+from backend.app import read_sidebar, read_page, read_search, sanitized_content, read_replica_enabled, get_read_replica, serialized
+from backend.app import read_sidebar_changes, parse_since, sidebar_changes_key, SINCE_REQUIRED, PAGE_NOT_FOUND_BODY
+from backend.bundle import get_bundle_holder
+from backend.compression import response_bodies, negotiate_encoding
+from backend.database import get_all_pages_db
+from backend.json_provider import encode_json
+from backend.log import configure_logging, get_logger
+from backend.metrics import metrics
+from backend.migrations import migrate
+from backend.replica import replica_key
+from backend.revisions import get_revisions
+from backend.snapshot import tree_cache
+
+configure_logging()
+logger = get_logger(__name__)
+
+READ_THREADS = int(os.environ.get('ASGI_READ_THREADS', '8'))
+MAX_PENDING = int(os.environ.get('ASGI_MAX_PENDING', '1000'))
+
+class PublicReadApp:
+    def __init__(self, db_path=None, read_threads=READ_THREADS, max_pending=MAX_PENDING):
+        self.db_path = db_path or os.environ.get('DATABASE', 'site.db')
+        self.max_pending = max_pending
+        self.pending = 0  # Only touched from the event loop
+        self.executor = ThreadPoolExecutor(read_threads, thread_name_prefix='public-read')
+        self._local = threading.local()
+        self._migrate_lock = threading.Lock()
+        self._migrated = False
+        self.replica = get_read_replica(self.db_path) if read_replica_enabled() else None
+        bundle_path = os.environ.get('SITE_BUNDLE')
+        self.bundle = get_bundle_holder(bundle_path) if bundle_path else None
+
+    # --- Reads (run in the thread pool) ---
+
+    def _connection(self):
+        """One connection per pool thread, kept open between requests."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqltrace.connect(self.db_path)
+            conn.row_factory = sqlite3.Row
+            with self._migrate_lock:
+                if not self._migrated:
+                    migrate(conn)
+                    self._migrated = True
+        return conn
+
+    def _read_connection(self, revisions):
+        """
+        Connection to read public data from, and the revisions that data is at. With the
+        replica, each pool thread keeps one connection to the current generation.
+        """
+        if self.replica is None:
+            return self._connection(), revisions
+        generation = self.replica.current(revisions)
+        cached = getattr(self._local, 'replica', None)
+        if cached is None or cached[0] is not generation:
+            if cached is not None:
+                cached[1].close()
+            cached = self._local.replica = (generation, generation.connect())
+        return cached[1], generation.revisions
+
+    def _snapshot(self, conn, revisions):
+        return tree_cache.get(revisions.get('pages', 0), lambda: get_all_pages_db(conn))
+
+    def read(self, route, path_arg, args, encoding=None):
+        """
+        Returns (JSON body bytes, status, content encoding or None). Whole-sidebar and page
+        bodies are compressed to encoding once per revision and then served from the cache.
+        """
+        disk = self._connection()
+        revisions = get_revisions(disk)
+        if disk.in_transaction:
+            disk.commit()  # Do not hold a read transaction open between requests
+        bundle = self.bundle.current(revisions) if self.bundle is not None else None
+        if bundle is not None:
+            # Pre-serialized, pre-compressed bodies, sent without passing through the body cache;
+            # anything not in the bundle falls through to the database
+            if route == 'sidebar' and not args:
+                body, content_encoding = bundle.sidebar(encoding)
+                return bytes(body), 200, content_encoding
+            if route == 'page' and path_arg in bundle:
+                body, content_encoding = bundle.page(path_arg, encoding)
+                return bytes(body), 200, content_encoding
+        conn, revisions = self._read_connection(revisions)
+        key = replica_key(revisions)
+        if route == 'sidebar':
+            return response_bodies.respond(
+                ('sidebar', key) if not args else None, encoding,
+                lambda: serialized(read_sidebar(conn, lambda: self._snapshot(conn, revisions),
+                                                args.get('parent'), args.get('depth'))))
+        if route == 'changes':
+            since = parse_since(args.get('since'))
+            if since is None:
+                return encode_json(SINCE_REQUIRED), 400, None
+            return response_bodies.respond(
+                sidebar_changes_key(since, revisions), encoding,
+                lambda: serialized(read_sidebar_changes(conn, lambda: self._snapshot(conn, revisions), revisions, since)))
+        if route == 'page':
+            snapshot = self._snapshot(conn, revisions)
+            if path_arg not in snapshot.published_slugs:
+                return PAGE_NOT_FOUND_BODY, 404, None
+            return response_bodies.respond(('page', path_arg, key), encoding,
+                                           lambda: serialized(read_page(conn, snapshot, path_arg)))
+        body, status = serialized(read_search(self._snapshot(conn, revisions), args.get('q'), args.get('limit')))
+        return body, status, None
+
+    def warm(self):
+        """Copies the read replica, builds the page tree and sanitizes published pages, like create_app(warm=True)."""
+        conn, revisions = self._read_connection(get_revisions(self._connection()))
+        snapshot = self._snapshot(conn, revisions)
+        published = [page for page in snapshot.pages if page['published'] and page['content']]
+        for page in published[:sanitized_content.maxsize]:
+            sanitized_content.get(page['id'], page['content'])
+
+    # --- ASGI ---
+
+    @staticmethod
+    def route(path):
+        """Returns (route name, route pattern, path argument), or None for unknown paths."""
+        if path == '/api/sidebar':
+            return 'sidebar', '/api/sidebar', None
+        if path == '/api/sidebar/changes':
+            return 'changes', '/api/sidebar/changes', None
+        if path == '/api/search':
+            return 'search', '/api/search', None
+        if path.startswith('/api/pages/'):
+            slug = path[len('/api/pages/'):]
+            if slug and '/' not in slug:
+                return 'page', '/api/pages/<slug>', slug
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+        started = time.perf_counter()
+        method = scope['method']
+        matched = self.route(scope['path'])
+        headers = []
+        content_encoding = None
+        if matched is None:
+            pattern = '<unmatched>'
+            body, status = {'message': 'Not found'}, 404
+        elif method not in ('GET', 'HEAD'):
+            pattern = matched[1]
+            body, status = {'message': 'Method not allowed'}, 405
+            headers.append((b'allow', b'GET, HEAD'))
+        elif self.pending >= self.max_pending:
+            pattern = matched[1]
+            body, status = {'message': 'Server busy, try again shortly'}, 503
+            headers.append((b'retry-after', b'1'))
+        else:
+            route, pattern, path_arg = matched
+            query = parse_qs(scope.get('query_string', b'').decode('utf-8', 'replace'), keep_blank_values=True)
+            args = {key: values[0] for key, values in query.items()}
+            encoding = None
+            for name, value in scope['headers']:
+                if name == b'accept-encoding':
+                    encoding = negotiate_encoding(value.decode('latin-1'))
+            headers.append((b'vary', b'accept-encoding'))
+            self.pending += 1
+            try:
+                body, status, content_encoding = await asyncio.get_running_loop().run_in_executor(
+                    self.executor, self.read, route, path_arg, args, encoding)
+            except Exception:
+                logger.exception("Public read failed: %s %s", method, scope['path'])
+                body, status = {'message': 'Internal server error'}, 500
+            finally:
+                self.pending -= 1
+
+        payload = body if isinstance(body, bytes) else encode_json(body)
+        if content_encoding is not None:
+            headers.append((b'content-encoding', content_encoding.encode('ascii')))
+        headers += [(b'content-type', b'application/json'), (b'content-length', str(len(payload)).encode('ascii')),
+                    (b'access-control-allow-origin', b'*')]
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': payload if method != 'HEAD' else b''})
+        metrics.observe(method, pattern, status, time.perf_counter() - started)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                try:
+                    await asyncio.get_running_loop().run_in_executor(self.executor, self.warm)
+                except Exception as e:
+                    logger.exception("Warm-up failed: %s", e)
+                    await send({'type': 'lifespan.startup.failed', 'message': str(e)})
+                    return
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+app = PublicReadApp()
@@ -0,0 +1,201 @@
+# backend/bundle.py
+# Compiled site bundle: the published sidebar and every published page's API response,
+# pre-serialized and pre-compressed into one file that worker processes memory-map.
+# Bodies are handed out as memoryview slices of the mapping, with no decoding, serializing
+# or compressing, and the file's pages live once in the OS page cache however many workers
+# map it. Nothing is copied into per-process caches: the servers need bytes, so a body is
+# copied once while its response is sent and then dropped. Publishing
+# writes a new file and renames it over the old one; workers notice the new file and swap
+# their mapping with a single assignment.
+# A bundle records the revisions it was compiled at and is only used while they are
+# current, so edits made after publishing are served from the database until the next publish.
+#
+#   python -m backend.bundle --db site.db -o site.bundle
+#
+# Layout: header (magic, format version, index offset, index length), then the bodies back
+# to back, then a JSON index {'revisions', 'sidebar': spans, 'pages': {slug: spans}} where
+# spans maps 'identity' and each encoding the body was compressed with to [offset, length].
+# Bodies below COMPRESSION_MIN_SIZE are only stored plain. The encodings are the ones the
+# compiling process could produce (brotli only when it was installed there).
+
+import os
+import mmap
+import json
+import struct
+import sqlite3
+import argparse
+import threading
+
+try:
+    from backend.log import configure_logging, get_logger
+    from backend.replica import replica_key
+    from backend.json_provider import encode_json
+    from backend.compression import COMPRESSION_MIN_SIZE, available_encodings, compress
+except ImportError:  # Run from inside backend/
+    from log import configure_logging, get_logger
+    from replica import replica_key
+    from json_provider import encode_json
+    from compression import COMPRESSION_MIN_SIZE, available_encodings, compress
+
+logger = get_logger(__name__)
+
+MAGIC = b'HBBUNDLE'
+FORMAT_VERSION = 2
+IDENTITY = 'identity'
+HEADER = struct.Struct('<8sIQQ')
+
+class BundleError(Exception):
+    pass
+
+# --- Compiling ---
+
+def compile_bundle(db_path, path):
+    """Writes the bundle for db_path to path atomically. Returns its index."""
+    from backend.app import read_sidebar, read_page
+    from backend.database import get_all_pages_db
+    from backend.revisions import get_revisions
+    from backend.snapshot import TreeSnapshot
+
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        conn.execute("BEGIN")  # One read transaction, so the revisions match the pages read
+        revisions = get_revisions(conn)
+        snapshot = TreeSnapshot(revisions.get('pages', 0), get_all_pages_db(conn))
+        index = {'revisions': revisions, 'pages': {}}
+        with open(tmp_path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, 0, 0))
+
+            def write(body):
+                offset = f.tell()
+                f.write(body)
+                return [offset, len(body)]
+
+            def append(body):
+                spans = {IDENTITY: write(body)}
+                if len(body) >= COMPRESSION_MIN_SIZE:
+                    for encoding in available_encodings():
+                        spans[encoding] = write(compress(body, encoding))
+                return spans
+
+            index['sidebar'] = append(encode_json(read_sidebar(conn, lambda: snapshot)[0]))
+            for page in snapshot.pages:
+                if page['slug'] in snapshot.published_slugs:
+                    body, _ = read_page(conn, snapshot, page['slug'])
+                    index['pages'][page['slug']] = append(encode_json(body))
+            index_offset = f.tell()
+            index_body = json.dumps(index, separators=(',', ':')).encode('utf-8')
+            f.write(index_body)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, index_offset, len(index_body)))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        conn.close()
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return index
+
+# --- Serving ---
+
+class Bundle:
+    """A bundle file mapped read-only. Slicing it reads straight from the page cache."""
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            self.identity = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, index_offset, index_length = HEADER.unpack_from(self._map)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise BundleError(f"{path} is not a version {FORMAT_VERSION} site bundle")
+        index = json.loads(self._map[index_offset:index_offset + index_length])
+        self.revisions = index['revisions']
+        self.key = replica_key(self.revisions)
+        self._sidebar = index['sidebar']
+        self._pages = index['pages']
+        self._view = memoryview(self._map)
+
+    def _slice(self, spans, encoding):
+        """(body, content encoding or None): the body compressed with encoding if it was stored, else plain."""
+        if encoding is not None and encoding in spans:
+            offset, length = spans[encoding]
+            return self._view[offset:offset + length], encoding
+        offset, length = spans[IDENTITY]
+        return self._view[offset:offset + length], None
+
+    def sidebar(self, encoding=None):
+        return self._slice(self._sidebar, encoding)
+
+    def page(self, slug, encoding=None):
+        """(body, content encoding or None) of the /api/pages/<slug> body of a published page, or None."""
+        spans = self._pages.get(slug)
+        return self._slice(spans, encoding) if spans is not None else None
+
+    def __contains__(self, slug):
+        return slug in self._pages
+
+    def __len__(self):
+        return len(self._pages)
+
+class BundleHolder:
+    """The current Bundle for one path, reloaded when the file is replaced."""
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._bundle = None
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self):
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            self._bundle = None
+            return None
+        bundle = self._bundle
+        if bundle is not None and bundle.identity == (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+            return bundle
+        with self._lock:
+            bundle = self._bundle
+            if bundle is None or bundle.identity != (stat.st_ino, stat.st_mtime_ns, stat.st_size):
+                try:
+                    # Mappings still in use by other threads stay valid until they drop them
+                    bundle = self._bundle = Bundle(self.path)
+                    logger.info("Loaded site bundle %s (%d pages)", self.path, len(bundle))
+                except (OSError, ValueError, KeyError, struct.error, BundleError) as e:
+                    logger.warning("Ignoring site bundle %s: %s", self.path, e)
+                    bundle = self._bundle = None
+        return bundle
+
+    def current(self, revisions):
+        """Returns the bundle if it was compiled at the given revisions, otherwise None."""
+        bundle = self._load()
+        if bundle is not None and bundle.key == replica_key(revisions):
+            self.hits += 1
+            return bundle
+        self.misses += 1
+        return None
+
+_holders = {}
+_holders_lock = threading.Lock()
+
+def get_bundle_holder(path):
+    with _holders_lock:
+        holder = _holders.get(path)
+        if holder is None:
+            holder = _holders[path] = BundleHolder(path)
+        return holder
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Compile the published handbook into a site bundle.")
+    parser.add_argument('--db', default='site.db', help="Path to the SQLite database (default: site.db)")
+    parser.add_argument('-o', '--output', default='site.bundle', help="Bundle file to write (default: site.bundle)")
+    args = parser.parse_args(argv)
+    configure_logging()
+    index = compile_bundle(args.db, args.output)
+    logger.info("Wrote %s: %d pages at revisions %s", args.output, len(index['pages']), index['revisions'])
+
+if __name__ == '__main__':
+    main()
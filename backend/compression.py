@@ -0,0 +1,124 @@
+# backend/compression.py
+# Public JSON response bodies, serialized and gzip/brotli compressed once per revision.
+# The sidebar and page bodies only change when a page or image is written, so each body is
+# encoded to JSON once, compressed once per encoding, and every later request sends the
+# cached bytes without rendering anything.
+# Entries are keyed by the route, its argument and the revisions the body was read at (see
+# replica_key in backend/replica.py); an edit moves the revisions, so old entries are never
+# served again and fall out of the LRU.
+# Brotli is optional: without the brotli package only gzip is offered.
+
+import os
+import gzip
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Bodies smaller than this are sent as they are; compressing them saves too little to matter
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', '1024'))
+# Bodies kept per process, plain and compressed together
+RESPONSE_CACHE_SIZE = 4096
+# Each body is compressed once per revision, so the slowest levels are affordable
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+def available_encodings():
+    """Encodings this process can produce, most preferred first."""
+    return ('br', 'gzip') if brotli is not None else ('gzip',)
+
+def negotiate_encoding(accept_encoding):
+    """
+    Picks the encoding to send for an Accept-Encoding header, or None for identity.
+    The highest q-value wins; ties go to the order of available_encodings().
+    """
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        name, _, params = part.strip().partition(';')
+        name = name.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        if name:
+            weights[name] = q
+    best, best_q = None, 0.0
+    for encoding in available_encodings():
+        q = weights.get(encoding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    # mtime=0 keeps the output identical between workers and runs
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+class ResponseBodyCache:
+    """LRU of response bodies keyed by (key, encoding); encoding None is the plain JSON body."""
+    def __init__(self, maxsize=RESPONSE_CACHE_SIZE, min_size=COMPRESSION_MIN_SIZE):
+        self.maxsize = maxsize
+        self.min_size = min_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, entry_key):
+        with self._lock:
+            body = self._entries.get(entry_key)
+            if body is not None:
+                self._entries.move_to_end(entry_key)
+            return body
+
+    def _put(self, entry_key, body):
+        with self._lock:
+            self._entries[entry_key] = body
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def respond(self, key, encoding, render):
+        """
+        Returns (body, status, content encoding or None) for a response. render() returns
+        (JSON bytes, status) and is only called when nothing usable is cached for key.
+        Only 200 responses are cached, and only bodies of min_size or more are compressed.
+        A key of None sends render() as it is.
+        """
+        if key is None:
+            body, status = render()
+            return body, status, None
+        if encoding is not None:
+            body = self._get((key, encoding))
+            if body is not None:
+                self.hits += 1
+                return body, 200, encoding
+        body = self._get((key, None))
+        if body is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            body, status = render()
+            if status != 200:
+                return body, status, None
+            self._put((key, None), body)
+        if encoding is None or len(body) < self.min_size:
+            return body, 200, None
+        compressed = compress(body, encoding)
+        self._put((key, encoding), compressed)
+        return compressed, 200, encoding
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+response_bodies = ResponseBodyCache()
@@ -16,6 +16,13 @@ ADMIN_USERNAME = "admin"
 #   3. Copy the output and replace the string below
 ADMIN_PASSWORD_HASH = "adminpass"
 
+# --- Upload Limits ---
+# Read by backend/uploads.py and by create_app() for MAX_CONTENT_LENGTH
+MAX_IMAGE_SIZE = 10 * 1024 * 1024    # 10 MB
+MAX_VIDEO_SIZE = 500 * 1024 * 1024   # 500 MB
+# Whole request body limit; leaves room for the multipart envelope around the largest file
+MAX_REQUEST_SIZE = MAX_VIDEO_SIZE + 1024 * 1024
+
 # --- Server / App Settings (Optional) ---
 # You can add other configuration settings here if needed
 # e.g., DEBUG mode, secret key, session lifetime, etc.
@@ -0,0 +1,116 @@
+# backend/content_cache.py
+# In-process cache of decoded menu and widget documents.
+# Menus and widgets are stored as JSON text; decoding and re-encoding them on every request
+# is wasted work since they change rarely. Each named row has a version that the create,
+# update and delete helpers bump. A cached entry is only used while its version is current,
+# and holds both the decoded document and its pre-serialized JSON body.
+# Writes made by other worker processes are picked up through sync(): the menus and widgets
+# revisions (bumped by triggers, see migration 8) are compared once per request, and the
+# cache whose revision moved is emptied.
+
+import json
+import hashlib
+import threading
+from collections import namedtuple
+
+# document: decoded row (dict) or None for a missing row; body: JSON bytes; etag: hash of body
+CachedDocument = namedtuple('CachedDocument', ['version', 'document', 'body', 'etag'])
+
+def serialize(document):
+    """Encodes a document the same way for every cached response."""
+    return json.dumps(document, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+def decode_row(row, data_field):
+    """Turns a database row into a document, parsing its JSON data field."""
+    if row is None:
+        return None
+    document = dict(row)
+    if document.get(data_field):
+        document[data_field] = json.loads(document[data_field])
+    return document
+
+class DocumentCache:
+    """
+    Versioned cache for one kind of named document (menus or widgets).
+    Loaders are only called on a miss. A version bump that happens while a loader runs
+    makes its result stale, so it is returned but not stored. Missing rows are never stored
+    either, so requests for made-up names cannot grow the cache.
+    """
+    def __init__(self, data_field):
+        self.data_field = data_field
+        self._lock = threading.Lock()
+        self._versions = {}
+        self._entries = {}
+        # Version of the whole collection, bumped whenever any row changes
+        self._generation = 0
+        self._all = None
+        # Shared revision the entries were loaded at, and a counter bumped whenever they are dropped
+        self._revision = None
+        self._epoch = 0
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, name):
+        """Marks a row as changed. Call after it is created, updated or deleted."""
+        with self._lock:
+            self._versions[name] = self._versions.get(name, 0) + 1
+            self._entries.pop(name, None)
+            self._generation += 1
+            self._all = None
+
+    def clear(self):
+        with self._lock:
+            self._clear()
+
+    def _clear(self):
+        self._epoch += 1
+        self._entries.clear()
+        self._generation += 1
+        self._all = None
+
+    def sync(self, revision):
+        """Drops every entry if the shared revision moved since the last call."""
+        with self._lock:
+            if self._revision != revision:
+                if self._revision is not None:
+                    self._clear()
+                self._revision = revision
+
+    def _build(self, version, document):
+        body = serialize(document)
+        return CachedDocument(version, document, body, hashlib.sha1(body).hexdigest())
+
+    def get(self, name, load_row):
+        """Returns the CachedDocument for name; load_row(name) fetches the raw row on a miss."""
+        with self._lock:
+            version = self._versions.get(name, 0)
+            epoch = self._epoch
+            entry = self._entries.get(name)
+            if entry is not None and entry.version == version:
+                self.hits += 1
+                return entry
+            self.misses += 1
+        entry = self._build(version, decode_row(load_row(name), self.data_field))
+        if entry.document is None:
+            return entry
+        with self._lock:
+            if self._versions.get(name, 0) == version and self._epoch == epoch:
+                self._entries[name] = entry
+        return entry
+
+    def get_all(self, load_rows):
+        """Returns a CachedDocument whose document is the list of every row."""
+        with self._lock:
+            generation = self._generation
+            if self._all is not None and self._all.version == generation:
+                self.hits += 1
+                return self._all
+            self.misses += 1
+        entry = self._build(generation, [decode_row(row, self.data_field) for row in load_rows()])
+        with self._lock:
+            if self._generation == generation:
+                self._all = entry
+        return entry
+
+menu_cache = DocumentCache('menu_data')
+widget_cache = DocumentCache('widget_data')
@@ -3,6 +3,19 @@ from sqlite3 import Error
 from werkzeug.security import generate_password_hash  # For password hashing
 import json  # For serializing page data
 
+import atexit
+
+try:
+    from backend.log import configure_logging, get_logger
+    from backend import sqltrace
+    from backend.migrations import migrate
+except ImportError:  # Run from inside backend/ (python database.py, or scripts importing 'database')
+    from log import configure_logging, get_logger
+    import sqltrace
+    from migrations import migrate
+
+logger = get_logger(__name__)
+
 def create_connection(db_path="site.db"):
     """
     Create a database connection to the SQLite database specified by db_path.
@@ -10,11 +23,14 @@ def create_connection(db_path="site.db"):
     """
     conn = None
     try:
-        conn = sqlite3.connect(db_path)
+        conn = sqltrace.connect(db_path)
         conn.row_factory = sqlite3.Row  # Enable dict-like access to rows
-        print(f"Connection to SQLite DB '{db_path}' successful")
+        if isinstance(conn, sqltrace.TracingConnection):
+            # Scripts keep their connection for the whole run, so report when they exit
+            atexit.register(conn.trace.log_summary, f"Connection to '{db_path}'")
+        logger.debug("Connected to SQLite DB '%s'", db_path)
     except Error as e:
-        print(f"The error '{e}' occurred")
+        logger.error("Could not connect to SQLite DB '%s': %s", db_path, e)
     return conn
 
 def create_table(conn, create_table_sql):
@@ -23,7 +39,7 @@ def create_table(conn, create_table_sql):
         c = conn.cursor()
         c.execute(create_table_sql)
     except Error as e:
-        print(f"The error '{e}' occurred")
+        logger.error("Could not create table: %s", e)
 
 # --- User Functions ---
 def create_user(conn, user_data):
@@ -40,8 +56,19 @@ def get_user(conn, username):
     return cur.fetchone()
 
 # --- Page Functions ---
-def add_page_db(conn, page_id, title, slug, content, published, is_chapter, parent_id, design, meta_description, meta_keywords, custom_css, placeholder_image, embedded_video):
-    """Insert a new page or chapter into the database."""
+def row_to_page(row):
+    """Convert a pages row into a dict with decoded booleans and design JSON."""
+    page = dict(row)
+    if 'published' in page:
+        page['published'] = bool(page['published'])
+    if 'is_chapter' in page:
+        page['is_chapter'] = bool(page['is_chapter'])
+    if 'design' in page:
+        page['design'] = json.loads(page['design']) if page['design'] else {}
+    return page
+
+def add_page_db(conn, page_id, title, slug, content, published, is_chapter, parent_id, design, meta_description, meta_keywords, custom_css, placeholder_image, embedded_video, commit=True):
+    """Insert a new page or chapter into the database. Pass commit=False to leave the transaction open."""
     sql = '''INSERT INTO pages(id, title, slug, content, published, is_chapter, parent_id, design, meta_description, meta_keywords, custom_css, placeholder_image, embedded_video)
              VALUES(?,?,?,?,?,?,?,?,?,?,?,?,?)'''
     cur = conn.cursor()
@@ -49,7 +76,8 @@ def add_page_db(conn, page_id, title, slug, content, published, is_chapter, pare
         page_id, title, slug, content, published, is_chapter,
         parent_id, json.dumps(design), meta_description, meta_keywords, custom_css, placeholder_image, embedded_video
     ))
-    conn.commit()
+    if commit:
+        conn.commit()
     return cur.lastrowid
 
 def get_all_pages_db(conn):
@@ -58,14 +86,7 @@ def get_all_pages_db(conn):
     cur = conn.cursor()
     cur.execute(sql)
     rows = cur.fetchall()
-    pages = []
-    for row in rows:
-        page = dict(row)
-        page['published'] = bool(page['published'])
-        page['is_chapter'] = bool(page['is_chapter'])
-        page['design'] = json.loads(page['design']) if page['design'] else {}
-        pages.append(page)
-    return pages
+    return [row_to_page(row) for row in rows]
 
 def get_page_by_id_db(conn, page_id):
     """Retrieve a single page/chapter by its ID."""
@@ -74,11 +95,7 @@ def get_page_by_id_db(conn, page_id):
     cur.execute(sql, (page_id,))
     row = cur.fetchone()
     if row:
-        page = dict(row)
-        page['published'] = bool(page['published'])
-        page['is_chapter'] = bool(page['is_chapter'])
-        page['design'] = json.loads(page['design']) if page['design'] else {}
-        return page
+        return row_to_page(row)
     return None
 
 def get_page_by_slug_db(conn, slug):
@@ -88,15 +105,11 @@ def get_page_by_slug_db(conn, slug):
     cur.execute(sql, (slug,))
     row = cur.fetchone()
     if row:
-        page = dict(row)
-        page['published'] = bool(page['published'])
-        page['is_chapter'] = bool(page['is_chapter'])
-        page['design'] = json.loads(row['design']) if row['design'] else {}
-        return page
+        return row_to_page(row)
     return None
 
-def update_page_db(conn, page_id, title, slug, content, published, is_chapter, parent_id, design, meta_description, meta_keywords, custom_css, placeholder_image, embedded_video):
-    """Update an existing page or chapter in the database."""
+def update_page_db(conn, page_id, title, slug, content, published, is_chapter, parent_id, design, meta_description, meta_keywords, custom_css, placeholder_image, embedded_video, commit=True):
+    """Update an existing page or chapter in the database. Pass commit=False to leave the transaction open."""
     sql = '''UPDATE pages
              SET title = ?, slug = ?, content = ?, published = ?, is_chapter = ?,
                  parent_id = ?, design = ?, meta_description = ?, meta_keywords = ?, custom_css = ?,
@@ -108,103 +121,157 @@ def update_page_db(conn, page_id, title, slug, content, published, is_chapter, p
         parent_id, json.dumps(design), meta_description, meta_keywords, custom_css,
         placeholder_image, embedded_video, page_id
     ))
-    conn.commit()
+    if commit:
+        conn.commit()
     return cur.rowcount
 
-def delete_page_db(conn, page_id):
-    """Delete a page or chapter by its ID."""
+def delete_page_db(conn, page_id, commit=True):
+    """Delete a page or chapter by its ID. Pass commit=False to leave the transaction open."""
     sql = '''DELETE FROM pages WHERE id = ?'''
     cur = conn.cursor()
     cur.execute(sql, (page_id,))
-    conn.commit()
+    if commit:
+        conn.commit()
     return cur.rowcount
 
-# --- Initialize Database ---
-if __name__ == '__main__':
-    conn = create_connection()
+# --- Page Listing (keyset pagination) ---
+PAGE_SORT_KEYS = ('title', 'created_at')
 
-    # Users table
-    create_users_table = """
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT NOT NULL UNIQUE,
-        password TEXT NOT NULL,
-        token TEXT UNIQUE
-    );
+def list_pages_db(conn, fields, sort='title', after=None, limit=50, published=None, parent_id=None, filter_parent=False, is_chapter=None):
     """
-
-    # Menus table
-    create_menus_table = """
-    CREATE TABLE IF NOT EXISTS menus (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL UNIQUE,
-        menu_data TEXT NOT NULL
-    );
+    Return one page of pages ordered by (sort, id), starting after the `after` key.
+    `after` is the (sort_value, id) of the last row of the previous page, so each call
+    is an index range scan no matter how deep into the listing it is.
+    Returns (pages, next_key) where next_key is None on the last page.
     """
+    if sort not in PAGE_SORT_KEYS:
+        raise ValueError(f"Unsupported sort key: {sort}")
 
-    # Widgets table
-    create_widgets_table = """
-    CREATE TABLE IF NOT EXISTS widgets (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL UNIQUE,
-        widget_type TEXT NOT NULL,
-        widget_data TEXT NOT NULL
-    );
-    """
+    # The id and the sort column are always needed to build the next key
+    select_columns = list(dict.fromkeys(['id', sort] + list(fields)))
+    where = []
+    params = []
+    if published is not None:
+        where.append("published = ?")
+        params.append(1 if published else 0)
+    if is_chapter is not None:
+        where.append("is_chapter = ?")
+        params.append(1 if is_chapter else 0)
+    if filter_parent:
+        if parent_id is None:
+            where.append("parent_id IS NULL")
+        else:
+            where.append("parent_id = ?")
+            params.append(parent_id)
+    if after is not None:
+        after_value, after_id = after
+        if after_value is None:
+            # NULLs sort first; continue through the remaining NULLs, then everything else
+            where.append(f"(({sort} IS NULL AND id > ?) OR {sort} IS NOT NULL)")
+            params.append(after_id)
+        else:
+            where.append(f"({sort}, id) > (?, ?)")
+            params.extend([after_value, after_id])
 
-    # Pages table
-    create_pages_table = """
-    CREATE TABLE IF NOT EXISTS pages (
-        id TEXT PRIMARY KEY,
-        title TEXT NOT NULL,
-        slug TEXT UNIQUE,
-        content TEXT,
-        published BOOLEAN NOT NULL,
-        is_chapter BOOLEAN NOT NULL,
-        parent_id TEXT,
-        design TEXT,
-        meta_description TEXT,
-        meta_keywords TEXT,
-        custom_css TEXT,
-        placeholder_image TEXT,
-        embedded_video TEXT,
-        created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (parent_id) REFERENCES pages(id) ON DELETE CASCADE
-    );
-    """
+    sql = f"SELECT {', '.join(select_columns)} FROM pages"
+    if where:
+        sql += " WHERE " + " AND ".join(where)
+    sql += f" ORDER BY {sort}, id LIMIT ?"
+    params.append(limit + 1)
+
+    rows = conn.execute(sql, params).fetchall()
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1][sort], rows[-1]['id'])
+
+    pages = []
+    for row in rows:
+        page = row_to_page(row)
+        pages.append({key: page[key] for key in fields})
+    return pages, next_key
 
-    # Settings table
-    create_settings_table = """
-    CREATE TABLE IF NOT EXISTS settings (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        setting_key TEXT NOT NULL UNIQUE,
-        setting_value TEXT
-    );
+# --- Sidebar Subtrees ---
+SIDEBAR_NODE_COLUMNS = ('id', 'title', 'slug', 'published', 'is_chapter', 'parent_id', 'design')
+# Stay well below SQLite's limit on bound parameters per statement
+SQL_IN_CHUNK_SIZE = 500
+
+def _fetch_children_db(conn, parent_ids, published_only):
+    """Fetch the sidebar nodes whose parent_id is in parent_ids, in sidebar (rowid) order."""
+    columns = ', '.join(SIDEBAR_NODE_COLUMNS)
+    published_sql = " AND published" if published_only else ""
+    nodes = []
+    for i in range(0, len(parent_ids), SQL_IN_CHUNK_SIZE):
+        chunk = parent_ids[i:i + SQL_IN_CHUNK_SIZE]
+        placeholders = ', '.join('?' * len(chunk))
+        sql = f"SELECT rowid, {columns} FROM pages WHERE parent_id IN ({placeholders}){published_sql}"
+        nodes.extend(conn.execute(sql, chunk).fetchall())
+    nodes.sort(key=lambda row: row['rowid'])
+    return [row_to_page(row) for row in nodes]
+
+def get_subtree_db(conn, parent_id=None, depth=1, published_only=True):
+    """
+    Return the children of parent_id (the top level when None), nested up to depth levels.
+    Every node carries a child_count so clients know which nodes can be expanded; nodes at
+    the depth limit have a child_count but no children list. As in the full sidebar, only
+    chapters have children. Each level costs one indexed parent_id lookup.
     """
+    columns = ', '.join(SIDEBAR_NODE_COLUMNS)
+    published_sql = " AND published" if published_only else ""
+    if parent_id is None:
+        rows = conn.execute(f"SELECT rowid, {columns} FROM pages WHERE parent_id IS NULL{published_sql} ORDER BY rowid").fetchall()
+    else:
+        rows = conn.execute(f"SELECT rowid, {columns} FROM pages WHERE parent_id = ?{published_sql} ORDER BY rowid", (parent_id,)).fetchall()
+    top_level = [row_to_page(row) for row in rows]
+
+    level = top_level
+    for current_depth in range(1, depth + 1):
+        for node in level:
+            node.pop('rowid', None)
+            node['child_count'] = 0
+        chapters = {node['id']: node for node in level if node['is_chapter']}
+        if not chapters:
+            break
+        if current_depth < depth:
+            children = _fetch_children_db(conn, list(chapters), published_only)
+            for node in chapters.values():
+                node['children'] = []
+            for child in children:
+                chapters[child['parent_id']]['children'].append(child)
+            for node in chapters.values():
+                node['child_count'] = len(node['children'])
+            level = children
+        else:
+            # Deepest level: only count the children so the client can offer to expand
+            ids = list(chapters)
+            for i in range(0, len(ids), SQL_IN_CHUNK_SIZE):
+                chunk = ids[i:i + SQL_IN_CHUNK_SIZE]
+                placeholders = ', '.join('?' * len(chunk))
+                sql = f"SELECT parent_id, COUNT(*) FROM pages WHERE parent_id IN ({placeholders}){published_sql} GROUP BY parent_id"
+                for child_parent_id, count in conn.execute(sql, chunk):
+                    chapters[child_parent_id]['child_count'] = count
+    return top_level
+
+# --- Initialize Database ---
+if __name__ == '__main__':
+    configure_logging()
+    conn = create_connection()
 
     if conn is not None:
-        create_table(conn, create_users_table)
-        print("Users table created successfully")
-        create_table(conn, create_menus_table)
-        print("Menus table created successfully")
-        create_table(conn, create_widgets_table)
-        print("Widgets table created successfully")
-        create_table(conn, create_pages_table)
-        print("Pages table created successfully")
-        create_table(conn, create_settings_table)
-        print("Settings table created successfully")
+        migrate(conn)
+        logger.info("Database schema is up to date")
 
         # Create admin user (only if not exists)
         hashed_password = generate_password_hash("password")
         user_id = create_user(conn, ("admin", hashed_password))
         if user_id:
-            print(f"Admin user created with id: {user_id}")
+            logger.info("Admin user created with id: %s", user_id)
         else:
-            print("Admin user 'admin' already exists or could not be created.")
+            logger.info("Admin user 'admin' already exists or could not be created.")
 
         admin_user = get_user(conn, "admin")
-        print(f"Admin user details: {admin_user}")
+        logger.debug("Admin user details: %s", admin_user)
 
         conn.close()
     else:
-        print("Error! Cannot create database connection.")
+        logger.error("Cannot create database connection.")
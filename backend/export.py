@@ -0,0 +1,176 @@
+# backend/export.py
+# Streaming export of the handbook page tree.
+# Pages are read from SQLite with a lazily stepped cursor in tree order and written out
+# either as NDJSON (one page per line) or as nested JSON in the data/pages.json shape.
+# Used by the /api/admin/export endpoint and runnable as a CLI for backups:
+#   python -m backend.export --format json --gzip -o backup.json.gz
+
+import sys
+import json
+import zlib
+import sqlite3
+import argparse
+
+from backend.database import row_to_page
+from backend.log import get_logger
+
+logger = get_logger(__name__)
+
+EXPORT_FORMATS = ('ndjson', 'json')
+
+# Pre-order walk of the page tree. Siblings keep their insertion (rowid) order, which is
+# the same order build_nested_pages() produces for the sidebar. When only published pages
+# are wanted the walk stops at drafts, so their descendants are skipped like in get_sidebar.
+# Pages the walk from the roots cannot reach still belong in a backup, so they follow it:
+# orphans (parent_id pointing at a missing page) are walked as extra roots (sort_path '2...'),
+# then pages stuck in a parent_id cycle are listed flat at depth 0 ('3...'), full export only.
+TREE_ORDER_SQL = '''
+    WITH RECURSIVE tree(id, depth, sort_path) AS (
+        SELECT id, 0, '1' || printf('%012d', rowid) FROM pages WHERE parent_id IS NULL {published}
+        UNION ALL
+        SELECT id, 0, '2' || printf('%012d', rowid) FROM pages
+        WHERE parent_id IS NOT NULL AND parent_id NOT IN (SELECT id FROM pages WHERE id IS NOT NULL) {published}
+        UNION ALL
+        SELECT p.id, tree.depth + 1, tree.sort_path || '/' || printf('%012d', p.rowid)
+        FROM pages p JOIN tree ON p.parent_id = tree.id {published_p}
+    )
+    SELECT tree.depth AS tree_depth, tree.sort_path AS tree_sort_path, p.*
+    FROM tree JOIN pages p ON p.id = tree.id
+    {unreached}
+    ORDER BY tree_sort_path
+'''
+
+UNREACHED_SQL = '''
+    UNION ALL
+    SELECT 0, '3' || printf('%012d', p.rowid), p.*
+    FROM pages p WHERE p.id IS NULL OR p.id NOT IN (SELECT id FROM tree)
+'''
+
+def iter_pages_in_tree_order(conn, published_only=False):
+    """
+    Yields (depth, page) tuples in tree order, followed by the pages the walk from the
+    roots did not reach (see TREE_ORDER_SQL), with a warning when there are any.
+    Rows are stepped one at a time from the cursor, so memory does not grow with the handbook.
+    """
+    if published_only:
+        sql = TREE_ORDER_SQL.format(published='AND published', published_p='AND p.published', unreached='')
+    else:
+        sql = TREE_ORDER_SQL.format(published='', published_p='', unreached=UNREACHED_SQL)
+    cur = conn.execute(sql)
+    orphans = cycles = 0
+    for row in cur:
+        page = row_to_page(row)
+        depth = page.pop('tree_depth')
+        kind = page.pop('tree_sort_path')[0]
+        if kind == '2':
+            orphans += 1
+        elif kind == '3':
+            cycles += 1
+        yield depth, page
+    if orphans or cycles:
+        logger.warning("Export: %d pages under a missing parent and %d pages in parent_id cycles "
+                       "were appended after the page tree", orphans, cycles)
+
+def iter_ndjson(rows):
+    """Encodes (depth, page) rows as NDJSON lines, one page per line."""
+    for _, page in rows:
+        yield json.dumps(page, ensure_ascii=False) + '\n'
+
+def iter_nested_json(rows):
+    """
+    Encodes (depth, page) rows as a nested JSON array in the data/pages.json shape.
+    Objects are emitted as soon as they are read and closed when the walk leaves them,
+    so only the current ancestor chain is held in memory.
+    """
+    # Each open node is [is_chapter, children_opened]
+    stack = []
+    first = True
+    yield '['
+    for depth, page in rows:
+        while len(stack) > depth:
+            yield _close_node(stack.pop())
+        if stack and not stack[-1][1]:
+            stack[-1][1] = True
+            first = True
+            yield ', "children": ['
+        if not first:
+            yield ', '
+        first = False
+        page.pop('parent_id', None)
+        # Leave the object open so children can be attached once we see them
+        yield json.dumps(page, ensure_ascii=False)[:-1]
+        stack.append([page.get('is_chapter', False), False])
+    while stack:
+        yield _close_node(stack.pop())
+    yield ']\n'
+
+def _close_node(node):
+    is_chapter, children_opened = node
+    if children_opened:
+        return ']}'
+    return ', "children": []}' if is_chapter else '}'
+
+def iter_gzip(chunks, level=6):
+    """Compresses a stream of text chunks into gzip bytes incrementally."""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+def iter_buffered(chunks, buffer_size=64 * 1024):
+    """Coalesces small text chunks into roughly buffer_size pieces before they hit the socket."""
+    buffer = []
+    size = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        size += len(chunk)
+        if size >= buffer_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+def iter_export(db_path, fmt='ndjson', gzip=False, published_only=False):
+    """
+    Streams an export of the database at db_path.
+    Opens its own connection so the stream can outlive the request that started it.
+    Yields str chunks, or bytes chunks when gzip is True.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    try:
+        rows = iter_pages_in_tree_order(conn, published_only=published_only)
+        encoder = iter_ndjson if fmt == 'ndjson' else iter_nested_json
+        chunks = iter_buffered(encoder(rows))
+        if gzip:
+            chunks = iter_gzip(chunks)
+        yield from chunks
+    finally:
+        conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export the handbook page tree as NDJSON or nested JSON.")
+    parser.add_argument('--db', default='site.db', help="Path to the SQLite database (default: site.db)")
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='ndjson', help="Output format (default: ndjson)")
+    parser.add_argument('--gzip', action='store_true', help="Gzip the output")
+    parser.add_argument('--published-only', action='store_true', help="Skip draft pages")
+    parser.add_argument('-o', '--output', help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    out = open(args.output, 'wb') if args.output else sys.stdout.buffer
+    try:
+        for chunk in iter_export(args.db, args.format, gzip=args.gzip, published_only=args.published_only):
+            out.write(chunk if isinstance(chunk, bytes) else chunk.encode('utf-8'))
+    finally:
+        if args.output:
+            out.close()
+        else:
+            out.flush()
+
+if __name__ == '__main__':
+    main()
@@ -1,10 +1,21 @@
 import os
+import sys
 import json
+import time
+import sqlite3
 from jinja2 import Environment, FileSystemLoader
 
 # Define paths
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.append(os.path.join(BASE_DIR, '..'))
+from backend.images import responsive_image
+from backend.log import configure_logging, get_logger
+from backend.snapshot import STATIC_PAGES_MARKER
+
+logger = get_logger(__name__)
+
 DATA_DIR = os.path.join(BASE_DIR, '..', 'data')
+DB_PATH = os.path.join(BASE_DIR, '..', 'site.db') # Used to look up responsive image derivatives
 PAGES_FILE = os.path.join(DATA_DIR, 'pages.json')
 TEMPLATES_DIR = os.path.join(BASE_DIR, '..', 'public', 'templates')
 STATIC_PAGES_DIR = os.path.join(BASE_DIR, '..', 'public', 'pages')
@@ -29,6 +40,8 @@ def read_pages_data():
                     if 'design' in item and isinstance(item['design'], dict):
                         if 'headerImage' in item['design'] and item['design']['headerImage'] and not item['design']['headerImage'].startswith(STATIC_ASSETS_PREFIX):
                             item['design']['headerImage'] = STATIC_ASSETS_PREFIX + item['design']['headerImage']
+                    if item.get('placeholder_image') and not item['placeholder_image'].startswith(STATIC_ASSETS_PREFIX):
+                        item['placeholder_image'] = STATIC_ASSETS_PREFIX + item['placeholder_image']
                     if 'content' in item and isinstance(item['content'], str):
                         # Replace src="/uploads with src="/public/uploads
                         item['content'] = item['content'].replace('src="/uploads', f'src="{STATIC_ASSETS_PREFIX}/uploads')
@@ -124,7 +137,11 @@ def generate_static_pages():
     )
     with open(os.path.join(STATIC_PAGES_DIR, 'index.html'), 'w', encoding='utf-8') as f:
         f.write(index_html_content)
-    print(f"Generated: {os.path.join(STATIC_PAGES_DIR, 'index.html')}")
+    logger.debug("Generated: %s", os.path.join(STATIC_PAGES_DIR, 'index.html'))
+    generated = 1
+
+    # Derivatives are optional; without a database the pages simply get no srcset
+    conn = sqlite3.connect(DB_PATH) if os.path.exists(DB_PATH) else None
 
     for page in all_pages:
         if page.get('slug') and page.get('content') and page.get('published', False):
@@ -133,16 +150,31 @@ def generate_static_pages():
             
             sidebar_html = generate_sidebar_html(pages_data, current_slug=slug)
             breadcrumbs = get_breadcrumbs(pages_data, slug)
+            header_image = placeholder_image = None
+            if conn is not None:
+                header_image = responsive_image(conn, (page.get('design') or {}).get('headerImage'))
+                placeholder_image = responsive_image(conn, page.get('placeholder_image'))
 
             rendered_html = page_template.render(
                 page=page,
                 sidebar_menu=sidebar_html,
-                breadcrumbs=breadcrumbs
+                breadcrumbs=breadcrumbs,
+                header_image=header_image,
+                placeholder_image=placeholder_image
             )
             
             with open(output_path, 'w', encoding='utf-8') as f:
                 f.write(rendered_html)
-            print(f"Generated: {output_path}")
+            logger.debug("Generated: %s", output_path)
+            generated += 1
+
+    if conn is not None:
+        conn.close()
+    # Tells running servers to re-list the directory (see StaticPageIndex in backend/snapshot.py)
+    with open(os.path.join(STATIC_PAGES_DIR, STATIC_PAGES_MARKER), 'w', encoding='utf-8') as f:
+        f.write(f"{time.time()}\n")
+    logger.info("Generated %d static pages in %s", generated, STATIC_PAGES_DIR)
 
 if __name__ == '__main__':
+    configure_logging()
     generate_static_pages()
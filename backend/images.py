@@ -0,0 +1,188 @@
+# backend/images.py
+# Background generation of responsive image derivatives.
+# Every image stored through backend/uploads.py gets resized copies in its original format
+# and in WebP, written next to it (ab/cd/<hash>.w480.webp). Their sizes are recorded in the
+# image_derivatives table so the API and the static generator can emit srcset/sizes.
+# Pillow is optional: without it uploads still work, they just get no derivatives. It is
+# imported on first use, so workers that never handle an upload do not load it.
+#
+# Backfill derivatives for everything already uploaded:
+#   python -m backend.images --db site.db
+
+import os
+import sqlite3
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.migrations import migrate
+
+# Widths generated for srcset; images are never upscaled
+DERIVATIVE_WIDTHS = (480, 960, 1600)
+# Layout hint for the browser: full width on phones, the content column elsewhere
+DEFAULT_SIZES = '(max-width: 768px) 100vw, 75vw'
+# GIFs are left alone so animations are not flattened
+DERIVATIVE_SOURCE_EXTENSIONS = {'png', 'jpg'}
+SAVE_OPTIONS = {
+    'jpg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+    'png': {'format': 'PNG', 'optimize': True},
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+}
+MAX_WORKERS = 2
+
+_executor = None
+_pillow = None
+
+def _load_pillow():
+    """Returns (Image, ImageOps), or None when Pillow is not installed."""
+    global _pillow
+    if _pillow is None:
+        try:
+            from PIL import Image, ImageOps
+            _pillow = (Image, ImageOps)
+        except ImportError:  # Pillow not installed
+            _pillow = False
+    return _pillow or None
+
+def derivatives_available():
+    return _load_pillow() is not None
+
+def upload_relative_path(url):
+    """
+    Maps an upload URL ('/uploads/ab/cd/x.jpg' or '/public/uploads/ab/cd/x.jpg')
+    to its path relative to the uploads directory. Returns None for other URLs.
+    """
+    if not url or '/uploads/' not in url:
+        return None
+    return url.split('/uploads/', 1)[1]
+
+def _save_image(image, target, extension):
+    """Saves image to target atomically and returns the file size."""
+    options = dict(SAVE_OPTIONS[extension])
+    if extension == 'jpg' and image.mode not in ('RGB', 'L'):
+        image = image.convert('RGB')
+    tmp_path = target + '.tmp'
+    image.save(tmp_path, **options)
+    os.replace(tmp_path, target)
+    return os.path.getsize(target)
+
+def generate_derivatives(uploads_dir, relative_path):
+    """
+    Writes the resized and WebP derivatives of one stored image.
+    Returns metadata dicts for the original and every derivative.
+    """
+    extension = relative_path.rsplit('.', 1)[-1].lower()
+    source = os.path.join(uploads_dir, *relative_path.split('/'))
+    base = relative_path.rsplit('.', 1)[0]
+    records = []
+    Image, ImageOps = _load_pillow()
+    with Image.open(source) as opened:
+        image = ImageOps.exif_transpose(opened)
+        if image.mode == 'P':
+            image = image.convert('RGBA')  # Palette images cannot be resampled smoothly
+        width, height = image.size
+        records.append({'path': relative_path, 'format': extension, 'width': width,
+                        'height': height, 'size': os.path.getsize(source)})
+
+        # A full-size WebP copy, plus both formats at each smaller width
+        targets = [(width, height, ('webp',))]
+        for target_width in DERIVATIVE_WIDTHS:
+            if target_width < width:
+                targets.append((target_width, round(height * target_width / width), (extension, 'webp')))
+
+        for target_width, target_height, formats in targets:
+            resized = image if target_width == width else image.resize((target_width, target_height), Image.LANCZOS)
+            for fmt in formats:
+                path = f"{base}.w{target_width}.{fmt}"
+                size = _save_image(resized, os.path.join(uploads_dir, *path.split('/')), fmt)
+                records.append({'path': path, 'format': fmt, 'width': target_width,
+                                'height': target_height, 'size': size})
+    return records
+
+def record_derivatives(conn, relative_path, records):
+    conn.executemany(
+        "INSERT OR REPLACE INTO image_derivatives (source_path, path, format, width, height, size) VALUES (?, ?, ?, ?, ?, ?)",
+        [(relative_path, r['path'], r['format'], r['width'], r['height'], r['size']) for r in records]
+    )
+    conn.commit()
+
+def process_upload(db_path, uploads_dir, relative_path):
+    """Generates and records the derivatives of one upload unless they already exist."""
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn)  # The image_derivatives table comes from migration 6
+        if conn.execute("SELECT 1 FROM image_derivatives WHERE source_path = ? LIMIT 1", (relative_path,)).fetchone():
+            return  # Same content uploaded before
+        records = generate_derivatives(uploads_dir, relative_path)
+        record_derivatives(conn, relative_path, records)
+    finally:
+        conn.close()
+
+def enqueue_derivatives(db_path, uploads_dir, relative_path, logger=None):
+    """
+    Schedules derivative generation for a stored upload on the background worker pool.
+    Returns the Future, or None when the file is not a resizable image or Pillow is missing.
+    """
+    global _executor
+    if not derivatives_available():
+        return None
+    if relative_path.rsplit('.', 1)[-1].lower() not in DERIVATIVE_SOURCE_EXTENSIONS:
+        return None
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix='image-derivatives')
+    future = _executor.submit(process_upload, db_path, uploads_dir, relative_path)
+    if logger is not None:
+        def report(done):
+            if done.exception() is not None:
+                logger.error("Derivative generation failed for %s: %s", relative_path, done.exception())
+        future.add_done_callback(report)
+    return future
+
+def responsive_image(conn, url, sizes=DEFAULT_SIZES):
+    """
+    Returns {'src', 'srcset', 'webp_srcset', 'sizes'} for an uploaded image URL,
+    or None when it has no derivatives (yet).
+    """
+    relative_path = upload_relative_path(url)
+    if not relative_path:
+        return None
+    try:
+        rows = conn.execute(
+            "SELECT path, format, width FROM image_derivatives WHERE source_path = ? ORDER BY width",
+            (relative_path,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        return None  # Nothing has been processed yet, so the table does not exist
+    if not rows:
+        return None
+
+    # Keep whatever prefix the URL came with ('/uploads/' or '/public/uploads/')
+    prefix = url[:url.index('/uploads/') + len('/uploads/')]
+    srcset = [f"{prefix}{path} {width}w" for path, fmt, width in rows if fmt != 'webp']
+    webp_srcset = [f"{prefix}{path} {width}w" for path, fmt, width in rows if fmt == 'webp']
+    return {
+        'src': url,
+        'srcset': ', '.join(srcset),
+        'webp_srcset': ', '.join(webp_srcset),
+        'sizes': sizes,
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate responsive derivatives for every stored upload.")
+    parser.add_argument('--db', default='site.db', help="Path to the SQLite database (default: site.db)")
+    parser.add_argument('--uploads', default=os.path.join('public', 'uploads'), help="Uploads directory (default: public/uploads)")
+    args = parser.parse_args(argv)
+
+    if not derivatives_available():
+        parser.error("Pillow is not installed (pip install Pillow)")
+    for root, _, files in os.walk(args.uploads):
+        for name in files:
+            relative_path = os.path.relpath(os.path.join(root, name), args.uploads).replace(os.sep, '/')
+            # Only content-addressed originals (ab/cd/<hash>.<ext>), not derivatives or staging files
+            if relative_path.count('/') != 2 or '.w' in name or name.startswith('.'):
+                continue
+            if name.rsplit('.', 1)[-1].lower() in DERIVATIVE_SOURCE_EXTENSIONS:
+                process_upload(args.db, args.uploads, relative_path)
+                print(f"Processed: {relative_path}")
+
+if __name__ == '__main__':
+    main()
@@ -1,35 +1,22 @@
-# backend/init_db.py
-
-import sqlite3
+# init__.py
+# Adds a 'test' user (password '123') for local development.
+# The schema comes from migrations.py like every other script, so the user lands in the
+# same site.db the app reads instead of a separate database with its own users table.
 from werkzeug.security import generate_password_hash
-
-DB_PATH = "instance/database.db"   # adjust if your DB file is stored elsewhere
+from database import create_connection, create_user, get_user
+from migrations import migrate
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-
-    # Create users table
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            token TEXT
-        )
-    """)
+    conn = create_connection()
+    migrate(conn)
 
     # Insert a test admin user
-    try:
-        cursor.execute(
-            "INSERT INTO users (username, password) VALUES (?, ?)",
-            ("test", generate_password_hash("123"))
-        )
-        print("✅ Test user 'test' created with password '123'")
-    except sqlite3.IntegrityError:
+    if get_user(conn, "test"):
         print("ℹ️ Test user already exists, skipping insert.")
+    else:
+        create_user(conn, ("test", generate_password_hash("123")))
+        print("✅ Test user 'test' created with password '123'")
 
-    conn.commit()
     conn.close()
     print("✅ Database initialized.")
 
@@ -1,91 +1,19 @@
 # init_db.py
-import sqlite3
-from sqlite3 import Error
+# Creates site.db (or brings an existing one up to date) and ensures the admin user exists.
+# The schema itself lives in migrations.py; this script only adds the default admin.
 from werkzeug.security import generate_password_hash
-from database import create_connection, create_table, create_user
-
-def add_column_if_not_exists(conn, table_name, column_name, column_type):
-    cursor = conn.cursor()
-    # Check if column already exists
-    cursor.execute(f"PRAGMA table_info({table_name});")
-    columns = [col[1] for col in cursor.fetchall()]
-    if column_name not in columns:
-        cursor.execute(f"ALTER TABLE {table_name} ADD COLUMN {column_name} {column_type};")
-        print(f"Added column '{column_name}' to table '{table_name}'")
+from database import create_connection, create_user, get_user
+from migrations import migrate
 
 def initialize_database():
     conn = create_connection()
-
-    # --- Table definitions ---
-    tables = {
-        "users": """
-        CREATE TABLE IF NOT EXISTS users (
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          username TEXT NOT NULL UNIQUE,
-          password TEXT NOT NULL,
-          token TEXT UNIQUE
-        );
-        """,
-        "menus": """
-        CREATE TABLE IF NOT EXISTS menus (
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          name TEXT NOT NULL UNIQUE,
-          menu_data TEXT NOT NULL
-        );
-        """,
-        "widgets": """
-        CREATE TABLE IF NOT EXISTS widgets (
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          name TEXT NOT NULL UNIQUE,
-          widget_type TEXT NOT NULL,
-          widget_data TEXT NOT NULL
-        );
-        """,
-        "pages": """
-        CREATE TABLE IF NOT EXISTS pages (
-          id TEXT PRIMARY KEY,
-          title TEXT NOT NULL,
-          slug TEXT UNIQUE,
-          content TEXT,
-          published BOOLEAN NOT NULL,
-          is_chapter BOOLEAN NOT NULL,
-          parent_id TEXT,
-          design TEXT,
-          meta_description TEXT,
-          meta_keywords TEXT,
-          custom_css TEXT,
-          placeholder_image TEXT,
-          embedded_video TEXT,
-          created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-          FOREIGN KEY (parent_id) REFERENCES pages (id) ON DELETE CASCADE
-        );
-        """,
-        "settings": """
-        CREATE TABLE IF NOT EXISTS settings (
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          setting_key TEXT NOT NULL UNIQUE,
-          setting_value TEXT
-        );
-        """
-    }
-
-    # --- Create tables safely ---
-    for name, sql in tables.items():
-        create_table(conn, sql)
-        print(f"Table '{name}' ensured.")
-
-    # --- Example: Add new columns safely ---
-    add_column_if_not_exists(conn, "users", "last_login", "TEXT")
-    add_column_if_not_exists(conn, "pages", "summary", "TEXT")
-    add_column_if_not_exists(conn, "pages", "placeholder_image", "file")
-    add_column_if_not_exists(conn, "pages", "embedded_video", "file")
-    # The 'created_at' column is handled by the CREATE TABLE statement with a default value.
-    # Adding it again with a non-constant default via ALTER TABLE is not supported by SQLite.
-    # If the table already exists, this column should have been added by the updated CREATE TABLE.
+    version = migrate(conn)
+    print(f"Database schema at version {version}.")
 
     # --- Create admin user safely ---
-    hashed_password = generate_password_hash("password")
-    create_user(conn, ("admin", hashed_password))
+    if not get_user(conn, "admin"):
+        hashed_password = generate_password_hash("password")
+        create_user(conn, ("admin", hashed_password))
 
     conn.close()
     print("Database initialized and updated safely.")
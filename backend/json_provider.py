@@ -0,0 +1,68 @@
+# backend/json_provider.py
+# JSON encoding for API responses. Uses orjson when it is installed and the standard library
+# otherwise, both through the Flask app's JSON provider (jsonify, request.get_json) and
+# through encode_json() for bodies that are serialized once and cached as bytes
+# (backend/bundle.py, backend/compression.py).
+# The output has the same shape as Flask's default provider: sorted keys, compact outside
+# debug mode, a trailing newline and dates as HTTP dates. One difference: orjson writes
+# non-ASCII text as UTF-8 rather than \u escapes. Both are valid JSON.
+# Values orjson cannot encode (integers beyond 64 bits, non-string keys) fall back to the
+# standard library.
+
+import json
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Dates and dataclasses go through the provider's default() so they serialize like Flask's
+ORJSON_OPTIONS = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS) if orjson is not None else 0
+
+def encode_json(body):
+    """body as compact JSON bytes with sorted keys and a trailing newline, like jsonify outside debug mode."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(body, default=DefaultJSONProvider.default,
+                                option=ORJSON_OPTIONS | orjson.OPT_SORT_KEYS | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            pass
+    return json.dumps(body, default=DefaultJSONProvider.default, sort_keys=True, separators=(',', ':')).encode('utf-8') + b'\n'
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding and decoding with orjson when it is available."""
+
+    def _orjson_options(self, indent=False):
+        option = ORJSON_OPTIONS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs):
+        # Keyword arguments are json.dumps options, which orjson does not take
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        try:
+            return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+        except TypeError:
+            return super().dumps(obj)
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        try:
+            body = orjson.dumps(obj, default=self.default,
+                                option=self._orjson_options(indent) | orjson.OPT_APPEND_NEWLINE)
+        except TypeError:
+            return super().response(*args, **kwargs)
+        return self._app.response_class(body, mimetype=self.mimetype)
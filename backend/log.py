@@ -0,0 +1,76 @@
+# backend/log.py
+# Logging setup shared by the Flask app, the database helpers and the static generator.
+# Modules get their own logger with get_logger(__name__) and log with %-style arguments,
+# so messages are only formatted when a handler actually emits them. Debug records can be
+# sampled so verbose dumps stay affordable when debug logging is switched on in production.
+#
+# Environment variables:
+#   LOG_LEVEL         DEBUG, INFO (default), WARNING, ERROR
+#   LOG_FORMAT        'text' (default) or 'json' for one JSON object per line
+#   LOG_DEBUG_SAMPLE  fraction of debug records to keep, e.g. 0.01 (default: 1, keep all)
+
+import os
+import sys
+import json
+import random
+import logging
+
+ROOT_LOGGER = 'backend'
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s: %(message)s'
+
+# Attributes every LogRecord has; anything else was passed through extra={...}
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+class JSONFormatter(logging.Formatter):
+    """Formats records as single-line JSON, including any fields passed through extra={...}."""
+    def format(self, record):
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class DebugSampler(logging.Filter):
+    """Keeps only a fraction of DEBUG records; other levels always pass."""
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record):
+        return record.levelno > logging.DEBUG or random.random() < self.rate
+
+def configure_logging(level=None, fmt=None, debug_sample=None):
+    """
+    Installs a stderr handler on the 'backend' logger. Safe to call more than once;
+    later calls replace the handler. Arguments default to the LOG_* environment variables.
+    """
+    level = (level or os.environ.get('LOG_LEVEL', 'INFO')).upper()
+    fmt = fmt or os.environ.get('LOG_FORMAT', 'text')
+    if debug_sample is None:
+        debug_sample = float(os.environ.get('LOG_DEBUG_SAMPLE', '1'))
+
+    handler = logging.StreamHandler(sys.stderr)
+    handler.setFormatter(JSONFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    if debug_sample < 1:
+        handler.addFilter(DebugSampler(debug_sample))
+
+    logger = logging.getLogger(ROOT_LOGGER)
+    for existing in list(logger.handlers):
+        logger.removeHandler(existing)
+    logger.addHandler(handler)
+    logger.setLevel(level)
+    logger.propagate = False
+    return logger
+
+def get_logger(name):
+    """Returns the logger for a module. Scripts run as __main__ log under 'backend.<script>'."""
+    if not name.startswith(ROOT_LOGGER):
+        name = f"{ROOT_LOGGER}.{name.rsplit('.', 1)[-1]}"
+    return logging.getLogger(name)
@@ -0,0 +1,129 @@
+# backend/login_guard.py
+# Keeps admin logins from starving the rest of the worker.
+# Password hashes are deliberately slow to check (600,000 PBKDF2 rounds). Login attempts are
+# throttled with token buckets per client IP and per (username, IP), so a credential-stuffing
+# burst is refused before any hashing happens. A looser bucket per username, charged only by
+# failed checks, caps guessing spread over many addresses. One address running out of
+# attempts for a username does not stop the owner logging in from another.
+# The checks that pass run on a small dedicated thread pool (hashlib releases the GIL while it
+# hashes), which caps the CPU logins can take. When that pool is full, new attempts are
+# refused instead of queueing, and public reads keep their threads.
+# Buckets are per process: with N workers an address gets up to N times the configured rate.
+
+import os
+import time
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from werkzeug.security import check_password_hash
+
+# Attempts allowed in a burst, and how many are regained per minute
+LOGIN_IP_BURST = int(os.environ.get('LOGIN_IP_BURST', '20'))
+LOGIN_IP_PER_MINUTE = float(os.environ.get('LOGIN_IP_PER_MINUTE', '10'))
+LOGIN_USER_IP_BURST = int(os.environ.get('LOGIN_USER_IP_BURST', '5'))
+LOGIN_USER_IP_PER_MINUTE = float(os.environ.get('LOGIN_USER_IP_PER_MINUTE', '5'))
+# Failed checks allowed per username from all addresses together
+LOGIN_USER_BURST = int(os.environ.get('LOGIN_USER_BURST', '50'))
+LOGIN_USER_PER_MINUTE = float(os.environ.get('LOGIN_USER_PER_MINUTE', '20'))
+# Threads checking passwords, and checks allowed to wait for one
+LOGIN_HASH_THREADS = int(os.environ.get('LOGIN_HASH_THREADS', '2'))
+LOGIN_MAX_PENDING = int(os.environ.get('LOGIN_MAX_PENDING', '8'))
+# Longest a request waits for its password check
+LOGIN_HASH_TIMEOUT = 10.0
+# Buckets remembered per limiter; the least recently used are dropped first
+MAX_BUCKETS = 10000
+
+class LoginThrottled(Exception):
+    """Too many attempts; retry_after is the number of seconds until the next one is allowed."""
+    def __init__(self, retry_after):
+        super().__init__(f"Too many login attempts, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+class LoginBusy(Exception):
+    """Every password-checking slot is taken."""
+
+class TokenBuckets:
+    """One token bucket per key: capacity tokens, refilled at per_minute tokens a minute."""
+    def __init__(self, capacity, per_minute, max_keys=MAX_BUCKETS):
+        self.capacity = capacity
+        self.rate = per_minute / 60.0
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        # key -> (tokens, time of last update)
+        self._buckets = OrderedDict()
+        self.rejected = 0
+
+    def take(self, key, now=None):
+        """Takes a token for key. Raises LoginThrottled when its bucket is empty."""
+        self._update(key, now, cost=1)
+
+    def check(self, key, now=None):
+        """Raises LoginThrottled when key's bucket is empty, without taking a token."""
+        self._update(key, now, cost=0)
+
+    def charge(self, key, now=None):
+        """Takes a token for key if one is left. Never raises."""
+        try:
+            self._update(key, now, cost=1)
+        except LoginThrottled:
+            pass
+
+    def _update(self, key, now, cost):
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now)
+                self._buckets.move_to_end(key)
+                self.rejected += 1
+                retry_after = (1 - tokens) / self.rate if self.rate else 60
+                raise LoginThrottled(max(int(retry_after + 0.999), 1))
+            self._buckets[key] = (tokens - cost, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._buckets.clear()
+
+class LoginGuard:
+    def __init__(self, hash_threads=LOGIN_HASH_THREADS, max_pending=LOGIN_MAX_PENDING):
+        self.by_ip = TokenBuckets(LOGIN_IP_BURST, LOGIN_IP_PER_MINUTE)
+        self.by_username_ip = TokenBuckets(LOGIN_USER_IP_BURST, LOGIN_USER_IP_PER_MINUTE)
+        self.failures_by_username = TokenBuckets(LOGIN_USER_BURST, LOGIN_USER_PER_MINUTE)
+        self.executor = ThreadPoolExecutor(hash_threads, thread_name_prefix='login-hash')
+        # Checks running or waiting for a thread
+        self._slots = threading.BoundedSemaphore(hash_threads + max_pending)
+
+    def throttle(self, ip, username):
+        """
+        Raises LoginThrottled when the address, the username from this address, or the
+        username's failed checks are out of attempts. Only the first two are charged here.
+        """
+        username = str(username).lower()
+        self.failures_by_username.check(username)
+        self.by_ip.take(ip)
+        self.by_username_ip.take((username, ip))
+
+    def failed(self, username):
+        """Records a failed password check for username."""
+        self.failures_by_username.charge(str(username).lower())
+
+    def check_password(self, pwhash, password):
+        """check_password_hash() on the hashing pool. Raises LoginBusy when the pool is full."""
+        if not self._slots.acquire(blocking=False):
+            raise LoginBusy()
+        try:
+            future = self.executor.submit(check_password_hash, pwhash, password)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=LOGIN_HASH_TIMEOUT)
+        except TimeoutError:
+            raise LoginBusy() from None
+
+login_guard = LoginGuard()
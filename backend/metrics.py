@@ -0,0 +1,143 @@
+# backend/metrics.py
+# Request metrics in the Prometheus text exposition format.
+# Requests are recorded into a fixed number of shards picked by thread id, each with its own
+# lock, so concurrent requests rarely wait on each other and the number of shards does not
+# grow with the number of threads a server starts. Shards are only merged when
+# /api/admin/metrics is scraped. Metrics are per worker process:
+# scrape each worker (or run a single worker) to see the whole picture.
+
+import os
+import time
+import threading
+from bisect import bisect_left
+
+# Upper bounds of the latency buckets, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = 'handbook'
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+# Shards per process; more than the threads likely to record at the same moment
+METRICS_SHARDS = int(os.environ.get('METRICS_SHARDS', '16'))
+
+class _Shard:
+    __slots__ = ('lock', 'latency', 'requests', 'in_flight')
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # (method, route) -> [count per bucket..., +Inf count, sum]
+        self.latency = {}
+        # (method, route, status) -> count
+        self.requests = {}
+        self.in_flight = 0
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels):
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+class Metrics:
+    def __init__(self, buckets=LATENCY_BUCKETS, shards=METRICS_SHARDS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._shards = tuple(_Shard() for _ in range(shards))
+        self._caches = {}
+
+    def _shard(self):
+        # Native thread ids are small consecutive numbers, so threads spread evenly
+        return self._shards[threading.get_native_id() % len(self._shards)]
+
+    def request_started(self):
+        shard = self._shard()
+        with shard.lock:
+            shard.in_flight += 1
+
+    def request_finished(self):
+        shard = self._shard()
+        with shard.lock:
+            shard.in_flight -= 1
+
+    def observe(self, method, route, status, seconds):
+        """Records one finished request."""
+        bucket = bisect_left(self.buckets, seconds)
+        key = (method, route)
+        status_key = (method, route, status)
+        shard = self._shard()
+        with shard.lock:
+            series = shard.latency.get(key)
+            if series is None:
+                series = shard.latency[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[bucket] += 1
+            series[-1] += seconds
+            shard.requests[status_key] = shard.requests.get(status_key, 0) + 1
+
+    def register_cache(self, name, cache):
+        """Exports the hit and miss counters of a cache object (anything with .hits and .misses)."""
+        self._caches[name] = cache
+
+    def render(self):
+        """Merges the shards and returns the Prometheus text exposition."""
+        latency = {}
+        requests = {}
+        in_flight = 0
+        for shard in self._shards:
+            # Copied under the shard's lock so every series is consistent; the merge happens outside it
+            with shard.lock:
+                shard_latency = [(key, list(series)) for key, series in shard.latency.items()]
+                shard_requests = list(shard.requests.items())
+                in_flight += shard.in_flight
+            for key, series in shard_latency:
+                merged = latency.setdefault(key, [0] * len(series))
+                for i, value in enumerate(series):
+                    merged[i] += value
+            for key, count in shard_requests:
+                requests[key] = requests.get(key, 0) + count
+
+        p = METRIC_PREFIX
+        lines = [
+            f'# HELP {p}_http_request_duration_seconds Request latency by route.',
+            f'# TYPE {p}_http_request_duration_seconds histogram',
+        ]
+        for (method, route), series in sorted(latency.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                cumulative += count
+                lines.append(f'{p}_http_request_duration_seconds_bucket{_labels(method=method, route=route, le=bound)} {cumulative}')
+            lines.append(f'{p}_http_request_duration_seconds_sum{_labels(method=method, route=route)} {series[-1]:.6f}')
+            lines.append(f'{p}_http_request_duration_seconds_count{_labels(method=method, route=route)} {cumulative}')
+
+        lines += [
+            f'# HELP {p}_http_requests_total Finished requests by route and status.',
+            f'# TYPE {p}_http_requests_total counter',
+        ]
+        for (method, route, status), count in sorted(requests.items()):
+            lines.append(f'{p}_http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+
+        lines += [
+            f'# HELP {p}_http_requests_in_flight Requests currently being handled.',
+            f'# TYPE {p}_http_requests_in_flight gauge',
+            f'{p}_http_requests_in_flight {in_flight}',
+        ]
+
+        if self._caches:
+            for metric, kind, help_text in (('cache_hits_total', 'counter', 'Cache lookups served from memory.'),
+                                            ('cache_misses_total', 'counter', 'Cache lookups that went to the database.'),
+                                            ('cache_hit_ratio', 'gauge', 'Share of cache lookups served from memory.')):
+                lines += [f'# HELP {p}_{metric} {help_text}', f'# TYPE {p}_{metric} {kind}']
+                for name, cache in sorted(self._caches.items()):
+                    hits, misses = cache.hits, cache.misses
+                    if metric == 'cache_hits_total':
+                        value = hits
+                    elif metric == 'cache_misses_total':
+                        value = misses
+                    else:
+                        value = f'{hits / (hits + misses):.4f}' if hits + misses else 'NaN'
+                    lines.append(f'{p}_{metric}{_labels(cache=name)} {value}')
+
+        lines += [
+            f'# HELP {p}_process_start_time_seconds Start time of this worker since the Unix epoch.',
+            f'# TYPE {p}_process_start_time_seconds gauge',
+            f'{p}_process_start_time_seconds {self.started:.3f}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+metrics = Metrics()
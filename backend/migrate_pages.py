@@ -4,7 +4,8 @@ import os
 import sys
 sys.path.append('.')
 from werkzeug.security import generate_password_hash
-from database import create_connection, create_table, add_page_db, get_user, create_user
+from database import create_connection, add_page_db, get_user, create_user
+from migrations import migrate
 
 def migrate_pages_from_json_to_db():
     json_file_path = 'data/pages.json'
@@ -15,25 +16,7 @@ def migrate_pages_from_json_to_db():
         return
 
     try:
-        # Ensure the pages table exists
-        create_pages_table = """
-        CREATE TABLE IF NOT EXISTS pages (
-          id TEXT PRIMARY KEY,
-          title TEXT NOT NULL,
-          slug TEXT UNIQUE,
-          content TEXT,
-          published BOOLEAN NOT NULL,
-          is_chapter BOOLEAN NOT NULL,
-          parent_id TEXT,
-          design TEXT,
-          meta_description TEXT,
-          meta_keywords TEXT,
-          custom_css TEXT,
-          FOREIGN KEY (parent_id) REFERENCES pages (id) ON DELETE CASCADE
-        );
-        """
-        create_table(conn, create_pages_table)
-        print("Pages table ensured to exist.")
+        migrate(conn)  # Ensure the pages table exists
 
         if os.path.exists(json_file_path):
             with open(json_file_path, 'r', encoding='utf-8') as f:
@@ -53,8 +36,10 @@ def migrate_pages_from_json_to_db():
                     meta_description = item.get('meta_description', '')
                     meta_keywords = item.get('meta_keywords', '')
                     custom_css = item.get('custom_css', '')
+                    placeholder_image = item.get('placeholder_image')
+                    embedded_video = item.get('embedded_video')
 
-                    add_page_db(conn, page_id, title, slug, content, published, is_chapter, parent_id, design, meta_description, meta_keywords, custom_css)
+                    add_page_db(conn, page_id, title, slug, content, published, is_chapter, parent_id, design, meta_description, meta_keywords, custom_css, placeholder_image, embedded_video)
                     print(f"Migrated page: {title} (ID: {page_id})")
 
                     if 'children' in item and item['children']:
@@ -79,15 +64,7 @@ def setup_initial_admin_user():
         return
 
     try:
-        create_users_table = """
-        CREATE TABLE IF NOT EXISTS users (
-          id INTEGER PRIMARY KEY AUTOINCREMENT,
-          username TEXT NOT NULL UNIQUE,
-          password TEXT NOT NULL
-        );
-        """
-        create_table(conn, create_users_table)
-        print("Users table ensured to exist for admin setup.")
+        migrate(conn)  # Ensure the users table exists
 
         # Check if admin user already exists
         admin_user = get_user(conn, "admin")
@@ -0,0 +1,314 @@
+# backend/migrations.py
+# Ordered schema migrations for site.db.
+# The number of the last applied migration is kept in PRAGMA user_version, so checking that
+# a database is up to date is one integer read. Each migration runs in its own transaction
+# together with the version bump, so an interrupted run resumes where it stopped.
+# Migrations are append-only: never edit one that has shipped, add a new one instead.
+#
+#   python -m backend.migrations --db site.db
+
+import sqlite3
+import argparse
+
+try:
+    from backend.log import configure_logging, get_logger
+except ImportError:  # Run from inside backend/
+    from log import configure_logging, get_logger
+
+logger = get_logger(__name__)
+
+# --- Migration 1: base tables ---
+
+CREATE_USERS_TABLE = """
+CREATE TABLE IF NOT EXISTS users (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username TEXT NOT NULL UNIQUE,
+    password TEXT NOT NULL,
+    token TEXT UNIQUE,
+    last_login TEXT
+);
+"""
+
+CREATE_MENUS_TABLE = """
+CREATE TABLE IF NOT EXISTS menus (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    menu_data TEXT NOT NULL
+);
+"""
+
+CREATE_WIDGETS_TABLE = """
+CREATE TABLE IF NOT EXISTS widgets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL UNIQUE,
+    widget_type TEXT NOT NULL,
+    widget_data TEXT NOT NULL
+);
+"""
+
+PAGES_TABLE_SQL = """
+CREATE TABLE {name} (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    slug TEXT UNIQUE,
+    content TEXT,
+    published BOOLEAN NOT NULL,
+    is_chapter BOOLEAN NOT NULL,
+    parent_id TEXT,
+    design TEXT,
+    meta_description TEXT,
+    meta_keywords TEXT,
+    custom_css TEXT,
+    summary TEXT,
+    placeholder_image TEXT,
+    embedded_video TEXT,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (parent_id) REFERENCES pages(id) ON DELETE CASCADE
+);
+"""
+
+CREATE_SETTINGS_TABLE = """
+CREATE TABLE IF NOT EXISTS settings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    setting_key TEXT NOT NULL UNIQUE,
+    setting_value TEXT
+);
+"""
+
+def create_base_tables(conn):
+    for sql in (CREATE_USERS_TABLE, CREATE_MENUS_TABLE, CREATE_WIDGETS_TABLE,
+                PAGES_TABLE_SQL.replace('CREATE TABLE {name}', 'CREATE TABLE IF NOT EXISTS pages'),
+                CREATE_SETTINGS_TABLE):
+        conn.execute(sql)
+
+# --- Migration 2: columns added over time by the old init scripts ---
+
+ADDED_COLUMNS = {
+    'users': [('token', 'TEXT'), ('last_login', 'TEXT')],
+    'pages': [('meta_description', 'TEXT'), ('meta_keywords', 'TEXT'), ('custom_css', 'TEXT'),
+              ('summary', 'TEXT'), ('placeholder_image', 'TEXT'), ('embedded_video', 'TEXT')],
+}
+
+def table_columns(conn, table):
+    """Returns {column name: declared type} with a single PRAGMA call."""
+    return {row[1]: row[2] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+def add_missing_columns(conn):
+    for table, columns in ADDED_COLUMNS.items():
+        existing = table_columns(conn, table)
+        for column, column_type in columns:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+
+# --- Migration 3: pages.created_at ---
+# SQLite cannot ADD COLUMN with a CURRENT_TIMESTAMP default, so databases created without
+# created_at get their pages table rebuilt. Rowids are kept, since sibling order is rowid order.
+
+def add_pages_created_at(conn):
+    existing = table_columns(conn, 'pages')
+    if 'created_at' in existing:
+        return
+    conn.execute(PAGES_TABLE_SQL.format(name='pages_rebuilt'))
+    rebuilt = table_columns(conn, 'pages_rebuilt')
+    for column, column_type in existing.items():
+        if column not in rebuilt:  # Keep columns added by hand
+            conn.execute(f"ALTER TABLE pages_rebuilt ADD COLUMN {column} {column_type}")
+    columns = ', '.join(existing)
+    conn.execute(f"INSERT INTO pages_rebuilt (rowid, {columns}, created_at) "
+                 f"SELECT rowid, {columns}, CURRENT_TIMESTAMP FROM pages")
+    conn.execute("DROP TABLE pages")
+    conn.execute("ALTER TABLE pages_rebuilt RENAME TO pages")
+
+# --- Migration 4: indexes for the hot read paths ---
+
+def create_read_indexes(conn):
+    for sql in (
+        # Admin page listing (keyset pagination by title or creation time, with filters)
+        "CREATE INDEX IF NOT EXISTS idx_pages_title ON pages(title, id)",
+        "CREATE INDEX IF NOT EXISTS idx_pages_parent_title ON pages(parent_id, title, id)",
+        "CREATE INDEX IF NOT EXISTS idx_pages_published_title ON pages(published, title, id)",
+        "CREATE INDEX IF NOT EXISTS idx_pages_created_at ON pages(created_at, id)",
+        # Sidebar subtrees and child counts: children of a parent, filtered by published
+        "CREATE INDEX IF NOT EXISTS idx_pages_parent_published ON pages(parent_id, published)",
+        # token_required looks the user up by token on every admin request
+        "CREATE INDEX IF NOT EXISTS idx_users_token ON users(token)",
+    ):
+        conn.execute(sql)
+
+# --- Migration 5: revision counters (backend/revisions.py) ---
+
+def create_revisions_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS revisions (
+            name TEXT PRIMARY KEY,
+            revision INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+# --- Migration 6: responsive image derivatives (backend/images.py) ---
+
+def create_image_derivatives_table(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS image_derivatives (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            source_path TEXT NOT NULL,
+            path TEXT NOT NULL UNIQUE,
+            format TEXT NOT NULL,
+            width INTEGER NOT NULL,
+            height INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_image_derivatives_source ON image_derivatives(source_path, width)")
+
+# --- Migration 7: keep the 'pages' revision current on every page write ---
+# Triggers bump it inside the writing transaction, whether the write comes from the API,
+# a batch, or a script such as import_pages.py, so cached page trees never miss a change.
+
+def create_revision_triggers(conn, table, revision_name):
+    bump = (f"INSERT INTO revisions (name, revision) VALUES ('{revision_name}', 1) "
+            "ON CONFLICT(name) DO UPDATE SET revision = revision + 1;")
+    for event in ('INSERT', 'UPDATE', 'DELETE'):
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS {table}_revision_{event.lower()} "
+                     f"AFTER {event} ON {table} BEGIN {bump} END")
+
+def create_pages_revision_triggers(conn):
+    create_revision_triggers(conn, 'pages', 'pages')
+
+# --- Migration 8: the same for menus and widgets (backend/content_cache.py) ---
+
+def create_document_revision_triggers(conn):
+    create_revision_triggers(conn, 'menus', 'menus')
+    create_revision_triggers(conn, 'widgets', 'widgets')
+
+# --- Migration 9: the same for image_derivatives (read by backend/replica.py) ---
+
+def create_images_revision_triggers(conn):
+    create_revision_triggers(conn, 'image_derivatives', 'images')
+
+# --- Migration 10: page change log for /api/sidebar/changes ---
+# Every page write appends (pages revision, page id, kind) to page_changes in the writing
+# transaction, so clients can ask what changed since a revision instead of refetching the
+# tree. The 'pages' revision bump moves into the same triggers so each change row carries
+# the revision its write produced. Updates that leave the row as it was (the sidebar reorder
+# rewrites every page) neither bump the revision nor log anything, so caches keyed by the
+# revision survive them.
+# The log keeps about the last PAGE_CHANGES_KEPT entries: every PAGE_CHANGES_COMPACT_EVERY
+# entries, older ones are dropped and the 'page_changes_horizon' revision moves to the newest
+# revision whose changes are gone. Clients polling from before the horizon have to resync.
+# A migration that adds pages columns must recreate pages_change_update so they are compared.
+
+PAGE_CHANGES_KEPT = 1000
+PAGE_CHANGES_COMPACT_EVERY = 100
+
+def create_page_changes_log(conn):
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS page_changes (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            revision INTEGER NOT NULL,
+            page_id TEXT NOT NULL,
+            change TEXT NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_page_changes_revision ON page_changes(revision)")
+    # Nothing before now was logged
+    row = conn.execute("SELECT revision FROM revisions WHERE name = 'pages'").fetchone()
+    conn.execute("INSERT INTO revisions (name, revision) VALUES ('page_changes_horizon', ?) "
+                 "ON CONFLICT(name) DO UPDATE SET revision = excluded.revision", (row[0] if row else 0,))
+
+    for event in ('insert', 'update', 'delete'):
+        conn.execute(f"DROP TRIGGER IF EXISTS pages_revision_{event}")
+    bump = ("INSERT INTO revisions (name, revision) VALUES ('pages', 1) "
+            "ON CONFLICT(name) DO UPDATE SET revision = revision + 1;")
+    current = "(SELECT revision FROM revisions WHERE name = 'pages')"
+    log = "INSERT INTO page_changes (revision, page_id, change) SELECT " + current + ", {page_id}, {change} WHERE {condition};"
+    changed = ' OR '.join(f"OLD.{column} IS NOT NEW.{column}" for column in table_columns(conn, 'pages'))
+    kind = ("CASE WHEN OLD.id IS NOT NEW.id THEN 'insert' "
+            "WHEN OLD.parent_id IS NOT NEW.parent_id THEN 'move' "
+            "WHEN OLD.published IS NOT NEW.published THEN 'visibility' ELSE 'update' END")
+    triggers = {
+        'INSERT': ('', bump + log.format(page_id='NEW.id', change="'insert'", condition='1')),
+        'UPDATE': (f'WHEN {changed} ',
+                   bump + log.format(page_id='OLD.id', change="'delete'", condition='OLD.id IS NOT NEW.id')
+                   + log.format(page_id='NEW.id', change=kind, condition='1')),
+        'DELETE': ('', bump + log.format(page_id='OLD.id', change="'delete'", condition='1')),
+    }
+    for event, (when, body) in triggers.items():
+        conn.execute(f"CREATE TRIGGER IF NOT EXISTS pages_change_{event.lower()} "
+                     f"AFTER {event} ON pages {when}BEGIN {body} END")
+
+    # Compaction by entry count, once every PAGE_CHANGES_COMPACT_EVERY entries
+    cutoff = f"NEW.id - {PAGE_CHANGES_KEPT}"
+    conn.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS page_changes_compact
+        AFTER INSERT ON page_changes WHEN NEW.id % {PAGE_CHANGES_COMPACT_EVERY} = 0 BEGIN
+            UPDATE revisions
+               SET revision = max(revision, COALESCE((SELECT max(revision) FROM page_changes WHERE id <= {cutoff}), revision))
+             WHERE name = 'page_changes_horizon';
+            DELETE FROM page_changes WHERE id <= {cutoff};
+        END
+    """)
+
+MIGRATIONS = [
+    (1, "Create base tables", create_base_tables),
+    (2, "Add user and page columns missing from older databases", add_missing_columns),
+    (3, "Rebuild pages with created_at", add_pages_created_at),
+    (4, "Create indexes for page listing, sidebar and token lookups", create_read_indexes),
+    (5, "Create revisions table", create_revisions_table),
+    (6, "Create image_derivatives table", create_image_derivatives_table),
+    (7, "Bump the pages revision on every page write", create_pages_revision_triggers),
+    (8, "Bump the menus and widgets revisions on every write", create_document_revision_triggers),
+    (9, "Bump the images revision on every image derivative write", create_images_revision_triggers),
+    (10, "Log page changes for the sidebar delta feed", create_page_changes_log),
+]
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+def schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+def migrate(conn):
+    """
+    Applies every migration newer than the database's user_version. Returns the final version.
+    Safe to run from several processes at once: each step re-checks the version after
+    taking the write lock.
+    """
+    version = schema_version(conn)
+    if version >= LATEST_VERSION:
+        return version
+    if conn.in_transaction:
+        conn.commit()
+    for number, description, apply in MIGRATIONS:
+        if number <= version:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            version = schema_version(conn)
+            if number <= version:
+                conn.rollback()  # Another process got here first
+                continue
+            apply(conn)
+            conn.execute(f"PRAGMA user_version = {number}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        version = number
+        logger.info("Applied migration %d: %s", number, description)
+    return version
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bring a handbook database up to the latest schema.")
+    parser.add_argument('--db', default='site.db', help="Path to the SQLite database (default: site.db)")
+    args = parser.parse_args(argv)
+    configure_logging()
+    conn = sqlite3.connect(args.db)
+    try:
+        before = schema_version(conn)
+        after = migrate(conn)
+    finally:
+        conn.close()
+    logger.info("Schema version %d -> %d", before, after)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+# backend/replica.py
+# In-memory read replica of site.db for public traffic.
+# The whole database is copied into an in-memory SQLite database with the backup API, and
+# public reads run against that copy, so they never wait on an editor's write lock or on
+# disk. Each copy is a generation with its own name on SQLite's memdb VFS, shared by every
+# thread of the process. A new generation is built when the revisions the public pages
+# depend on move, then swapped in with a single assignment. An old generation is freed once
+# the last request holding it (or a connection to it) is done.
+# Requires SQLite 3.36+ (memdb VFS). Built before the workers fork (create_app(warm=True)),
+# the first generation is shared copy-on-write.
+
+import os
+import sqlite3
+import threading
+import itertools
+
+try:
+    from backend.log import get_logger
+    from backend.revisions import get_revisions
+    from backend import sqltrace
+except ImportError:  # Run from inside backend/
+    from log import get_logger
+    from revisions import get_revisions
+    import sqltrace
+
+logger = get_logger(__name__)
+
+# Data sets public reads depend on: page rows and image derivatives (for srcset)
+REPLICA_REVISIONS = ('pages', 'images')
+
+def replica_key(revisions):
+    return tuple(revisions.get(name, 0) for name in REPLICA_REVISIONS)
+
+def is_current(generation, key):
+    return generation is not None and all(have >= want for have, want in zip(generation.key, key))
+
+class Generation:
+    """One immutable in-memory copy and the revisions it was copied at."""
+    def __init__(self, uri, revisions, anchor):
+        self.uri = uri
+        self.revisions = revisions
+        self.key = replica_key(revisions)
+        # Keeps the in-memory database alive for as long as this object is referenced
+        self._anchor = anchor
+
+    def connect(self):
+        # Traced like site.db connections when SQL_TRACE is on (see backend/sqltrace.py)
+        conn = sqltrace.connect(self.uri, uri=True, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA query_only = 1")
+        return conn
+
+class ReadReplica:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+        self._current = None
+        self._names = itertools.count(1)
+        self.refreshes = 0
+
+    def _copy(self):
+        uri = f"file:/handbook-replica-{os.getpid()}-{next(self._names)}?vfs=memdb"
+        anchor = sqlite3.connect(uri, uri=True, check_same_thread=False)
+        source = sqlite3.connect(self.db_path)
+        try:
+            # One step, under a single read transaction, so the copy is consistent
+            source.backup(anchor)
+        finally:
+            source.close()
+        # Revisions as of the copy itself, not as of the check that triggered it
+        return Generation(uri, get_revisions(anchor), anchor)
+
+    def current(self, revisions):
+        """
+        Returns a Generation at least as new as revisions (the counters just read from disk).
+        One thread copies while the others needing the new data wait for it.
+        """
+        key = replica_key(revisions)
+        generation = self._current
+        if is_current(generation, key):
+            return generation
+        with self._lock:
+            generation = self._current
+            if is_current(generation, key):
+                return generation
+            new = self._copy()
+            self._current = new
+            self.refreshes += 1
+            logger.debug("Read replica refreshed to %s", dict(new.revisions))
+        return new
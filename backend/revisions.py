@@ -0,0 +1,28 @@
+# backend/revisions.py
+# Change counters shared by every worker process.
+# Each cached data set has a named row in the revisions table. Writers bump it in the same
+# transaction as their change; readers compare it with the revision their cache was built
+# from and reload when it moved. Reading every counter is a single small query.
+# The revisions table is created by migration 5 (backend/migrations.py). Settings are bumped
+# with bump_revision(); pages, menus and widgets by triggers (migrations 7, 8 and 10).
+
+import sqlite3
+
+def bump_revision(conn, name):
+    """
+    Increments the revision of name and returns the new value. Does not commit: call it inside
+    the write transaction so the data change and the new revision become visible together.
+    """
+    conn.execute(
+        "INSERT INTO revisions (name, revision) VALUES (?, 1) "
+        "ON CONFLICT(name) DO UPDATE SET revision = revision + 1",
+        (name,)
+    )
+    return conn.execute("SELECT revision FROM revisions WHERE name = ?", (name,)).fetchone()[0]
+
+def get_revisions(conn):
+    """Returns {name: revision} for every tracked data set."""
+    try:
+        return dict(conn.execute("SELECT name, revision FROM revisions").fetchall())
+    except sqlite3.OperationalError:
+        return {}  # Database not migrated yet, so nothing has been written through the new paths
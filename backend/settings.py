@@ -0,0 +1,67 @@
+# backend/settings.py
+# Site settings (title, footer text, social links) cached in-process.
+# The whole settings table is loaded in one query and kept until its revision in the
+# revisions table moves, so reading a setting on a rendered page costs a dict lookup.
+# Updates are written in a single transaction and refresh the cache directly.
+
+import threading
+
+from backend.revisions import bump_revision
+
+# Keys the admin panel may edit
+EDITABLE_SETTINGS = ("site_title", "footer_text", "social_facebook", "social_twitter")
+REVISION_NAME = 'settings'
+
+class SettingsCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = None
+        self._revision = None
+        self.hits = 0
+        self.misses = 0
+
+    def all(self, conn, revision):
+        """
+        Returns every setting as a dict. revision is the current 'settings' revision;
+        the table is only read again when it differs from the one the cache was built at.
+        """
+        with self._lock:
+            if self._values is not None and self._revision == revision:
+                self.hits += 1
+                return self._values
+            self.misses += 1
+        values = dict(conn.execute("SELECT setting_key, setting_value FROM settings").fetchall())
+        with self._lock:
+            self._values = values
+            self._revision = revision
+        return values
+
+    def get(self, conn, revision, key, default=None):
+        return self.all(conn, revision).get(key, default)
+
+    def update(self, conn, values):
+        """Upserts several settings with one commit and bumps the settings revision."""
+        try:
+            conn.executemany(
+                "INSERT INTO settings (setting_key, setting_value) VALUES (?, ?) "
+                "ON CONFLICT(setting_key) DO UPDATE SET setting_value = excluded.setting_value",
+                list(values.items())
+            )
+            revision = bump_revision(conn, REVISION_NAME)
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        with self._lock:
+            if self._values is not None and self._revision == revision - 1:
+                # Nobody else wrote in between, so the cache can be updated in place
+                self._values = {**self._values, **values}
+                self._revision = revision
+            else:
+                self._values = None
+
+    def clear(self):
+        with self._lock:
+            self._values = None
+
+settings_cache = SettingsCache()
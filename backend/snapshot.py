@@ -0,0 +1,236 @@
+# backend/snapshot.py
+# Read-only, in-process views of the page tree for the public endpoints.
+# A TreeSnapshot is built from a single query over pages and its pages are never modified
+# afterwards, so request threads share it without locking. It is rebuilt when the 'pages' revision moves
+# (migration 7 bumps it on every page write). Built before the worker processes fork, it is
+# shared between them copy-on-write.
+# Sanitized page bodies are kept in a bounded LRU keyed by page id. An entry is only used
+# while the stored content is unchanged, so edits never serve stale HTML.
+# The files of the generated static pages directory are listed too, and listed again only
+# when the directory or the generator's marker file changes, so requests for pages that do
+# not exist cost two stat() calls instead of a lookup plus a re-read of 404.html.
+
+import os
+import re
+import html
+import threading
+from collections import OrderedDict
+
+# Sanitized bodies kept per process; enough for every page of a typical handbook
+SANITIZED_CACHE_SIZE = 1024
+SNIPPET_LENGTH = 160
+TAG_PATTERN = re.compile(r'<[^>]+>')
+
+def page_text(content):
+    """Plain text of a page body, for searching and snippets."""
+    return ' '.join(html.unescape(TAG_PATTERN.sub(' ', content or '')).split())
+
+def snippet(text, lowered, terms):
+    """About SNIPPET_LENGTH characters of text around the first term found in it."""
+    position = min((lowered.find(term) for term in terms if term in lowered), default=0)
+    start = max(position - SNIPPET_LENGTH // 4, 0)
+    end = start + SNIPPET_LENGTH
+    return ('…' if start else '') + text[start:end] + ('…' if end < len(text) else '')
+
+class TreeSnapshot:
+    """Every page at one revision, indexed by id and slug, plus the public sidebar tree."""
+    def __init__(self, revision, pages):
+        self.revision = revision
+        self.pages = pages
+        self.by_id = {page['id']: page for page in pages}
+        self.by_slug = {page['slug']: page for page in pages if page['slug']}
+        # Slugs /api/pages/<slug> serves; anything else is answered with a 404 straight away
+        self.published_slugs = frozenset(page['slug'] for page in pages if page['published'] and page['slug'])
+        self.children = {}
+        for page in pages:
+            self.children.setdefault(page['parent_id'], []).append(page)
+        self.public_sidebar = self._published_tree(None)
+        # Lowercased text of the published pages, built by the first search
+        self._search_index = None
+        # id -> (parent_id, position, item) of public sidebar nodes, built on first use
+        self._public_positions = None
+
+    def _published_tree(self, parent_id):
+        # Same shape as build_nested_pages() filtered to published pages: only chapters get
+        # 'children', and an unpublished chapter hides its whole subtree
+        items = []
+        for page in self.children.get(parent_id, ()):
+            if not page['published']:
+                continue
+            item = page.copy()
+            if item['is_chapter']:
+                item['children'] = self._published_tree(item['id'])
+            items.append(item)
+        return items
+
+    def public_position(self, page_id):
+        """
+        (parent id, index among its siblings, sidebar item) of a page shown in the public
+        sidebar, or None when it is not shown (unpublished, under an unpublished chapter, or gone).
+        """
+        positions = self._public_positions
+        if positions is None:
+            # Built the same way by any thread that gets here first, like the search index
+            positions = {}
+            stack = [(None, self.public_sidebar)]
+            while stack:
+                parent_id, items = stack.pop()
+                for position, item in enumerate(items):
+                    positions[item['id']] = (parent_id, position, item)
+                    if item.get('children'):
+                        stack.append((item['id'], item['children']))
+            self._public_positions = positions
+        return positions.get(page_id)
+
+    def breadcrumbs(self, slug):
+        """Home, then each ancestor, then the page itself. Empty when the slug is unknown."""
+        page = self.by_slug.get(slug)
+        if page is None:
+            return []
+        trail = []
+        seen = {page['id']}
+        parent = self.by_id.get(page['parent_id'])
+        while parent is not None and parent['id'] not in seen:
+            trail.append({'title': parent['title'], 'url': f"/pages/{parent['slug']}", 'active': False})
+            seen.add(parent['id'])
+            parent = self.by_id.get(parent['parent_id'])
+        trail.reverse()
+        return ([{'title': 'Home', 'url': '/index.html', 'active': False}] + trail
+                + [{'title': page['title'], 'url': None, 'active': True}])
+
+    def search(self, query, limit):
+        """
+        Published pages whose title or text contains every term of query (case-insensitive),
+        title matches first. Returns [{'title', 'slug', 'snippet'}].
+        """
+        index = self._search_index
+        if index is None:
+            # Two threads may both build it; the results are identical, so either one wins
+            index = self._search_index = [
+                (page, page['title'].lower(), text, text.lower())
+                for page in self.pages if page['published'] and page['slug']
+                for text in (page_text(page['content']),)
+            ]
+        terms = query.lower().split()
+        title_matches, text_matches = [], []
+        for page, title, text, lowered in index:
+            if all(term in title or term in lowered for term in terms):
+                in_title = all(term in title for term in terms)
+                (title_matches if in_title else text_matches).append((page, text, lowered))
+        return [{'title': page['title'], 'slug': page['slug'], 'snippet': snippet(text, lowered, terms)}
+                for page, text, lowered in (title_matches + text_matches)[:limit]]
+
+class SnapshotCache:
+    """Holds the current TreeSnapshot; one thread rebuilds it while the others wait."""
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, revision, load_pages):
+        """Returns the snapshot for revision; load_pages() fetches every page on a miss."""
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.revision == revision:
+            self.hits += 1
+            return snapshot
+        with self._lock:
+            snapshot = self._snapshot
+            if snapshot is not None and snapshot.revision == revision:
+                self.hits += 1
+                return snapshot
+            self.misses += 1
+            snapshot = self._snapshot = TreeSnapshot(revision, load_pages())
+        return snapshot
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+
+class SanitizedContentCache:
+    """LRU of sanitize(content) per page id."""
+    def __init__(self, sanitize, maxsize=SANITIZED_CACHE_SIZE):
+        self.sanitize = sanitize
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        # page id -> (raw content, sanitized content)
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, page_id, content):
+        with self._lock:
+            entry = self._entries.get(page_id)
+            if entry is not None and entry[0] == content:
+                self._entries.move_to_end(page_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        sanitized = self.sanitize(content)
+        with self._lock:
+            self._entries[page_id] = (content, sanitized)
+            self._entries.move_to_end(page_id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return sanitized
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+# Written by backend/generate_static_pages.py after every run, so regenerated files are noticed
+STATIC_PAGES_MARKER = '.generated'
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+class StaticPageIndex:
+    """
+    Relative paths of the files under a static pages directory, plus the bytes of its
+    404.html (None when there is none). Re-read when the directory's mtime (files added,
+    removed or renamed) or the generator's marker file (files rewritten in place) changes.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        self._lock = threading.Lock()
+        # (version, frozenset of paths, 404 body)
+        self._state = None
+        self.hits = 0
+        self.misses = 0
+
+    def _scan(self):
+        paths = set()
+        for root, _, files in os.walk(self.directory):
+            relative = os.path.relpath(root, self.directory)
+            for name in files:
+                if relative == '.' and name == STATIC_PAGES_MARKER:
+                    continue
+                paths.add(name if relative == '.' else f"{relative.replace(os.sep, '/')}/{name}")
+        try:
+            with open(os.path.join(self.directory, '404.html'), 'rb') as f:
+                not_found = f.read()
+        except OSError:
+            not_found = None
+        return frozenset(paths), not_found
+
+    def _version(self):
+        return _mtime(self.directory), _mtime(os.path.join(self.directory, STATIC_PAGES_MARKER))
+
+    def get(self):
+        """Returns (paths, 404 body) as the directory is now."""
+        version = self._version()
+        state = self._state
+        if state is not None and state[0] == version:
+            self.hits += 1
+            return state[1], state[2]
+        with self._lock:
+            state = self._state
+            if state is None or state[0] != version:
+                self.misses += 1
+                state = self._state = (version, *self._scan())
+        return state[1], state[2]
+
+tree_cache = SnapshotCache()
@@ -0,0 +1,136 @@
+# backend/sqltrace.py
+# Opt-in SQL tracing for finding N+1 query patterns.
+# When enabled (SQL_TRACE=1), connections are created with TracingConnection. Every statement
+# SQLite runs is seen through set_trace_callback, including the implicit BEGIN/COMMIT, and
+# execute()/executemany() calls are timed. At the end of a request the app reports the
+# statement count and SQL time in a Server-Timing header, counts statements run again with
+# the same values (X-SQL-Duplicates), and logs both kinds of repetition. Timings cover executing a statement up to its first row, not later fetches.
+#
+# Environment variables:
+#   SQL_TRACE              set to 1 to enable tracing
+#   SQL_TRACE_REPEAT_LIMIT a statement run this many times in one request is flagged (default: 5)
+
+import os
+import time
+import sqlite3
+from collections import Counter
+
+try:
+    from backend.log import get_logger
+except ImportError:  # Run from inside backend/
+    from log import get_logger
+
+logger = get_logger(__name__)
+
+REPEAT_LIMIT = int(os.environ.get('SQL_TRACE_REPEAT_LIMIT', '5'))
+
+# Transaction statements legitimately repeat once per transaction
+_TRANSACTION_STATEMENTS = ('BEGIN', 'COMMIT', 'ROLLBACK', 'SAVEPOINT', 'RELEASE')
+
+def tracing_enabled():
+    return os.environ.get('SQL_TRACE', '').lower() in ('1', 'true', 'yes', 'on')
+
+class QueryTrace:
+    """Statistics for the statements run on one connection."""
+    def __init__(self):
+        self.statements = 0
+        self.sql_time = 0.0
+        # Statement text as written (with ? placeholders) -> number of executions
+        self.templates = Counter()
+        # Statement text with bound values, as reported by SQLite -> number of executions
+        self.expanded = Counter()
+
+    def on_statement(self, statement):
+        # set_trace_callback hook; called by SQLite for every statement it starts
+        self.statements += 1
+        self.expanded[statement] += 1
+
+    def record(self, sql, seconds):
+        self.templates[' '.join(sql.split())] += 1
+        self.sql_time += seconds
+
+    def repeated(self, limit=REPEAT_LIMIT):
+        """Returns [(statement, count)] for statements run at least limit times, most frequent first."""
+        return [(sql, count) for sql, count in self.templates.most_common() if count >= limit]
+
+    def duplicates(self):
+        """Returns [(statement, count)] for statements run more than once with the same values."""
+        return [(sql, count) for sql, count in self.expanded.most_common()
+                if count > 1 and not sql.lstrip().upper().startswith(_TRANSACTION_STATEMENTS)]
+
+    def duplicate_count(self):
+        """Number of executions that repeated an earlier statement with the same values."""
+        return sum(count - 1 for _, count in self.duplicates())
+
+    def merge(self, other):
+        """Adds the statistics of another trace (e.g. the read replica connection) to this one."""
+        self.statements += other.statements
+        self.sql_time += other.sql_time
+        self.templates.update(other.templates)
+        self.expanded.update(other.expanded)
+
+    def server_timing(self):
+        """Value for a Server-Timing response header."""
+        return f'sql;dur={self.sql_time * 1000:.2f};desc="{self.statements} statements"'
+
+    def log_summary(self, label):
+        """Logs the totals at debug level, and repeated or duplicate statements as warnings."""
+        logger.debug("%s: %d SQL statements in %.2f ms", label, self.statements, self.sql_time * 1000)
+        repeated = self.repeated()
+        if repeated:
+            logger.warning(
+                "%s: possible N+1 queries (%d statements, %.2f ms): %s", label, self.statements,
+                self.sql_time * 1000, '; '.join(f'{count}x {sql}' for sql, count in repeated[:5])
+            )
+        duplicates = self.duplicates()
+        if duplicates:
+            logger.warning(
+                "%s: %d duplicate SQL statements (same values run again): %s", label,
+                self.duplicate_count(), '; '.join(f'{count}x {sql}' for sql, count in duplicates[:5])
+            )
+
+class TracingCursor(sqlite3.Cursor):
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.connection.trace.record(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.connection.trace.record(sql, time.perf_counter() - start)
+
+class TracingConnection(sqlite3.Connection):
+    """sqlite3 connection that times every execute() and counts every statement."""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.trace = QueryTrace()
+        self.set_trace_callback(self.trace.on_statement)
+
+    def cursor(self, factory=TracingCursor):
+        return super().cursor(factory)
+
+    # Connection.execute() does not go through cursor(), so it is timed separately
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self.trace.record(sql, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self.trace.record(sql, time.perf_counter() - start)
+
+def connect(db_path, **kwargs):
+    """sqlite3.connect() that returns a TracingConnection when tracing is enabled."""
+    if tracing_enabled():
+        kwargs.setdefault('factory', TracingConnection)
+    return sqlite3.connect(db_path, **kwargs)
@@ -0,0 +1,363 @@
+# backend/uploads.py
+# Content-addressed storage for uploaded images and videos.
+# Uploaded files are written straight to a staging file while being hashed and size/type
+# checked, then moved to <uploads>/<aa>/<bb>/<sha256>.<ext>. Uploading the same bytes again
+# reuses the stored file instead of writing a new copy.
+# Large files can also be sent in chunks over several requests (init, append, complete),
+# which lets an interrupted upload resume from the last byte the server received.
+
+import os
+import re
+import json
+import time
+import uuid
+import shutil
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from flask import Request, current_app
+from werkzeug.exceptions import RequestEntityTooLarge, UnsupportedMediaType
+from werkzeug.formparser import default_stream_factory
+
+from backend.config import MAX_IMAGE_SIZE, MAX_VIDEO_SIZE, MAX_REQUEST_SIZE
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+IMAGE_EXTENSIONS = {"png", "jpg", "jpeg", "gif"}
+VIDEO_EXTENSIONS = {"mp4", "mov", "avi"}
+ALLOWED_EXTENSIONS = IMAGE_EXTENSIONS | VIDEO_EXTENSIONS
+
+CHUNK_SIZE = 64 * 1024
+STAGING_DIR_NAME = '.staging'
+
+# Leading bytes expected for each extension, as (offset, signature) pairs
+FILE_SIGNATURES = {
+    'png': [(0, b'\x89PNG\r\n\x1a\n')],
+    'jpg': [(0, b'\xff\xd8\xff')],
+    'gif': [(0, b'GIF87a'), (0, b'GIF89a')],
+    'mp4': [(4, b'ftyp')],
+    'mov': [(4, b'ftyp'), (4, b'moov'), (4, b'mdat'), (4, b'wide'), (4, b'free')],
+    'avi': [(8, b'AVI ')],
+}
+SIGNATURE_BYTES = 12
+
+def file_extension(filename):
+    """Returns the normalized lowercase extension of filename ('jpeg' becomes 'jpg')."""
+    if not filename or '.' not in filename:
+        return ''
+    extension = filename.rsplit('.', 1)[1].lower()
+    return 'jpg' if extension == 'jpeg' else extension
+
+def allowed_file(filename):
+    return file_extension(filename) in ALLOWED_EXTENSIONS
+
+def max_size_for(extension):
+    """Returns the size limit in bytes for files with the given extension."""
+    return MAX_VIDEO_SIZE if extension in VIDEO_EXTENSIONS else MAX_IMAGE_SIZE
+
+def matches_signature(extension, head):
+    """Checks the first bytes of a file against the signatures expected for its extension."""
+    return any(head[offset:offset + len(signature)] == signature
+               for offset, signature in FILE_SIGNATURES.get(extension, []))
+
+class HashingFile:
+    """
+    Writable staging file that hashes, sizes and type-checks bytes as they are written.
+    Oversized or mislabelled files are rejected as soon as the offending bytes arrive,
+    rather than after the whole body has been received.
+    """
+    def __init__(self, staging_dir, extension):
+        os.makedirs(staging_dir, exist_ok=True)
+        fd, self.path = tempfile.mkstemp(dir=staging_dir, suffix='.part')
+        self.file = os.fdopen(fd, 'w+b')
+        self.extension = extension
+        self.max_size = max_size_for(extension)
+        self.sha256 = hashlib.sha256()
+        self.size = 0
+        self.head = b''
+        self.committed = False
+
+    def write(self, data):
+        self.size += len(data)
+        if self.size > self.max_size:
+            self.discard()
+            raise RequestEntityTooLarge(f"Files of type .{self.extension} may be at most {self.max_size // (1024 * 1024)} MB")
+        if len(self.head) < SIGNATURE_BYTES:
+            self.head += data[:SIGNATURE_BYTES - len(self.head)]
+            if len(self.head) == SIGNATURE_BYTES:
+                self.check_signature()
+        self.sha256.update(data)
+        return self.file.write(data)
+
+    def check_signature(self):
+        if not matches_signature(self.extension, self.head):
+            self.discard()
+            raise UnsupportedMediaType(f"File content does not match the .{self.extension} extension")
+
+    def hexdigest(self):
+        return self.sha256.hexdigest()
+
+    def finish(self):
+        """Closes the staging file once every byte has been written."""
+        if len(self.head) < SIGNATURE_BYTES:
+            self.check_signature()
+        self.file.close()
+
+    def discard(self):
+        """Closes and removes the staging file."""
+        if not self.file.closed:
+            self.file.close()
+        if not self.committed and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def close(self):
+        # Called by werkzeug when the request ends; anything not committed is thrown away
+        self.discard()
+
+    def __getattr__(self, name):
+        # seek/read/tell etc. go to the underlying file
+        return getattr(self.file, name)
+
+class UploadRequest(Request):
+    """
+    Request class that streams uploaded files directly into the upload staging directory
+    instead of werkzeug's default in-memory/temporary spool.
+    """
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        if not filename:
+            # Empty file inputs still send a part; let werkzeug handle them as usual
+            return default_stream_factory(total_content_length=total_content_length, content_type=content_type,
+                                          filename=filename, content_length=content_length)
+        extension = file_extension(filename)
+        if extension not in ALLOWED_EXTENSIONS:
+            raise UnsupportedMediaType(f"Allowed file types: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+        return HashingFile(staging_dir(current_app.config['UPLOADS_DIR']), extension)
+
+def staging_dir(uploads_dir):
+    return os.path.join(uploads_dir, STAGING_DIR_NAME)
+
+def content_path(digest, extension):
+    """Returns the two-level fan-out path of a file, relative to the uploads directory."""
+    return f"{digest[:2]}/{digest[2:4]}/{digest}.{extension}"
+
+def place_in_store(path, digest, extension, uploads_dir):
+    """
+    Moves the finished file at path to its content-addressed location and returns the path
+    relative to uploads_dir. If the same content is already stored the new copy is dropped.
+    """
+    relative_path = content_path(digest, extension)
+    target = os.path.join(uploads_dir, *relative_path.split('/'))
+    if os.path.exists(target):
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        os.replace(path, target)
+    return relative_path
+
+def commit_staged_file(staged, uploads_dir):
+    """Moves a fully written HashingFile into content-addressed storage. Returns its relative path."""
+    staged.finish()
+    relative_path = place_in_store(staged.path, staged.hexdigest(), staged.extension, uploads_dir)
+    staged.committed = True
+    return relative_path
+
+def store_upload(file_storage, uploads_dir):
+    """
+    Stores an uploaded werkzeug FileStorage in content-addressed storage.
+    Returns the path relative to uploads_dir, e.g. 'ab/cd/abcd...ef.png'.
+    Raises UnsupportedMediaType or RequestEntityTooLarge for rejected files.
+    """
+    extension = file_extension(file_storage.filename)
+    if extension not in ALLOWED_EXTENSIONS:
+        raise UnsupportedMediaType(f"Allowed file types: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+
+    staged = file_storage.stream
+    if not isinstance(staged, HashingFile):
+        # The body was spooled by another request class; copy it through the same checks
+        staged = HashingFile(staging_dir(uploads_dir), extension)
+        try:
+            shutil.copyfileobj(file_storage.stream, staged, CHUNK_SIZE)
+        except Exception:
+            staged.discard()
+            raise
+    return commit_staged_file(staged, uploads_dir)
+
+# --- Chunked, resumable uploads ---
+# An upload session is a <id>.part file holding the bytes received so far and an <id>.json
+# file with the declared filename and size, both in the staging directory. The current
+# offset is simply the size of the .part file, so any worker can continue a session.
+# Appends and completion hold an exclusive lock on the .part file, so two requests for the
+# same session (a client retrying a chunk it thinks was lost) cannot both pass the offset
+# check and write the same bytes twice.
+
+MAX_CHUNK_SIZE = 16 * 1024 * 1024
+# Sessions untouched for this long are removed when new sessions are started
+STALE_UPLOAD_SECONDS = 24 * 60 * 60
+UPLOAD_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+CONTENT_RANGE_PATTERN = re.compile(r'^bytes (\d+)-(\d+)/(\d+|\*)$')
+
+class UploadSessionError(Exception):
+    """Raised for invalid chunked upload requests. Carries the HTTP status and current offset."""
+    def __init__(self, status, message, offset=None):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.offset = offset
+
+def _session_paths(uploads_dir, upload_id):
+    if not UPLOAD_ID_PATTERN.match(upload_id or ''):
+        raise UploadSessionError(404, 'Upload not found')
+    base = os.path.join(staging_dir(uploads_dir), upload_id)
+    return base + '.part', base + '.json'
+
+def _load_session(uploads_dir, upload_id):
+    part_path, meta_path = _session_paths(uploads_dir, upload_id)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        raise UploadSessionError(404, 'Upload not found')
+    meta['offset'] = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+    return meta, part_path, meta_path
+
+# Used where fcntl is missing; serializes every session in the process instead of one
+_part_lock = threading.Lock()
+
+@contextmanager
+def _locked_part(part_path):
+    """Opens a session's .part file with an exclusive lock held. Yields it positioned at its end."""
+    try:
+        f = open(part_path, 'r+b')
+    except FileNotFoundError:
+        raise UploadSessionError(404, 'Upload not found')
+    with f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            _part_lock.acquire()
+        try:
+            # The session may have been completed or aborted while we waited for the lock
+            try:
+                moved = os.stat(part_path).st_ino != os.fstat(f.fileno()).st_ino
+            except FileNotFoundError:
+                moved = True
+            if moved:
+                raise UploadSessionError(404, 'Upload not found')
+            f.seek(0, os.SEEK_END)
+            yield f
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                _part_lock.release()
+
+def cleanup_stale_uploads(uploads_dir, max_age=STALE_UPLOAD_SECONDS):
+    """Removes chunked upload sessions that have not received data for max_age seconds."""
+    directory = staging_dir(uploads_dir)
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - max_age
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass  # Removed concurrently
+
+def start_chunked_upload(uploads_dir, filename, size):
+    """Opens a chunked upload session for a file of the declared size. Returns its state."""
+    extension = file_extension(filename)
+    if extension not in ALLOWED_EXTENSIONS:
+        raise UploadSessionError(415, f"Allowed file types: {', '.join(sorted(ALLOWED_EXTENSIONS))}")
+    if not isinstance(size, int) or size <= 0:
+        raise UploadSessionError(400, 'A positive file size is required')
+    if size > max_size_for(extension):
+        raise UploadSessionError(413, f"Files of type .{extension} may be at most {max_size_for(extension) // (1024 * 1024)} MB")
+
+    cleanup_stale_uploads(uploads_dir)
+    upload_id = uuid.uuid4().hex
+    part_path, meta_path = _session_paths(uploads_dir, upload_id)
+    os.makedirs(staging_dir(uploads_dir), exist_ok=True)
+    open(part_path, 'wb').close()
+    with open(meta_path, 'w', encoding='utf-8') as f:
+        json.dump({'filename': filename, 'extension': extension, 'size': size}, f)
+    return {'upload_id': upload_id, 'offset': 0, 'size': size, 'max_chunk_size': MAX_CHUNK_SIZE}
+
+def get_chunked_upload(uploads_dir, upload_id):
+    """Returns the state of a session, so a client can resume from 'offset'."""
+    meta, _, _ = _load_session(uploads_dir, upload_id)
+    return {'upload_id': upload_id, 'offset': meta['offset'], 'size': meta['size']}
+
+def parse_content_range(header):
+    """Parses 'bytes start-end/total' into (start, end). Raises UploadSessionError if malformed."""
+    match = CONTENT_RANGE_PATTERN.match(header or '')
+    if not match or int(match.group(2)) < int(match.group(1)):
+        raise UploadSessionError(400, "A 'Content-Range: bytes start-end/total' header is required")
+    return int(match.group(1)), int(match.group(2))
+
+def append_chunk(uploads_dir, upload_id, start, end, stream):
+    """
+    Appends bytes start..end (inclusive) read from stream to a session and returns the new offset.
+    The chunk must start exactly at the current offset; otherwise a 409 carrying the
+    offset the client should resume from is raised.
+    """
+    meta, part_path, _ = _load_session(uploads_dir, upload_id)
+    with _locked_part(part_path) as f:
+        offset = f.tell()
+        if start != offset:
+            raise UploadSessionError(409, 'Chunk does not start at the current offset', offset=offset)
+        length = end - start + 1
+        if length > MAX_CHUNK_SIZE:
+            raise UploadSessionError(413, f"Chunks may be at most {MAX_CHUNK_SIZE // (1024 * 1024)} MB", offset=offset)
+        if end >= meta['size']:
+            raise UploadSessionError(416, 'Chunk extends past the declared file size', offset=offset)
+
+        written = 0
+        while written < length:
+            data = stream.read(min(CHUNK_SIZE, length - written))
+            if not data:
+                break
+            f.write(data)
+            written += len(data)
+        if written != length:
+            # The connection dropped mid-chunk; roll back so the client can resend the whole chunk
+            f.truncate(start)
+            raise UploadSessionError(400, 'Chunk body is shorter than its Content-Range', offset=start)
+    return start + written
+
+def complete_chunked_upload(uploads_dir, upload_id):
+    """
+    Finishes a session once every byte has arrived: hashes and type-checks the file and moves
+    it into content-addressed storage. Returns the path relative to uploads_dir.
+    """
+    meta, part_path, meta_path = _load_session(uploads_dir, upload_id)
+    # Held until the file has left the staging directory, so no chunk lands in it meanwhile
+    with _locked_part(part_path) as f:
+        offset = f.tell()
+        if offset != meta['size']:
+            raise UploadSessionError(409, 'Upload is incomplete', offset=offset)
+
+        sha256 = hashlib.sha256()
+        f.seek(0)
+        head = f.read(SIGNATURE_BYTES)
+        sha256.update(head)
+        for data in iter(lambda: f.read(CHUNK_SIZE), b''):
+            sha256.update(data)
+        if not matches_signature(meta['extension'], head):
+            abort_chunked_upload(uploads_dir, upload_id)
+            raise UploadSessionError(415, f"File content does not match the .{meta['extension']} extension")
+
+        relative_path = place_in_store(part_path, sha256.hexdigest(), meta['extension'], uploads_dir)
+        os.remove(meta_path)
+    return relative_path
+
+def abort_chunked_upload(uploads_dir, upload_id):
+    """Discards a session and everything received for it."""
+    for path in _session_paths(uploads_dir, upload_id):
+        if os.path.exists(path):
+            os.remove(path)
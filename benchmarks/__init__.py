@@ -0,0 +1,4 @@
+# benchmarks/__init__.py
+# Benchmarks for the handbook backend, run against synthetic handbooks of growing size.
+#   python -m benchmarks --pages 100,1000,10000 --output report.json
+# See benchmarks/run.py for the options and benchmarks/thresholds.json for regression limits.
@@ -0,0 +1,265 @@
+# benchmarks/loadtest.py
+# Concurrent load test against a locally started server.
+# Generates a synthetic handbook (or copies an existing database), starts the app on it
+# (werkzeug's threaded server, or gunicorn with backend/wsgi.py), then drives a weighted mix
+# of public reads and admin saves from many threads, optionally spread over several
+# processes. Reports throughput, latency percentiles per operation and how many requests
+# failed with "database is locked".
+#   python -m benchmarks.loadtest --pages 2000 --duration 30 --threads 32
+#   python -m benchmarks.loadtest --server gunicorn --workers 4 --journal-mode wal -o load.json
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import socket
+import sqlite3
+import argparse
+import tempfile
+import threading
+import subprocess
+import http.client
+import multiprocessing
+from collections import defaultdict
+
+from benchmarks.synthetic import ADMIN_TOKEN, generate_handbook
+from benchmarks.run import REPO_ROOT
+
+# Operation name -> default share of the traffic
+DEFAULT_MIX = 'sidebar=30,sidebar_top=20,page=45,save=5'
+OPERATIONS = ('sidebar', 'sidebar_top', 'page', 'menu', 'save')
+LOCKED_MESSAGE = 'database is locked'
+SERVER_START_TIMEOUT = 30
+
+def parse_mix(value):
+    """Parses 'op=weight,...' into a list of (op, weight)."""
+    mix = []
+    for part in value.split(','):
+        name, _, weight = part.partition('=')
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation '{name}'. Available: {', '.join(OPERATIONS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+# --- Server ---
+
+def serve(port):
+    """Entry point of the werkzeug server subprocess; runs in the handbook's directory."""
+    from werkzeug.serving import make_server
+    from backend.app import app
+    server = make_server('127.0.0.1', port, app, threaded=True)
+    server.daemon_threads = True
+    print(f"Serving on 127.0.0.1:{port}", file=sys.stderr, flush=True)
+    server.serve_forever()
+
+def start_server(args, workdir, port, log_file):
+    """Starts the app on site.db in workdir and waits until it answers."""
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join([REPO_ROOT, env.get('PYTHONPATH', '')])
+    env.setdefault('LOG_LEVEL', 'WARNING')
+    if args.server == 'gunicorn':
+        command = [sys.executable, '-m', 'gunicorn', '--preload', '--workers', str(args.workers), '--threads', str(args.server_threads),
+                   '--bind', f'127.0.0.1:{port}', 'backend.wsgi:app']
+    else:
+        command = [sys.executable, '-m', 'benchmarks.loadtest', '--serve', str(port)]
+    process = subprocess.Popen(command, cwd=workdir, env=env, stdout=log_file, stderr=subprocess.STDOUT)
+
+    deadline = time.monotonic() + SERVER_START_TIMEOUT
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Server exited with status {process.returncode}; see {log_file.name}")
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/sidebar?depth=1')
+            conn.getresponse().read()
+            conn.close()
+            return process
+        except OSError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError(f"Server did not start within {SERVER_START_TIMEOUT}s; see {log_file.name}")
+
+# --- Load generation ---
+
+def _request(conn, op, rng, targets):
+    if op == 'sidebar':
+        conn.request('GET', '/api/sidebar')
+    elif op == 'sidebar_top':
+        conn.request('GET', '/api/sidebar?depth=1')
+    elif op == 'page':
+        conn.request('GET', f"/api/pages/{rng.choice(targets['slugs'])}")
+    elif op == 'menu':
+        conn.request('GET', '/api/menus/main')
+    elif op == 'save':
+        body = json.dumps({'content': f"<p>Edited by the load test at {time.time()}</p>"})
+        conn.request('PUT', f"/api/admin/pages/{rng.choice(targets['slugs'])}", body=body,
+                     headers={'Content-Type': 'application/json', 'Authorization': f'Bearer {ADMIN_TOKEN}'})
+    response = conn.getresponse()
+    return response.status, response.read()
+
+def _thread_loop(port, mix, targets, deadline, seed, samples):
+    rng = random.Random(seed)
+    names = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    while time.monotonic() < deadline:
+        op = rng.choices(names, weights)[0]
+        start = time.perf_counter()
+        try:
+            status, body = _request(conn, op, rng, targets)
+            locked = status >= 500 and LOCKED_MESSAGE.encode() in body
+        except (OSError, http.client.HTTPException):
+            status, locked = 0, False  # Connection error; reconnect for the next request
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        samples.append((op, status, time.perf_counter() - start, locked))
+    conn.close()
+
+def run_load(port, mix, targets, duration, threads, seed):
+    """Runs `threads` client threads for `duration` seconds and returns their samples."""
+    samples = []  # list.append is atomic, so the threads can share it
+    deadline = time.monotonic() + duration
+    workers = [threading.Thread(target=_thread_loop, args=(port, mix, targets, deadline, seed + i, samples))
+               for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return samples
+
+def _process_entry(arguments):
+    return run_load(*arguments)
+
+# --- Reporting ---
+
+def percentile(ordered, fraction):
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * fraction))] * 1000, 3)
+
+def summarize(samples, duration, locked_in_log):
+    by_op = defaultdict(list)
+    for sample in samples:
+        by_op[sample[0]].append(sample)
+
+    def stats(group):
+        latencies = sorted(latency for _, _, latency, _ in group)
+        errors = sum(1 for _, status, _, _ in group if status == 0 or status >= 500)
+        return {
+            'requests': len(group),
+            'throughput_rps': round(len(group) / duration, 2),
+            'errors': errors,
+            'error_rate': round(errors / len(group), 4) if group else 0.0,
+            'locked_errors': sum(1 for *_, locked in group if locked),
+            'p50_ms': percentile(latencies, 0.50),
+            'p90_ms': percentile(latencies, 0.90),
+            'p99_ms': percentile(latencies, 0.99),
+            'max_ms': round(latencies[-1] * 1000, 3) if latencies else None,
+        }
+
+    total = stats(samples)
+    # Error pages do not always include the message, so also count it in the server log
+    total['locked_errors_in_server_log'] = locked_in_log
+    return {'total': total, 'operations': {op: stats(group) for op, group in sorted(by_op.items())}}
+
+def prepare_database(args, workdir):
+    db_path = os.path.join(workdir, 'site.db')
+    if args.db:
+        shutil.copy(args.db, db_path)
+    else:
+        generate_handbook(db_path, args.pages, args.depth, args.fanout, args.content_size, args.seed)
+    conn = sqlite3.connect(db_path)
+    try:
+        if args.journal_mode:
+            conn.execute(f"PRAGMA journal_mode = {args.journal_mode}")
+        conn.execute("UPDATE users SET token = ? WHERE username = 'admin'", (ADMIN_TOKEN,))
+        conn.commit()
+        slugs = [row[0] for row in conn.execute("SELECT slug FROM pages WHERE published AND slug IS NOT NULL")]
+    finally:
+        conn.close()
+    if not slugs:
+        raise RuntimeError("The database has no published pages to request")
+    return {'slugs': slugs}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the handbook backend with concurrent readers and writers.")
+    parser.add_argument('--serve', type=int, metavar='PORT', help=argparse.SUPPRESS)  # Server subprocess mode
+    parser.add_argument('--db', help="Copy this database instead of generating a synthetic handbook")
+    parser.add_argument('--pages', type=int, default=1000, help="Synthetic handbook size (default: 1000)")
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--fanout', type=int, default=20)
+    parser.add_argument('--content-size', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--server', choices=('werkzeug', 'gunicorn'), default='werkzeug', help="Server to start (default: werkzeug)")
+    parser.add_argument('--workers', type=int, default=4, help="gunicorn worker processes (default: 4)")
+    parser.add_argument('--server-threads', type=int, default=1, help="gunicorn threads per worker (default: 1)")
+    parser.add_argument('--journal-mode', choices=('delete', 'truncate', 'wal'), help="SQLite journal mode to set before the run")
+    parser.add_argument('--mix', default=DEFAULT_MIX, help=f"Weighted operations (default: {DEFAULT_MIX})")
+    parser.add_argument('--duration', type=float, default=20, help="Seconds of load (default: 20)")
+    parser.add_argument('--threads', type=int, default=16, help="Client threads per process (default: 16)")
+    parser.add_argument('--processes', type=int, default=1, help="Client processes (default: 1)")
+    parser.add_argument('-o', '--output', help="Report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve)
+        return 0
+
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as e:
+        parser.error(str(e))
+
+    workdir = tempfile.mkdtemp(prefix='handbook-load-')
+    log_path = os.path.join(workdir, 'server.log')
+    process = None
+    try:
+        targets = prepare_database(args, workdir)
+        port = free_port()
+        with open(log_path, 'w') as log_file:
+            process = start_server(args, workdir, port, log_file)
+            print(f"Running {args.processes}x{args.threads} clients for {args.duration}s against {args.server}...", file=sys.stderr)
+            started = time.monotonic()
+            if args.processes > 1:
+                jobs = [(port, mix, targets, args.duration, args.threads, args.seed + 1000 * i) for i in range(args.processes)]
+                with multiprocessing.Pool(args.processes) as pool:
+                    samples = [sample for chunk in pool.map(_process_entry, jobs) for sample in chunk]
+            else:
+                samples = run_load(port, mix, targets, args.duration, args.threads, args.seed)
+            elapsed = time.monotonic() - started
+        with open(log_path, encoding='utf-8', errors='replace') as f:
+            locked_in_log = f.read().count(LOCKED_MESSAGE)
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait(timeout=10)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        'parameters': {key: value for key, value in vars(args).items() if key not in ('serve', 'output')},
+        'duration_s': round(elapsed, 2),
+        **summarize(samples, elapsed, locked_in_log),
+    }
+    output = json.dumps(report, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+    total = report['total']
+    print(f"{total['requests']} requests, {total['throughput_rps']} req/s, p50 {total['p50_ms']} ms, "
+          f"p99 {total['p99_ms']} ms, {total['errors']} errors ({total['locked_errors_in_server_log']} 'database is locked')",
+          file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,314 @@
+# benchmarks/run.py
+# Times the main read and write paths against synthetic handbooks of each requested size
+# and writes a JSON report. Medians are compared with benchmarks/thresholds.json and,
+# optionally, a previous report; the exit status is 1 when anything regressed.
+#   python -m benchmarks --pages 100,1000,10000 --output report.json
+#   python -m benchmarks --pages 1000 --baseline old-report.json --tolerance 1.25
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import platform
+import argparse
+import tempfile
+import statistics
+import contextlib
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import ADMIN_TOKEN, generate_handbook
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCHMARKS_DIR)
+DEFAULT_THRESHOLDS = os.path.join(BENCHMARKS_DIR, 'thresholds.json')
+AUTH_HEADERS = {'Authorization': f'Bearer {ADMIN_TOKEN}'}
+
+# name -> (function, pages above which it is skipped unless --no-limits)
+BENCHMARKS = {}
+
+def benchmark(name, max_pages=None):
+    """
+    Registers a benchmark. The decorated function receives the Context and returns
+    (run, setup): run is timed, setup (or None) is called untimed before each run.
+    """
+    def register(func):
+        BENCHMARKS[name] = (func, max_pages)
+        return func
+    return register
+
+class Context:
+    """Everything the benchmarks for one handbook size share."""
+    def __init__(self, workdir, db_path, pages, client, seed):
+        self.workdir = workdir
+        self.db_path = db_path
+        self.pages = pages
+        self.client = client
+        self.rng = random.Random(seed)
+        conn = sqlite3.connect(db_path)
+        try:
+            rows = conn.execute("SELECT id, slug, parent_id, published FROM pages ORDER BY rowid").fetchall()
+        finally:
+            conn.close()
+        self.published_slugs = [slug for _, slug, _, published in rows if published]
+        self.tree = self._build_tree(rows)
+        self._pages_json = None
+
+    @staticmethod
+    def _build_tree(rows):
+        """Nested [{'id', 'children'}] in the shape reorder_sidebar expects."""
+        nodes = {page_id: {'id': page_id, 'children': []} for page_id, _, _, _ in rows}
+        roots = []
+        for page_id, _, parent_id, _ in rows:
+            siblings = nodes[parent_id]['children'] if parent_id in nodes else roots
+            siblings.append(nodes[page_id])
+        return roots
+
+    def pages_json(self):
+        """Writes the handbook as data/pages.json-style nested JSON once and returns its path."""
+        if self._pages_json is None:
+            from backend.export import iter_export
+            self._pages_json = os.path.join(self.workdir, 'pages.json')
+            with open(self._pages_json, 'w', encoding='utf-8') as f:
+                for chunk in iter_export(self.db_path, 'json'):
+                    f.write(chunk)
+        return self._pages_json
+
+def _expect_ok(response):
+    if response.status_code >= 400:
+        raise RuntimeError(f"{response.request.method} {response.request.path} returned {response.status_code}")
+    return response
+
+def _clear_response_bodies():
+    from backend.compression import response_bodies
+    response_bodies.clear()
+
+# --- Benchmarks ---
+# Public reads are timed twice: with the rendered response body cache
+# (backend/compression.py) emptied before each run, and as repeated cache hits (*_warm).
+
+@benchmark('sidebar_full', max_pages=20000)
+def bench_sidebar_full(ctx):
+    return (lambda: _expect_ok(ctx.client.get('/api/sidebar'))), _clear_response_bodies
+
+@benchmark('sidebar_full_warm', max_pages=20000)
+def bench_sidebar_full_warm(ctx):
+    return (lambda: _expect_ok(ctx.client.get('/api/sidebar'))), None
+
+@benchmark('sidebar_top_level')
+def bench_sidebar_top_level(ctx):
+    return (lambda: _expect_ok(ctx.client.get('/api/sidebar?depth=1'))), _clear_response_bodies
+
+@benchmark('get_page')
+def bench_get_page(ctx):
+    def run():
+        _expect_ok(ctx.client.get(f'/api/pages/{ctx.rng.choice(ctx.published_slugs)}'))
+    return run, _clear_response_bodies
+
+@benchmark('get_page_warm')
+def bench_get_page_warm(ctx):
+    slug = ctx.rng.choice(ctx.published_slugs)  # One page, so every timed run is a cache hit
+    return (lambda: _expect_ok(ctx.client.get(f'/api/pages/{slug}'))), None
+
+@benchmark('build_nested_pages', max_pages=20000)
+def bench_build_nested_pages(ctx):
+    from backend.app import build_nested_pages
+    from backend.database import get_all_pages_db
+
+    def run():
+        conn = sqlite3.connect(ctx.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            build_nested_pages(get_all_pages_db(conn))
+        finally:
+            conn.close()
+    return run, None
+
+@benchmark('reorder_sidebar', max_pages=20000)
+def bench_reorder_sidebar(ctx):
+    payload = {'sidebar_order': ctx.tree}  # Same structure, so every run does identical work
+    return (lambda: _expect_ok(ctx.client.put('/api/admin/sidebar/reorder', json=payload, headers=AUTH_HEADERS))), None
+
+@benchmark('generate_static_pages', max_pages=2000)
+def bench_generate_static_pages(ctx):
+    from backend import generate_static_pages as generator
+    output_dir = os.path.join(ctx.workdir, 'static-pages')
+
+    def setup():
+        shutil.rmtree(output_dir, ignore_errors=True)
+        os.makedirs(output_dir)
+        generator.PAGES_FILE = ctx.pages_json()
+        generator.STATIC_PAGES_DIR = output_dir
+        generator.DB_PATH = ctx.db_path
+    return generator.generate_static_pages, setup
+
+@benchmark('import_pages', max_pages=20000)
+def bench_import_pages(ctx):
+    import import_pages
+    from backend.migrations import migrate
+    target = os.path.join(ctx.workdir, 'import.db')
+
+    def setup():
+        if os.path.exists(target):
+            os.remove(target)
+        conn = sqlite3.connect(target)
+        migrate(conn)
+        conn.close()
+    return (lambda: import_pages.import_pages_from_json(ctx.pages_json(), db_path=target)), setup
+
+# --- Running and reporting ---
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        'runs': len(samples),
+        'min_ms': round(ordered[0] * 1000, 3),
+        'median_ms': round(statistics.median(ordered) * 1000, 3),
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p95_ms': round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+def time_benchmark(run, setup, repeat, warmup=1):
+    samples = []
+    for index in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if index >= warmup:
+            samples.append(elapsed)
+    return samples
+
+def run_size(app, pages, args, names):
+    """Generates one handbook and runs the selected benchmarks against it."""
+    from backend.compression import response_bodies
+    from backend.content_cache import menu_cache, widget_cache
+    from backend.settings import settings_cache
+    from backend.snapshot import tree_cache
+    import backend.app as app_module
+
+    workdir = tempfile.mkdtemp(prefix=f'handbook-bench-{pages}-')
+    results = []
+    try:
+        db_path = os.path.join(workdir, 'site.db')
+        started = time.perf_counter()
+        generate_handbook(db_path, pages, args.depth, args.fanout, args.content_size, args.seed)
+        print(f"[{pages} pages] generated in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+        app.config['DATABASE'] = db_path
+        app_module._page_columns = None
+        for cache in (menu_cache, widget_cache, settings_cache, tree_cache, app_module.sanitized_content, response_bodies):
+            cache.clear()
+        ctx = Context(workdir, db_path, pages, app.test_client(), args.seed)
+
+        for name in names:
+            func, max_pages = BENCHMARKS[name]
+            result = {'name': name, 'pages': pages}
+            if max_pages is not None and pages > max_pages and not args.no_limits:
+                result['skipped'] = f"more than {max_pages} pages (use --no-limits to run anyway)"
+            else:
+                run, setup = func(ctx)
+                result.update(summarize(time_benchmark(run, setup, args.repeat)))
+                print(f"[{pages} pages] {name}: median {result['median_ms']} ms", file=sys.stderr)
+            results.append(result)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def threshold_for(thresholds, name, pages):
+    """Limit for the largest configured size that is not above pages, or None."""
+    limits = thresholds.get(name, {})
+    sizes = [int(size) for size in limits if int(size) <= pages]
+    return limits[str(max(sizes))] if sizes else None
+
+def find_regressions(results, thresholds, baseline=None, tolerance=1.25):
+    regressions = []
+    previous = {(r['name'], r['pages']): r for r in (baseline or {}).get('results', []) if 'median_ms' in r}
+    for result in results:
+        if 'median_ms' not in result:
+            continue
+        key = (result['name'], result['pages'])
+        limit = threshold_for(thresholds, *key)
+        if limit is not None and result['median_ms'] > limit:
+            regressions.append({'name': key[0], 'pages': key[1], 'median_ms': result['median_ms'],
+                                'limit_ms': limit, 'reason': 'threshold'})
+        if key in previous and result['median_ms'] > previous[key]['median_ms'] * tolerance:
+            regressions.append({'name': key[0], 'pages': key[1], 'median_ms': result['median_ms'],
+                                'baseline_ms': previous[key]['median_ms'], 'reason': 'baseline'})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the handbook backend on synthetic handbooks.")
+    parser.add_argument('--pages', default='100,1000', help="Comma-separated handbook sizes (default: 100,1000)")
+    parser.add_argument('--depth', type=int, default=4, help="Tree depth (default: 4)")
+    parser.add_argument('--fanout', type=int, default=20, help="Children per chapter (default: 20)")
+    parser.add_argument('--content-size', type=int, default=2000, help="Characters of content per page (default: 2000)")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help="Timed runs per benchmark (default: 5)")
+    parser.add_argument('--only', help="Comma-separated benchmark names to run (default: all)")
+    parser.add_argument('--no-limits', action='store_true', help="Also run slow benchmarks on large handbooks")
+    parser.add_argument('--thresholds', default=DEFAULT_THRESHOLDS, help="Regression limits (median ms)")
+    parser.add_argument('--baseline', help="Previous report to compare medians against")
+    parser.add_argument('--tolerance', type=float, default=1.25, help="Allowed slowdown against --baseline (default: 1.25)")
+    parser.add_argument('--no-fail', action='store_true', help="Exit 0 even when something regressed")
+    parser.add_argument('-o', '--output', help="Report file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    names = [name.strip() for name in args.only.split(',')] if args.only else list(BENCHMARKS)
+    unknown = [name for name in names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown benchmarks: {', '.join(unknown)}. Available: {', '.join(BENCHMARKS)}")
+    sizes = [int(size) for size in args.pages.split(',')]
+
+    # The app logs at info level by default; keep the timings free of log output
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    sys.path.insert(0, REPO_ROOT)  # For the importer scripts at the repository root
+    from backend.app import app
+
+    results = []
+    # Scripts under test print progress; keep stdout for the report
+    with contextlib.redirect_stdout(sys.stderr):
+        for pages in sizes:
+            results.extend(run_size(app, pages, args, names))
+
+    thresholds = {}
+    if args.thresholds and os.path.exists(args.thresholds):
+        with open(args.thresholds, encoding='utf-8') as f:
+            thresholds = json.load(f).get('thresholds', {})
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    regressions = find_regressions(results, thresholds, baseline, args.tolerance)
+
+    report = {
+        'generated_at': datetime.now(timezone.utc).isoformat(),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+        },
+        'parameters': {'pages': sizes, 'depth': args.depth, 'fanout': args.fanout,
+                       'content_size': args.content_size, 'seed': args.seed, 'repeat': args.repeat},
+        'results': results,
+        'regressions': regressions,
+    }
+    output = json.dumps(report, indent=2) + '\n'
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output)
+    else:
+        sys.stdout.write(output)
+
+    for regression in regressions:
+        limit = regression.get('limit_ms', regression.get('baseline_ms'))
+        print(f"REGRESSION {regression['name']} @ {regression['pages']} pages: "
+              f"{regression['median_ms']} ms (limit {limit} ms, {regression['reason']})", file=sys.stderr)
+    return 1 if regressions and not args.no_fail else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,114 @@
+# benchmarks/synthetic.py
+# Generator for synthetic handbooks of any size.
+# Pages are laid out breadth-first: `fanout` top-level chapters, each with up to `fanout`
+# children, down to `depth` levels. Everything above the last level is a chapter. Content
+# is HTML-ish filler of roughly `content_size` characters, reproducible for a given seed.
+#   python -m benchmarks.synthetic --pages 10000 -o /tmp/handbook.db
+
+import json
+import random
+import sqlite3
+import argparse
+from collections import deque
+
+from backend.migrations import migrate
+
+WORDS = ('somabay handbook policy benefit team guest resort shift leave travel housing '
+         'meal uniform safety training manager department schedule request approval contact').split()
+ADMIN_TOKEN = 'benchmark-token'
+
+def capacity(depth, fanout):
+    """Largest page count a tree with this depth and fan-out can hold."""
+    return sum(fanout ** level for level in range(1, depth + 1))
+
+def make_content(rng, size):
+    """Returns about size characters of paragraph/heading/list HTML."""
+    parts = []
+    length = 0
+    while length < size:
+        words = ' '.join(rng.choice(WORDS) for _ in range(rng.randint(20, 60)))
+        kind = rng.random()
+        if kind < 0.1:
+            block = f'<h2>{words[:40]}</h2>'
+        elif kind < 0.2:
+            block = '<ul>' + ''.join(f'<li>{word}</li>' for word in words.split()[:6]) + '</ul>'
+        else:
+            block = f'<p>{words}</p>'
+        parts.append(block)
+        length += len(block)
+    return ''.join(parts)[:size]
+
+def iter_pages(pages, depth, fanout, content_size, seed=0, published_ratio=0.9):
+    """Yields page dicts (id, title, slug, content, published, is_chapter, parent_id, design) in tree order."""
+    if pages > capacity(depth, fanout):
+        raise ValueError(f"{pages} pages do not fit in depth {depth} with fan-out {fanout}")
+    rng = random.Random(seed)
+    queue = deque([(None, 0)])  # (parent_id, level of the parent); the root is level 0
+    created = 0
+    while created < pages:
+        parent_id, level = queue.popleft()
+        for _ in range(fanout):
+            if created >= pages:
+                break
+            created += 1
+            page_id = f'page-{created}'
+            is_chapter = level + 1 < depth
+            yield {
+                'id': page_id,
+                'title': f"{rng.choice(WORDS).title()} {rng.choice(WORDS).title()} {created}",
+                'slug': page_id,
+                'content': make_content(rng, content_size),
+                'published': rng.random() < published_ratio,
+                'is_chapter': is_chapter,
+                'parent_id': parent_id,
+                'design': {'headerImage': None, 'theme': 'default'},
+            }
+            if is_chapter:
+                queue.append((page_id, level + 1))
+
+def generate_handbook(db_path, pages=1000, depth=4, fanout=20, content_size=2000, seed=0):
+    """
+    Creates a handbook database at db_path with the given shape, an admin user whose
+    token is ADMIN_TOKEN, and the site settings. Returns the number of pages written.
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn)
+        conn.execute("INSERT INTO users (username, password, token) VALUES ('admin', '!', ?)", (ADMIN_TOKEN,))
+        conn.executemany("INSERT INTO settings (setting_key, setting_value) VALUES (?, ?)",
+                         [('site_title', 'Synthetic Handbook'), ('footer_text', 'Benchmark data')])
+        count = 0
+        batch = []
+        for page in iter_pages(pages, depth, fanout, content_size, seed):
+            batch.append((page['id'], page['title'], page['slug'], page['content'], page['published'],
+                          page['is_chapter'], page['parent_id'], json.dumps(page['design'])))
+            if len(batch) >= 1000:
+                count += _insert_pages(conn, batch)
+                batch = []
+        count += _insert_pages(conn, batch)
+        conn.commit()
+        return count
+    finally:
+        conn.close()
+
+def _insert_pages(conn, rows):
+    conn.executemany(
+        "INSERT INTO pages (id, title, slug, content, published, is_chapter, parent_id, design) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+        rows
+    )
+    return len(rows)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic handbook database.")
+    parser.add_argument('--pages', type=int, default=1000)
+    parser.add_argument('--depth', type=int, default=4)
+    parser.add_argument('--fanout', type=int, default=20)
+    parser.add_argument('--content-size', type=int, default=2000, help="Characters of content per page")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', required=True, help="Database file to create")
+    args = parser.parse_args(argv)
+    count = generate_handbook(args.output, args.pages, args.depth, args.fanout, args.content_size, args.seed)
+    print(f"Wrote {count} pages to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -7,8 +7,8 @@ import sqlite3
 sys.path.append(os.path.join(os.path.dirname(__file__), 'backend'))
 from database import create_connection, add_page_db
 
-def import_pages_from_json(json_file="data/pages.json"):
-    conn = create_connection()
+def import_pages_from_json(json_file="data/pages.json", db_path="site.db"):
+    conn = create_connection(db_path)
     cursor = conn.cursor()
 
     with open(json_file, "r") as f:
@@ -23,7 +23,8 @@ def import_pages_from_json(json_file="data/pages.json"):
         design = page['design']
         is_chapter = bool(page.get('children'))
         
-        add_page_db(conn, page_id, title, slug, content, published, is_chapter, parent_id, design, None, None, None)
+        add_page_db(conn, page_id, title, slug, content, published, is_chapter, parent_id, design, None, None, None,
+                    page.get('placeholder_image'), page.get('embedded_video'))
 
         if 'children' in page and page['children']:
             for child in page['children']:
@@ -2,11 +2,23 @@
 // Client-side JavaScript for the Somabay Handbook Admin Panel dashboard.
 // Handles page management (CRUD), sidebar reordering, image uploads, and design options.
 
+// Files above this size are sent in resumable chunks (see uploadFileInChunks)
+const CHUNKED_UPLOAD_THRESHOLD = 8 * 1024 * 1024;
+const UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024;
+const UPLOAD_CHUNK_RETRIES = 5;
+
 async function uploadFile(inputId) {
   const fileInput = document.getElementById(inputId);
   if (!fileInput || fileInput.files.length === 0) {
     return null; // no file selected
   }
+  if (fileInput.files[0].size > CHUNKED_UPLOAD_THRESHOLD) {
+    const filePath = await uploadFileInChunks(fileInput.files[0]);
+    if (!filePath) {
+      alert("Failed to upload file: " + inputId);
+    }
+    return filePath;
+  }
 
   const formData = new FormData();
   formData.append("file", fileInput.files[0]);
@@ -28,6 +40,62 @@ async function uploadFile(inputId) {
   return data.file_path; // e.g. "/uploads/uuid.png"
 }
 
+// Uploads a large file in chunks. A failed chunk is retried from the offset the server
+// reports, so a dropped connection only costs the chunk that was in flight.
+async function uploadFileInChunks(file) {
+  const authHeaders = { "Authorization": "Bearer " + localStorage.getItem("adminToken") };
+
+  const startResponse = await fetch("/api/admin/uploads", {
+    method: "POST",
+    headers: { ...authHeaders, "Content-Type": "application/json" },
+    body: JSON.stringify({ filename: file.name, size: file.size })
+  });
+  if (!startResponse.ok) {
+    return null;
+  }
+  const { upload_id: uploadId } = await startResponse.json();
+  const uploadUrl = `/api/admin/uploads/${uploadId}`;
+
+  let offset = 0;
+  let failures = 0;
+  while (offset < file.size) {
+    const end = Math.min(offset + UPLOAD_CHUNK_SIZE, file.size);
+    try {
+      const response = await fetch(uploadUrl, {
+        method: "PUT",
+        headers: { ...authHeaders, "Content-Range": `bytes ${offset}-${end - 1}/${file.size}` },
+        body: file.slice(offset, end)
+      });
+      const data = await response.json();
+      if (response.ok) {
+        offset = data.offset;
+        failures = 0;
+        continue;
+      }
+      if (typeof data.offset !== "number") {
+        return null; // Rejected (too large, wrong type, ...), retrying will not help
+      }
+      offset = data.offset;
+    } catch (error) {
+      // Network error: ask the server how far it got
+      const status = await fetch(uploadUrl, { headers: authHeaders }).catch(() => null);
+      if (status && status.ok) {
+        offset = (await status.json()).offset;
+      }
+    }
+    if (++failures > UPLOAD_CHUNK_RETRIES) {
+      return null;
+    }
+  }
+
+  const completeResponse = await fetch(`${uploadUrl}/complete`, { method: "POST", headers: authHeaders });
+  if (!completeResponse.ok) {
+    return null;
+  }
+  const data = await completeResponse.json();
+  return data.file_path;
+}
+
 
 document.addEventListener('DOMContentLoaded', () => {
     const adminDashboardSection = document.getElementById('admin-dashboard');
@@ -131,25 +199,6 @@ document.addEventListener('DOMContentLoaded', () => {
         return flatList;
     }
 
-    /**
-     * Recursively finds a page by its ID in the sidebar structure.
-     * @param {Array} items - The sidebar items.
-     * @param {string} id - The ID of the page to find.
-     * @returns {Object|null} The found page object or null.
-     */
-    function findPageById(items, id) {
-        for (const item of items) {
-            if (item.id === id) {
-                return item;
-            }
-            if (item.children) {
-                const found = findPageById(item.children, id);
-                if (found) return found;
-            }
-        }
-        return null;
-    }
-
     /**
      * Handles admin logout.
      */
@@ -184,18 +233,26 @@ document.addEventListener('DOMContentLoaded', () => {
         await fetchCMSSettings();
     }
 
+    let pagesListCursor = null; // Keyset cursor for the next page of the admin pages list
+
     /**
-     * Fetches all pages and renders them in the dashboard.
+     * Fetches one page of results from the admin pages listing and renders it in the dashboard.
+     * Drafts are included, unlike the public sidebar.
+     * @param {boolean} append - True to append the next page of results, false to start over.
      */
-    async function fetchPagesList() {
+    async function fetchPagesList(append = false) {
         try {
-            const response = await fetch('/api/sidebar', { headers: getAuthHeaders() });
+            const params = new URLSearchParams({ fields: 'id,title,slug,published', limit: '50' });
+            if (append && pagesListCursor) {
+                params.set('after', pagesListCursor);
+            }
+            const response = await fetch(`/api/admin/pages?${params}`, { headers: getAuthHeaders() });
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
-            const sidebar = await response.json();
-            const allPages = flattenSidebar(sidebar); // Get a flat list of all pages
-            renderPagesList(allPages);
+            const data = await response.json();
+            pagesListCursor = data.next_cursor;
+            renderPagesList(data.pages, append);
         } catch (error) {
             console.error('Error fetching pages list:', error);
             pagesList.innerHTML = '<p class="text-danger">Failed to load pages.</p>';
@@ -207,19 +264,23 @@ document.addEventListener('DOMContentLoaded', () => {
     }
 
     /**
-     * Renders the list of all pages in the dashboard.
+     * Renders a page of results in the dashboard pages list.
      * @param {Array} pages - The array of page objects.
+     * @param {boolean} append - True to add to the existing list instead of replacing it.
      */
-    function renderPagesList(pages) {
-        pagesList.innerHTML = '';
-        if (pages.length === 0) {
-            pagesList.innerHTML = '<p>No pages found. Add a new page.</p>';
-            return;
+    function renderPagesList(pages, append = false) {
+        let ul = pagesList.querySelector('ul.list-group');
+        if (!append || !ul) {
+            pagesList.innerHTML = '';
+            if (pages.length === 0) {
+                pagesList.innerHTML = '<p>No pages found. Add a new page.</p>';
+                return;
+            }
+            ul = document.createElement('ul');
+            ul.classList.add('list-group');
+            pagesList.appendChild(ul);
         }
 
-        const ul = document.createElement('ul');
-        ul.classList.add('list-group');
-
         pages.forEach(page => {
             const li = document.createElement('li');
             li.classList.add('list-group-item');
@@ -232,29 +293,51 @@ document.addEventListener('DOMContentLoaded', () => {
                     </button>
                 </div>
             `;
+            // Add event listeners for edit and toggle visibility buttons
+            li.querySelector('.edit-page-btn').addEventListener('click', (e) => openEditPageModal(e.target.dataset.id));
+            li.querySelector('.toggle-visibility-btn').addEventListener('click', (e) => togglePageVisibility(e.target.dataset.id, e.target.dataset.published === 'true'));
             ul.appendChild(li);
         });
-        pagesList.appendChild(ul);
 
-        // Add event listeners for edit and toggle visibility buttons
-        document.querySelectorAll('.edit-page-btn').forEach(button => {
-            button.addEventListener('click', (e) => openEditPageModal(e.target.dataset.id));
-        });
-        document.querySelectorAll('.toggle-visibility-btn').forEach(button => {
-            button.addEventListener('click', (e) => togglePageVisibility(e.target.dataset.id, e.target.dataset.published === 'true'));
-        });
+        // Offer the next page of results, if any
+        const existingLoadMore = document.getElementById('load-more-pages');
+        if (existingLoadMore) {
+            existingLoadMore.remove();
+        }
+        if (pagesListCursor) {
+            const loadMoreButton = document.createElement('button');
+            loadMoreButton.id = 'load-more-pages';
+            loadMoreButton.classList.add('btn', 'btn-sm', 'btn-outline-primary', 'mt-2');
+            loadMoreButton.textContent = 'Load more';
+            loadMoreButton.addEventListener('click', () => fetchPagesList(true));
+            pagesList.appendChild(loadMoreButton);
+        }
+    }
+
+    /**
+     * Fetches one level of the sidebar, drafts included, from the admin sidebar endpoint.
+     * @param {string|null} parentId - The chapter whose children to fetch, or null for the top level.
+     * @returns {Array} The child nodes, each with a child_count.
+     */
+    async function fetchAdminSidebarLevel(parentId = null) {
+        const params = new URLSearchParams({ depth: '1' });
+        if (parentId) {
+            params.set('parent', parentId);
+        }
+        const response = await fetch(`/api/admin/sidebar?${params}`, { headers: getAuthHeaders() });
+        if (!response.ok) {
+            throw new Error(`HTTP error! status: ${response.status}`);
+        }
+        return response.json();
     }
 
     /**
-     * Fetches the sidebar structure and renders it as a sortable list for admin.
+     * Fetches the top level of the sidebar and renders it as a sortable list for admin.
+     * Chapters are expanded on demand, so the whole tree is never downloaded at once.
      */
     async function fetchSidebarForAdmin() {
         try {
-            const response = await fetch('/api/sidebar', { headers: getAuthHeaders() });
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            const sidebar = await response.json();
+            const sidebar = await fetchAdminSidebarLevel();
             renderSortableSidebar(sidebar, sidebarSortable);
             // Initialize jQuery UI Sortable
             $(sidebarSortable).sortable({
@@ -290,11 +373,28 @@ document.addEventListener('DOMContentLoaded', () => {
             const itemContent = document.createElement('div');
             itemContent.innerHTML = `
                 <span class="drag-handle me-2" style="cursor: grab;">&#x2261;</span>
-                <span>${item.title} (${item.slug || 'Chapter'})</span>
+                <span>${item.title} (${item.slug || 'Chapter'})${item.published ? '' : ' - Draft'}</span>
             `;
             li.appendChild(itemContent);
 
             const actions = document.createElement('div');
+            if (item.child_count > 0 && !item.children) {
+                // Children are loaded when the chapter is expanded
+                const expandButton = document.createElement('button');
+                expandButton.classList.add('btn', 'btn-sm', 'btn-outline-secondary', 'ms-2');
+                expandButton.textContent = `Expand (${item.child_count})`;
+                expandButton.addEventListener('click', async () => {
+                    try {
+                        item.children = await fetchAdminSidebarLevel(item.id);
+                        expandButton.remove();
+                        appendSortableChildren(li, item.children);
+                    } catch (error) {
+                        console.error('Error fetching chapter children:', error);
+                        alert('Failed to load the pages of this chapter.');
+                    }
+                });
+                actions.appendChild(expandButton);
+            }
             const editButton = document.createElement('button');
             editButton.classList.add('btn', 'btn-sm', 'btn-info', 'ms-2');
             editButton.textContent = 'Edit';
@@ -305,50 +405,61 @@ document.addEventListener('DOMContentLoaded', () => {
             parentElement.appendChild(li);
 
             if (item.children && item.children.length > 0) {
-                const nestedUl = document.createElement('ul');
-                nestedUl.classList.add('list-group', 'mt-2', 'ms-4'); // Indent nested items
-                // Make nested lists sortable too
-                $(nestedUl).sortable({
-                    axis: 'y',
-                    handle: '.drag-handle',
-                    placeholder: 'ui-state-highlight',
-                    forcePlaceholderSize: true,
-                    opacity: 0.8,
-                    update: function(event, ui) {
-                        console.log('Nested sidebar order changed.');
-                    }
-                });
-                $(nestedUl).disableSelection();
-                renderSortableSidebar(item.children, nestedUl);
-                li.appendChild(nestedUl);
+                appendSortableChildren(li, item.children);
+            }
+        });
+    }
+
+    /**
+     * Renders the children of a sidebar item as a nested sortable list under it.
+     * @param {HTMLElement} li - The list item of the parent chapter.
+     * @param {Array} children - The child sidebar items.
+     */
+    function appendSortableChildren(li, children) {
+        const nestedUl = document.createElement('ul');
+        nestedUl.classList.add('list-group', 'mt-2', 'ms-4'); // Indent nested items
+        // Make nested lists sortable too
+        $(nestedUl).sortable({
+            axis: 'y',
+            handle: '.drag-handle',
+            placeholder: 'ui-state-highlight',
+            forcePlaceholderSize: true,
+            opacity: 0.8,
+            update: function(event, ui) {
+                console.log('Nested sidebar order changed.');
             }
         });
+        $(nestedUl).disableSelection();
+        renderSortableSidebar(children, nestedUl);
+        li.appendChild(nestedUl);
     }
 
     /**
      * Populates the parent chapter dropdown for adding new pages.
+     * Only chapters can be parents, so only chapters are listed, drafts included.
      */
     async function populateParentOptions() {
         try {
-            const response = await fetch('/api/sidebar', { headers: getAuthHeaders() });
-            if (!response.ok) {
-                throw new Error(`HTTP error! status: ${response.status}`);
-            }
-            const sidebar = await response.json();
             addPageParentSelect.innerHTML = '<option value="">-- No Parent (Top Level) --</option>';
-            // Recursively add chapters to the dropdown
-            function addChaptersToSelect(items, indent = '') {
-                items.forEach(item => {
-                    if (item.children) { // Only chapters can be parents
-                        const option = document.createElement('option');
-                        option.value = item.id;
-                        option.textContent = `${indent}${item.title} (Chapter)`;
-                        addPageParentSelect.appendChild(option);
-                        addChaptersToSelect(item.children, indent + '-- ');
-                    }
+            let cursor = null;
+            do {
+                const params = new URLSearchParams({ is_chapter: '1', fields: 'id,title,published', limit: '200' });
+                if (cursor) {
+                    params.set('after', cursor);
+                }
+                const response = await fetch(`/api/admin/pages?${params}`, { headers: getAuthHeaders() });
+                if (!response.ok) {
+                    throw new Error(`HTTP error! status: ${response.status}`);
+                }
+                const data = await response.json();
+                data.pages.forEach(chapter => {
+                    const option = document.createElement('option');
+                    option.value = chapter.id;
+                    option.textContent = `${chapter.title} (Chapter${chapter.published ? '' : ', Draft'})`;
+                    addPageParentSelect.appendChild(option);
                 });
-            }
-            addChaptersToSelect(sidebar);
+                cursor = data.next_cursor;
+            } while (cursor);
         } catch (error) {
             console.error('Error populating parent options:', error);
         }
@@ -402,12 +513,12 @@ document.getElementById("add-page-form").addEventListener("submit", async functi
      */
     async function openEditPageModal(pageId) {
         try {
-            const response = await fetch('/api/sidebar', { headers: getAuthHeaders() });
-            if (!response.ok) {
+            // Drafts are not in the public sidebar, so the page is loaded from the admin API
+            const response = await fetch(`/api/admin/pages/${encodeURIComponent(pageId)}`, { headers: getAuthHeaders() });
+            if (!response.ok && response.status !== 404) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
-            const sidebar = await response.json();
-            const pageToEdit = findPageById(sidebar, pageId);
+            const pageToEdit = response.ok ? await response.json() : null;
 
             if (pageToEdit) {
                 document.getElementById('edit-page-id').value = pageToEdit.id;
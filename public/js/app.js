@@ -8,10 +8,11 @@ document.addEventListener('DOMContentLoaded', () => {
     const pageContentElement = document.getElementById('page-content');
     const breadcrumbsElement = document.getElementById('breadcrumbs');
 
-    // Function to fetch pages data from Flask backend
+    // Function to fetch the top level of the sidebar from Flask backend.
+    // Deeper levels are loaded on demand by fetchSidebarChildren when a chapter is expanded.
     async function fetchPagesData() {
         try {
-            const response = await fetch('http://localhost:5000/api/sidebar'); // Flask backend endpoint
+            const response = await fetch('http://localhost:5000/api/sidebar?depth=1'); // Flask backend endpoint
             if (!response.ok) {
                 throw new Error(`HTTP error! status: ${response.status}`);
             }
@@ -24,6 +25,20 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     }
 
+    // Function to fetch the direct children of a chapter
+    async function fetchSidebarChildren(parentId) {
+        try {
+            const response = await fetch(`http://localhost:5000/api/sidebar?parent=${encodeURIComponent(parentId)}&depth=1`);
+            if (!response.ok) {
+                throw new Error(`HTTP error! status: ${response.status}`);
+            }
+            return await response.json();
+        } catch (error) {
+            console.error('Error fetching sidebar children:', error);
+            return [];
+        }
+    }
+
     // Function to build sidebar menu
     function buildSidebarMenu(pages, parentElement) {
         console.log('Building sidebar with pages:', pages);
@@ -47,18 +62,21 @@ document.addEventListener('DOMContentLoaded', () => {
 
             menuItem.appendChild(menuLink);
 
-            if (page.children && page.children.length > 0) {
-                console.log(`Page "${page.title}" has children:`, page.children);
-
+            // Children are either included in the payload or, past the requested depth,
+            // announced by child_count and fetched the first time the chapter is expanded
+            let childrenLoaded = !!(page.children && page.children.length > 0);
+            if (childrenLoaded || page.child_count > 0) {
                 const submenu = document.createElement('div'); // changed from ul to div for flexibility
                 submenu.classList.add('submenu');
                 submenu.style.display = 'none'; // collapse by default
 
-                buildSidebarMenu(page.children, submenu);
+                if (childrenLoaded) {
+                    buildSidebarMenu(page.children, submenu);
+                }
                 menuItem.appendChild(submenu);
 
                 // Add click event to toggle submenu
-                menuLink.addEventListener('click', (e) => {
+                menuLink.addEventListener('click', async (e) => {
                     if (menuLink.getAttribute('href') === '#') {
                         e.preventDefault();
                         const isExpanded = menuItem.classList.contains('expanded');
@@ -68,6 +86,10 @@ document.addEventListener('DOMContentLoaded', () => {
                             menuItem.classList.remove('expanded');
                             menuLink.setAttribute('aria-expanded', 'false');
                         } else {
+                            if (!childrenLoaded) {
+                                childrenLoaded = true;
+                                buildSidebarMenu(await fetchSidebarChildren(page.id), submenu);
+                            }
                             submenu.style.display = 'block';
                             menuItem.classList.add('expanded');
                             menuLink.setAttribute('aria-expanded', 'true');
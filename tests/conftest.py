@@ -0,0 +1,67 @@
+# tests/conftest.py
+# Every test runs against its own copy of the repository's site.db in a temporary directory,
+# with uploads going to a temporary directory too. The in-process caches are keyed by
+# revision, and every copy starts at the same revisions, so they are emptied between tests.
+
+import os
+import sys
+import shutil
+import sqlite3
+import pytest
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, REPO_ROOT)
+
+from backend import app as app_module
+from backend.app import create_app
+from backend.compression import response_bodies
+from backend.content_cache import menu_cache, widget_cache
+from backend.login_guard import login_guard
+from backend.settings import settings_cache
+from backend.snapshot import tree_cache
+
+TOKEN = 'test-token'
+
+def reset_caches():
+    app_module._page_columns = None
+    for cache in (menu_cache, widget_cache, settings_cache, tree_cache, app_module.sanitized_content, response_bodies):
+        cache.clear()
+    for buckets in (login_guard.by_ip, login_guard.by_username_ip, login_guard.failures_by_username):
+        buckets.clear()
+
+@pytest.fixture
+def db_path(tmp_path):
+    """A copy of site.db that is not migrated yet."""
+    path = str(tmp_path / 'site.db')
+    shutil.copy(os.path.join(REPO_ROOT, 'site.db'), path)
+    return path
+
+@pytest.fixture
+def app(db_path, tmp_path):
+    reset_caches()
+    app = create_app({'DATABASE': db_path, 'UPLOADS_DIR': str(tmp_path / 'uploads'), 'SITE_BUNDLE': ''})
+    # The first request migrates the copy; afterwards every user logs in with TOKEN
+    with app.app_context():
+        app_module.get_db()
+    conn = sqlite3.connect(db_path)
+    conn.execute("UPDATE users SET token = ?", (TOKEN,))
+    conn.commit()
+    conn.close()
+    yield app
+    reset_caches()
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def auth():
+    return {'Authorization': f'Bearer {TOKEN}'}
+
+@pytest.fixture
+def db(app, db_path):
+    """A plain connection to the test database, for setting up and checking rows."""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
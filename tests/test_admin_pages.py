@@ -0,0 +1,47 @@
+def test_listing_includes_drafts(client, auth, db):
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'our-company-ceo'")
+    db.commit()
+    body = client.get('/api/admin/pages?published=0&fields=id,published', headers=auth).get_json()
+    assert {'id': 'our-company-ceo', 'published': False} in body['pages']
+
+def test_listing_pages_through_cursors(client, auth, db):
+    total = db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+    seen, cursor = [], None
+    while True:
+        url = '/api/admin/pages?fields=id&limit=7' + (f'&after={cursor}' if cursor else '')
+        body = client.get(url, headers=auth).get_json()
+        seen.extend(page['id'] for page in body['pages'])
+        cursor = body['next_cursor']
+        if not cursor:
+            break
+    assert len(seen) == len(set(seen)) == total
+
+def test_listing_rejects_bad_arguments_cleanly(client, auth):
+    for query, message in (('limit=abc', 'Invalid limit'), ('after=abc', 'Invalid cursor'),
+                           ('published=maybe', 'Invalid boolean value: maybe'), ('fields=nope', 'Unknown fields: nope')):
+        response = client.get(f'/api/admin/pages?{query}', headers=auth)
+        assert response.status_code == 400, query
+        assert response.get_json() == {'message': message}
+
+def test_page_by_id_includes_drafts(client, auth, db):
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'our-company-ceo'")
+    db.commit()
+    response = client.get('/api/admin/pages/our-company-ceo', headers=auth)
+    assert response.status_code == 200
+    page = response.get_json()
+    assert (page['id'], page['published']) == ('our-company-ceo', False)
+    assert 'content' in page and 'design' in page
+    assert client.get('/api/admin/pages/no-such-page', headers=auth).status_code == 404
+    assert client.get('/api/admin/pages/our-company-ceo').status_code == 401
+
+def test_admin_sidebar_includes_drafts(client, auth, db):
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'our-company-ceo'")
+    db.commit()
+    public = client.get('/api/sidebar?parent=our-company').get_json()
+    admin = client.get('/api/admin/sidebar?parent=our-company', headers=auth).get_json()
+    assert 'our-company-ceo' not in [node['id'] for node in public]
+    assert 'our-company-ceo' in [node['id'] for node in admin]
+    top = client.get('/api/admin/sidebar', headers=auth).get_json()
+    chapter = next(node for node in top if node['id'] == 'our-company')
+    assert chapter['child_count'] == len(admin)
+    assert client.get('/api/admin/sidebar?parent=no-such-page', headers=auth).status_code == 404
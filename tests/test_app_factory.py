@@ -0,0 +1,42 @@
+import os
+import sys
+import subprocess
+
+from backend import app as app_module
+from backend.app import create_app
+from backend.snapshot import tree_cache
+
+from conftest import REPO_ROOT, reset_caches
+
+def test_importing_the_module_builds_no_app():
+    # In a fresh interpreter, so modules imported by other tests do not count
+    code = ("import sys, logging, backend.app as m; print(m._default_app is None); "
+            "print(bool(logging.getLogger('backend').handlers)); "
+            "print(sorted(name for name in ('backend.uploads', 'backend.images', 'backend.bundle', "
+            "'backend.login_guard', 'backend.export') if name in sys.modules))")
+    output = subprocess.run([sys.executable, '-c', code], cwd=REPO_ROOT, capture_output=True, text=True, check=True)
+    assert output.stdout.splitlines() == ['True', 'False', '[]']
+
+def test_config_overrides(app, db_path, tmp_path):
+    assert app.config['DATABASE'] == db_path
+    assert app.config['UPLOADS_DIR'] == str(tmp_path / 'uploads')
+    assert os.path.isdir(app.config['UPLOADS_DIR'])
+
+def test_apps_are_independent(db_path, tmp_path):
+    reset_caches()
+    first = create_app({'DATABASE': db_path, 'UPLOADS_DIR': str(tmp_path / 'a')})
+    second = create_app({'DATABASE': db_path, 'UPLOADS_DIR': str(tmp_path / 'b'), 'READ_REPLICA': False})
+    assert first.config['UPLOADS_DIR'] != second.config['UPLOADS_DIR']
+    assert second.config['READ_REPLICA'] is False
+    for app in (first, second):
+        response = app.test_client().get('/api/sidebar')
+        assert response.status_code == 200
+        assert response.get_json()
+
+def test_warm_fills_the_caches(db_path, tmp_path):
+    reset_caches()
+    create_app({'DATABASE': db_path, 'UPLOADS_DIR': str(tmp_path / 'uploads')}, warm=True)
+    assert tree_cache._snapshot is not None
+    assert len(tree_cache._snapshot.pages) > 0
+    assert len(app_module.sanitized_content._entries) > 0
+    reset_caches()
@@ -0,0 +1,75 @@
+def batch(client, auth, *operations):
+    response = client.post('/api/admin/batch', json={'operations': list(operations)}, headers=auth)
+    return response.status_code, response.get_json()
+
+def page(db, page_id):
+    return db.execute("SELECT * FROM pages WHERE id = ?", (page_id,)).fetchone()
+
+def test_requires_a_token(client):
+    assert client.post('/api/admin/batch', json={'operations': [{'op': 'delete', 'id': 'our-company-ceo'}]}).status_code == 401
+
+def test_applies_every_operation(client, auth, db):
+    status, body = batch(client, auth,
+                         {'op': 'create', 'title': 'New page', 'slug': 'new-page', 'parent_id': 'our-company'},
+                         {'op': 'update', 'slug': 'new-page', 'data': {'title': 'Renamed'}},
+                         {'op': 'visibility', 'id': 'our-company-ceo', 'published': False},
+                         {'op': 'move', 'id': 'our-company-shareholders', 'parent_id': 'our-destination'},
+                         {'op': 'delete', 'id': 'our-company-executive-chart'})
+    assert status == 200, body
+    assert [result['status'] for result in body['results']] == [201, 200, 200, 200, 200]
+    new_page = page(db, body['results'][0]['page_id'])
+    assert (new_page['title'], new_page['parent_id']) == ('Renamed', 'our-company')
+    assert not page(db, 'our-company-ceo')['published']
+    assert page(db, 'our-company-shareholders')['parent_id'] == 'our-destination'
+    assert page(db, 'our-company-executive-chart') is None
+
+def test_a_failed_operation_rolls_back_the_batch(client, auth, db):
+    status, body = batch(client, auth,
+                         {'op': 'update', 'id': 'our-company-ceo', 'data': {'title': 'Changed'}},
+                         {'op': 'delete', 'id': 'no-such-page'})
+    assert status == 404
+    assert body['failed_index'] == 1
+    assert page(db, 'our-company-ceo')['title'] != 'Changed'
+
+def test_rejects_moves_into_the_page_itself(client, auth, db):
+    # our-destination-sports is a chapter inside our-destination
+    for op in ({'op': 'move', 'id': 'our-destination', 'parent_id': 'our-destination-sports'},
+               {'op': 'move', 'id': 'our-destination', 'parent_id': 'our-destination'},
+               {'op': 'update', 'id': 'our-destination', 'data': {'parent_id': 'our-destination-sports'}}):
+        status, _ = batch(client, auth, op)
+        assert status == 400, op
+    assert page(db, 'our-destination')['parent_id'] is None
+
+def test_update_validates_parent_and_published(client, auth, db):
+    cases = [
+        ({'parent_id': 'our-company-ceo'}, 400),  # Not a chapter
+        ({'parent_id': 'no-such-page'}, 404),
+        ({'published': 'yes'}, 400),
+        ({'is_chapter': 'no'}, 400),
+    ]
+    for data, expected in cases:
+        status, _ = batch(client, auth, {'op': 'update', 'id': 'our-company-shareholders', 'data': data})
+        assert status == expected, data
+    row = page(db, 'our-company-shareholders')
+    assert (row['parent_id'], row['published']) == ('our-company', 1)
+
+    status, _ = batch(client, auth, {'op': 'update', 'id': 'our-company-shareholders',
+                                     'data': {'parent_id': None, 'published': False}})
+    assert status == 200
+    row = page(db, 'our-company-shareholders')
+    assert (row['parent_id'], row['published']) == (None, 0)
+
+def test_create_validates_flags(client, auth, db):
+    for flags in ({'published': 'yes'}, {'is_chapter': 1}, {'published': None}):
+        status, body = batch(client, auth, dict({'op': 'create', 'title': 'Flagged', 'slug': 'flagged'}, **flags))
+        assert status == 400, flags
+    assert db.execute("SELECT COUNT(*) FROM pages WHERE slug = 'flagged'").fetchone()[0] == 0
+    status, _ = batch(client, auth, {'op': 'create', 'title': 'Flagged', 'slug': 'flagged',
+                                     'published': False, 'is_chapter': True})
+    assert status == 200
+    row = db.execute("SELECT published, is_chapter FROM pages WHERE slug = 'flagged'").fetchone()
+    assert tuple(row) == (0, 1)
+
+def test_rejects_unknown_operations(client, auth):
+    assert batch(client, auth, {'op': 'rename', 'id': 'our-company-ceo'})[0] == 400
+    assert client.post('/api/admin/batch', json={'operations': []}, headers=auth).status_code == 400
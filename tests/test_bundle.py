@@ -0,0 +1,34 @@
+import gzip
+
+from backend.bundle import Bundle, compile_bundle
+from backend.compression import response_bodies
+
+def test_bundle_bodies_match_the_database(app, client, tmp_path):
+    expected_page = client.get('/api/pages/our-company-ceo').data
+    expected_sidebar = client.get('/api/sidebar').data
+    path = str(tmp_path / 'site.bundle')
+    compile_bundle(app.config['DATABASE'], path)
+    bundle = Bundle(path)
+
+    body, encoding = bundle.page('our-company-ceo')
+    assert isinstance(body, memoryview)
+    assert (bytes(body), encoding) == (expected_page, None)
+    body, encoding = bundle.sidebar('gzip')
+    assert encoding == 'gzip'
+    assert gzip.decompress(body) == expected_sidebar
+    assert bundle.page('no-such-page') is None
+
+def test_bundle_responses_skip_the_body_cache(app, client, tmp_path):
+    path = str(tmp_path / 'site.bundle')
+    compile_bundle(app.config['DATABASE'], path)
+    app.config['SITE_BUNDLE'] = path
+    response_bodies.clear()
+
+    response = client.get('/api/sidebar', headers={'Accept-Encoding': 'gzip'})
+    assert response.status_code == 200
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert client.get('/api/pages/our-company-ceo').status_code == 200
+    assert len(response_bodies._entries) == 0
+
+    # Slugs the bundle does not have fall through to the database
+    assert client.get('/api/pages/no-such-page').status_code == 404
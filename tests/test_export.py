@@ -0,0 +1,29 @@
+import json
+
+from backend.export import iter_export
+
+def export(db_path, fmt='ndjson', **kwargs):
+    return ''.join(iter_export(db_path, fmt, **kwargs))
+
+def test_pages_outside_the_tree_are_appended(db, db_path):
+    db.execute("INSERT INTO pages (id, title, slug, content, published, is_chapter, parent_id) "
+               "VALUES ('lost', 'Lost', 'lost', '', 1, 1, 'deleted-chapter')")
+    db.execute("INSERT INTO pages (id, title, slug, content, published, is_chapter, parent_id) "
+               "VALUES ('lost-child', 'Lost child', 'lost-child', '', 1, 0, 'lost')")
+    db.execute("INSERT INTO pages (id, title, slug, content, published, is_chapter, parent_id) "
+               "VALUES ('loop-a', 'A', 'loop-a', '', 1, 1, 'loop-b')")
+    db.execute("INSERT INTO pages (id, title, slug, content, published, is_chapter, parent_id) "
+               "VALUES ('loop-b', 'B', 'loop-b', '', 1, 1, 'loop-a')")
+    db.commit()
+    total = db.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    ids = [json.loads(line)['id'] for line in export(db_path).splitlines()]
+    assert len(ids) == len(set(ids)) == total
+    assert ids[-4:] == ['lost', 'lost-child', 'loop-a', 'loop-b']
+
+    nested = json.loads(export(db_path, 'json'))
+    assert nested[-3]['id'] == 'lost'
+    assert [child['id'] for child in nested[-3]['children']] == ['lost-child']
+
+    published = [json.loads(line)['id'] for line in export(db_path, published_only=True).splitlines()]
+    assert 'lost-child' in published and 'loop-a' not in published
@@ -0,0 +1,37 @@
+import pytest
+
+from backend.login_guard import LoginGuard, LoginThrottled, TokenBuckets
+
+def test_bucket_refills_over_time():
+    buckets = TokenBuckets(2, 60)
+    buckets.take('key', now=0)
+    buckets.take('key', now=0)
+    with pytest.raises(LoginThrottled) as error:
+        buckets.take('key', now=0)
+    assert error.value.retry_after == 1
+    buckets.take('key', now=1)
+
+def test_check_does_not_take_and_charge_never_raises():
+    buckets = TokenBuckets(1, 0)
+    buckets.check('key')
+    buckets.charge('key')
+    buckets.charge('key')
+    with pytest.raises(LoginThrottled):
+        buckets.check('key')
+
+def test_one_address_cannot_lock_a_username_out_elsewhere():
+    guard = LoginGuard(hash_threads=1, max_pending=0)
+    with pytest.raises(LoginThrottled):
+        for _ in range(100):
+            guard.throttle('6.6.6.6', 'admin')
+            guard.failed('admin')
+    guard.throttle('1.1.1.1', 'Admin')
+
+def test_failed_checks_from_many_addresses_are_capped():
+    guard = LoginGuard(hash_threads=1, max_pending=0)
+    with pytest.raises(LoginThrottled):
+        for address in range(1000):
+            guard.throttle(f'10.0.{address // 256}.{address % 256}', 'admin')
+            guard.failed('admin')
+    # Other usernames are unaffected
+    guard.throttle('1.1.1.1', 'editor')
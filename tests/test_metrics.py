@@ -0,0 +1,31 @@
+import threading
+
+from backend.metrics import Metrics
+
+def test_short_lived_threads_do_not_add_shards():
+    metrics = Metrics(shards=4)
+
+    def request():
+        metrics.request_started()
+        metrics.observe('GET', '/api/sidebar', 200, 0.003)
+        metrics.request_finished()
+
+    for _ in range(50):
+        threads = [threading.Thread(target=request) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(metrics._shards) == 4
+    text = metrics.render()
+    assert 'handbook_http_requests_total{method="GET",route="/api/sidebar",status="200"} 500' in text
+    assert 'handbook_http_request_duration_seconds_bucket{method="GET",route="/api/sidebar",le="0.005"} 500' in text
+    assert 'handbook_http_requests_in_flight 0' in text
+
+def test_metrics_endpoint(client, auth):
+    client.get('/api/sidebar')
+    response = client.get('/api/admin/metrics', headers=auth)
+    assert response.status_code == 200
+    assert 'route="/api/sidebar"' in response.get_data(as_text=True)
+    assert client.get('/api/admin/metrics').status_code == 401
@@ -0,0 +1,50 @@
+import sqlite3
+
+from backend.migrations import LATEST_VERSION, MIGRATIONS, PAGE_CHANGES_KEPT, migrate, schema_version
+
+def objects(conn, kind):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = ?", (kind,))}
+
+def test_migrates_the_repository_database_to_the_latest_version(db_path):
+    conn = sqlite3.connect(db_path)
+    pages = conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+    assert schema_version(conn) < LATEST_VERSION
+
+    assert migrate(conn) == LATEST_VERSION
+    assert schema_version(conn) == LATEST_VERSION
+    assert conn.execute("SELECT COUNT(*) FROM pages").fetchone()[0] == pages
+    assert {'revisions', 'image_derivatives', 'page_changes'} <= objects(conn, 'table')
+    assert {'pages_change_insert', 'pages_change_update', 'pages_change_delete',
+            'page_changes_compact'} <= objects(conn, 'trigger')
+
+def test_migrate_is_idempotent(db_path):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    schema = conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall()
+    assert migrate(conn) == LATEST_VERSION
+    assert conn.execute("SELECT type, name, sql FROM sqlite_master ORDER BY name").fetchall() == schema
+
+def test_migrations_are_numbered_in_order():
+    numbers = [number for number, _, _ in MIGRATIONS]
+    assert numbers == list(range(1, len(MIGRATIONS) + 1))
+
+def test_change_log_starts_at_the_current_revision(db_path):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    revisions = dict(conn.execute("SELECT name, revision FROM revisions"))
+    assert revisions['page_changes_horizon'] == revisions.get('pages', 0)
+    assert conn.execute("SELECT COUNT(*) FROM page_changes").fetchone()[0] == 0
+
+def test_compaction_keeps_the_newest_entries(db_path):
+    conn = sqlite3.connect(db_path)
+    migrate(conn)
+    page_id = conn.execute("SELECT id FROM pages WHERE is_chapter = 0 LIMIT 1").fetchone()[0]
+    for i in range(PAGE_CHANGES_KEPT + 250):
+        conn.execute("UPDATE pages SET title = ? WHERE id = ?", (f'Title {i}', page_id))
+    conn.commit()
+
+    count, oldest = conn.execute("SELECT COUNT(*), min(revision) FROM page_changes").fetchone()
+    assert PAGE_CHANGES_KEPT <= count < PAGE_CHANGES_KEPT + 100
+    horizon = conn.execute("SELECT revision FROM revisions WHERE name = 'page_changes_horizon'").fetchone()[0]
+    # Everything after the horizon is still in the log
+    assert horizon == oldest - 1
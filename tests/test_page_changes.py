@@ -0,0 +1,58 @@
+def revision(db, name='pages'):
+    row = db.execute("SELECT revision FROM revisions WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else 0
+
+def logged(db, since):
+    return [tuple(row) for row in db.execute(
+        "SELECT page_id, change FROM page_changes WHERE revision > ? ORDER BY id", (since,))]
+
+def test_update_that_changes_nothing_is_not_logged(db):
+    before = revision(db)
+    db.execute("UPDATE pages SET title = title")
+    db.commit()
+    assert revision(db) == before
+    assert logged(db, before) == []
+
+def test_each_kind_of_write_is_logged(db):
+    before = revision(db)
+    db.execute("INSERT INTO pages (id, title, slug, content, published, is_chapter, parent_id) "
+               "VALUES ('new-page', 'New', 'new-page', '', 1, 0, 'our-company')")
+    db.execute("UPDATE pages SET title = 'Renamed' WHERE id = 'new-page'")
+    db.execute("UPDATE pages SET parent_id = 'our-destination' WHERE id = 'new-page'")
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'new-page'")
+    db.execute("UPDATE pages SET id = 'moved-page' WHERE id = 'new-page'")
+    db.execute("DELETE FROM pages WHERE id = 'moved-page'")
+    db.commit()
+    assert logged(db, before) == [
+        ('new-page', 'insert'), ('new-page', 'update'), ('new-page', 'move'), ('new-page', 'visibility'),
+        ('new-page', 'delete'), ('moved-page', 'insert'), ('moved-page', 'delete'),
+    ]
+    assert revision(db) == before + 6
+
+def test_since_is_required(client):
+    assert client.get('/api/sidebar/changes').status_code == 400
+    assert client.get('/api/sidebar/changes?since=abc').status_code == 400
+
+def test_changes_since_a_revision(client, db):
+    current = client.get('/api/sidebar/changes?since=0').get_json()['revision']
+    assert client.get(f'/api/sidebar/changes?since={current}').get_json() == {
+        'revision': current, 'resync': False, 'changes': []}
+
+    db.execute("UPDATE pages SET title = 'Our shareholders' WHERE id = 'our-company-shareholders'")
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'our-company-ceo'")
+    db.commit()
+    body = client.get(f'/api/sidebar/changes?since={current}').get_json()
+    assert body['revision'] == current + 2
+    assert not body['resync']
+    changes = {change['id']: change for change in body['changes']}
+    assert changes['our-company-shareholders']['change'] == 'updated'
+    assert changes['our-company-shareholders']['node']['title'] == 'Our shareholders'
+    assert changes['our-company-shareholders']['parent_id'] == 'our-company'
+    assert changes['our-company-ceo'] == {'id': 'our-company-ceo', 'change': 'deleted'}
+
+def test_resync_outside_the_log(client, db):
+    horizon = revision(db, 'page_changes_horizon')
+    current = revision(db)
+    for since in (horizon - 1, current + 1):
+        body = client.get(f'/api/sidebar/changes?since={since}').get_json()
+        assert body == {'revision': current, 'resync': True, 'changes': []}
@@ -0,0 +1,31 @@
+import json
+
+from backend.asgi import PublicReadApp
+from backend.bundle import compile_bundle
+
+def test_draft_pages_are_not_served(client, db):
+    assert client.get('/api/pages/our-company-ceo').status_code == 200
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'our-company-ceo'")
+    db.commit()
+    assert client.get('/api/pages/our-company-ceo').status_code == 404
+    assert client.get('/api/pages/no-such-page').status_code == 404
+
+def test_asgi_reads_agree_with_the_wsgi_app(app, db, db_path):
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'our-company-ceo'")
+    db.commit()
+    reader = PublicReadApp(db_path)
+    try:
+        assert reader.read('page', 'our-company-ceo', {})[1] == 404
+        body, status, _ = reader.read('page', 'our-company-shareholders', {})
+        assert status == 200
+        assert json.loads(body)['title']
+    finally:
+        reader.executor.shutdown()
+
+def test_bundle_holds_the_published_pages(app, db, db_path, tmp_path):
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'our-company-ceo'")
+    db.commit()
+    index = compile_bundle(db_path, str(tmp_path / 'site.bundle'))
+    published = {row[0] for row in db.execute("SELECT slug FROM pages WHERE published AND slug IS NOT NULL")}
+    assert set(index['pages']) == published
+    assert 'our-company-ceo' not in index['pages']
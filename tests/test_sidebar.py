@@ -0,0 +1,7 @@
+def test_hidden_chapter_hides_its_subtree(client, db):
+    assert client.get('/api/sidebar?parent=our-destination-sports').status_code == 200
+    db.execute("UPDATE pages SET published = 0 WHERE id = 'our-destination'")
+    db.commit()
+    assert client.get('/api/sidebar?parent=our-destination-sports').status_code == 404
+    assert client.get('/api/sidebar?parent=our-destination').status_code == 404
+    assert client.get('/api/sidebar?parent=no-such-page').status_code == 404
@@ -0,0 +1,32 @@
+import sqlite3
+
+from backend.app import get_read_db
+from backend.sqltrace import QueryTrace, TracingConnection
+
+def test_duplicates_ignore_transactions():
+    conn = sqlite3.connect(':memory:', factory=TracingConnection)
+    conn.execute("CREATE TABLE t (x)")
+    for _ in range(2):
+        conn.execute("INSERT INTO t VALUES (1)")
+        conn.commit()
+    conn.execute("SELECT x FROM t WHERE x = ?", (2,))
+    assert conn.trace.duplicates() == [('INSERT INTO t VALUES (1)', 2)]
+    assert conn.trace.duplicate_count() == 1
+
+def test_merge_adds_up_both_traces():
+    first, second = QueryTrace(), QueryTrace()
+    first.on_statement('SELECT 1')
+    second.on_statement('SELECT 1')
+    second.record('SELECT 1', 0.5)
+    first.merge(second)
+    assert (first.statements, first.sql_time, first.duplicate_count()) == (2, 0.5, 1)
+
+def test_replica_reads_are_traced(app, client, monkeypatch):
+    monkeypatch.setenv('SQL_TRACE', '1')
+    with app.test_request_context():
+        assert app.config['READ_REPLICA']
+        assert isinstance(get_read_db(), TracingConnection)
+    response = client.get('/api/pages/our-company-ceo')
+    assert response.status_code == 200
+    assert int(response.headers['X-SQL-Statements']) > 0
+    assert response.headers['X-SQL-Duplicates'] == '0'
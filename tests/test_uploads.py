@@ -0,0 +1,101 @@
+import io
+import os
+import time
+import hashlib
+import threading
+import pytest
+
+from backend.uploads import UploadSessionError, append_chunk, get_chunked_upload, start_chunked_upload
+
+VIDEO = b'\x00\x00\x00\x18ftypmp42' + bytes(range(256)) * 40
+
+def start(client, auth, size=len(VIDEO), filename='clip.mp4'):
+    return client.post('/api/admin/uploads', json={'filename': filename, 'size': size}, headers=auth)
+
+def put(client, auth, upload_id, start, data, total=len(VIDEO)):
+    headers = dict(auth, **{'Content-Range': f'bytes {start}-{start + len(data) - 1}/{total}'})
+    return client.put(f'/api/admin/uploads/{upload_id}', data=data, headers=headers)
+
+def test_chunked_upload(client, auth, app):
+    response = start(client, auth)
+    assert response.status_code == 201
+    upload_id = response.get_json()['upload_id']
+
+    assert put(client, auth, upload_id, 0, VIDEO[:4000]).get_json()['offset'] == 4000
+    # Resending a chunk, or skipping ahead, tells the client where to resume
+    response = put(client, auth, upload_id, 0, VIDEO[:4000])
+    assert response.status_code == 409
+    assert response.get_json()['offset'] == 4000
+    assert put(client, auth, upload_id, 6000, VIDEO[6000:]).status_code == 409
+    assert client.post(f'/api/admin/uploads/{upload_id}/complete', headers=auth).status_code == 409
+
+    assert client.get(f'/api/admin/uploads/{upload_id}', headers=auth).get_json()['offset'] == 4000
+    assert put(client, auth, upload_id, 4000, VIDEO[4000:]).get_json()['offset'] == len(VIDEO)
+    response = client.post(f'/api/admin/uploads/{upload_id}/complete', headers=auth)
+    assert response.status_code == 200
+    file_path = response.get_json()['file_path']
+    assert hashlib.sha256(VIDEO).hexdigest() in file_path
+    assert client.get(file_path).data == VIDEO
+    assert client.get(f'/api/admin/uploads/{upload_id}', headers=auth).status_code == 404
+
+def test_rejects_chunks_past_the_declared_size(client, auth):
+    upload_id = start(client, auth, size=100).get_json()['upload_id']
+    assert put(client, auth, upload_id, 0, VIDEO[:200], total=100).status_code == 416
+
+def test_rejects_content_that_does_not_match_the_extension(client, auth):
+    data = b'not a video' * 10
+    upload_id = start(client, auth, size=len(data)).get_json()['upload_id']
+    assert put(client, auth, upload_id, 0, data, total=len(data)).status_code == 200
+    assert client.post(f'/api/admin/uploads/{upload_id}/complete', headers=auth).status_code == 415
+
+def test_abort_discards_the_session(client, auth):
+    upload_id = start(client, auth).get_json()['upload_id']
+    assert client.delete(f'/api/admin/uploads/{upload_id}', headers=auth).status_code == 200
+    assert client.get(f'/api/admin/uploads/{upload_id}', headers=auth).status_code == 404
+
+class SlowStream(io.BytesIO):
+    def read(self, size=-1):
+        time.sleep(0.005)
+        return super().read(size)
+
+def test_concurrent_copies_of_a_chunk_are_written_once(tmp_path):
+    uploads_dir = str(tmp_path)
+    upload_id = start_chunked_upload(uploads_dir, 'clip.mp4', len(VIDEO))['upload_id']
+    chunk = VIDEO[:8000]
+    outcomes = []
+
+    def send():
+        try:
+            outcomes.append(append_chunk(uploads_dir, upload_id, 0, len(chunk) - 1, SlowStream(chunk)))
+        except UploadSessionError as e:
+            outcomes.append(e.status)
+
+    threads = [threading.Thread(target=send) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sorted(outcomes) == [409, 409, 409, len(chunk)]
+    assert get_chunked_upload(uploads_dir, upload_id)['offset'] == len(chunk)
+
+def test_short_chunk_is_rolled_back(tmp_path):
+    uploads_dir = str(tmp_path)
+    upload_id = start_chunked_upload(uploads_dir, 'clip.mp4', len(VIDEO))['upload_id']
+    with pytest.raises(UploadSessionError) as error:
+        append_chunk(uploads_dir, upload_id, 0, 7999, io.BytesIO(VIDEO[:5000]))
+    assert (error.value.status, error.value.offset) == (400, 0)
+    assert get_chunked_upload(uploads_dir, upload_id)['offset'] == 0
+
+def test_staging_files_are_not_served(client, auth, app):
+    upload_id = start(client, auth).get_json()['upload_id']
+    put(client, auth, upload_id, 0, VIDEO[:4000])
+    os.makedirs(os.path.join(app.config['UPLOADS_DIR'], 'ab'), exist_ok=True)
+    for path in (f'.staging/{upload_id}.part', f'./.staging/{upload_id}.part', f'ab/../.staging/{upload_id}.part'):
+        assert client.get(f'/uploads/{path}').status_code == 404, path
+
+def test_form_uploads_are_streamed_to_the_store(client, auth):
+    response = client.post('/api/admin/upload', data={'file': (io.BytesIO(VIDEO), 'clip.mp4')}, headers=auth)
+    assert response.status_code == 200
+    assert client.get(response.get_json()['file_path']).data == VIDEO
+    response = client.post('/api/admin/upload', data={'file': (io.BytesIO(b'MZ' * 10), 'tool.exe')}, headers=auth)
+    assert response.status_code == 415